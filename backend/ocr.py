@@ -47,6 +47,28 @@ def read_plate(image_path):
     if img is None:
         return None
 
+    return read_plate_image(img)
+
+
+def read_plate_image(img):
+    """
+    Isto kao read_plate, ali nad već dekodiranom (BGR) slikom - bez diska
+    """
+    plate, _ = read_plate_with_confidence(img)
+    return plate
+
+
+def read_plate_with_confidence(img):
+    """
+    OCR tablice + pouzdanost (0-1)
+    Vraća (plate, confidence) ili (None, 0.0)
+
+    Ako je OCR pročitao manje od 7 znakova (normalize_plate dopunjava
+    nulama), pouzdanost se srazmjerno umanjuje - tablica je nagađana.
+    """
+    if img is None or img.size == 0:
+        return None, 0.0
+
     # 1️⃣ Resize (OCR radi bolje na većoj slici)
     img = cv2.resize(img, None, fx=2.3, fy=2.3)
 
@@ -60,11 +82,13 @@ def read_plate(image_path):
     results = reader.readtext(enhanced)
 
     if not results:
-        return None
+        return None, 0.0
 
     # Izaberemo NAJDULJI string → obično je to prava tablica
-    texts = [r[1] for r in results]
-    texts_sorted = sorted(texts, key=len, reverse=True)
+    _, text, confidence = max(results, key=lambda r: len(r[1]))
+
+    read_chars = len(re.sub(r'[^A-Za-z0-9]', '', text))
+    if read_chars < 7:
+        confidence *= read_chars / 7
 
-    normalized = normalize_plate(texts_sorted[0])
-    return normalized
+    return normalize_plate(text), float(confidence)
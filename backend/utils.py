@@ -1,10 +1,12 @@
 import os
 import cv2
 
-def crop_plate(image_path, bbox, margin=15):
+def crop_plate(image_path, bbox, margin=15, crop_path=None):
     """
     Crops plate from image with extra margin to improve OCR.
     bbox = [x1, y1, x2, y2]
+    crop_path defaults to "<image name>_plate_crop.jpg" next to the image,
+    so concurrent sessions never share a crop file.
     """
 
     img = cv2.imread(image_path)
@@ -21,8 +23,24 @@ def crop_plate(image_path, bbox, margin=15):
 
     crop = img[y1:y2, x1:x2]
 
-    # Save to uploads folder
-    crop_path = os.path.join("backend", "uploads", "temp_plate_crop.jpg")
+    # Save next to the source image (per-session upload folder)
+    if crop_path is None:
+        crop_path = os.path.splitext(image_path)[0] + "_plate_crop.jpg"
     cv2.imwrite(crop_path, crop)
 
-    return crop_path
\ No newline at end of file
+    return crop_path
+
+
+def crop_plate_array(img, bbox, margin=15):
+    """
+    Same crop as crop_plate, but on an already decoded image (no disk I/O).
+    Returns the cropped array (view into img).
+    """
+    x1, y1, x2, y2 = map(int, bbox)
+
+    x1 = max(0, x1 - margin)
+    y1 = max(0, y1 - margin)
+    x2 = min(img.shape[1], x2 + margin)
+    y2 = min(img.shape[0], y2 + margin)
+
+    return img[y1:y2, x1:x2]
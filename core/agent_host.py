@@ -0,0 +1,295 @@
+"""
+Core framework sloj - Agent Host
+Host koji pokreće SoftwareAgent.step_async petlje (delay, backoff, otkazivanje)
+Nema domenskog znanja - agenti ne sadrže host logiku, host ne zna šta agenti rade
+"""
+import time
+import asyncio
+import threading
+from collections import deque, Counter
+from typing import Dict, Optional, List
+
+from core.software_agent import SoftwareAgent
+
+
+class OperationCancelledError(Exception):
+    """Korak je prekinut jer je token otkazan"""
+
+
+class CancellationToken:
+    """
+    Token za kooperativno otkazivanje (thread-safe)
+
+    - cancel() otkazuje token i sve njegove child tokene
+    - agent provjerava is_cancelled / raise_if_cancelled() između faza
+    - sleep() čeka timeout ili otkazivanje (šta dođe prije)
+    """
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        self._event = threading.Event()
+        self._children: List["CancellationToken"] = []
+        self._lock = threading.Lock()
+        if parent is not None:
+            parent._attach(self)
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            children = list(self._children)
+        for child in children:
+            child.cancel()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise OperationCancelledError("Operacija otkazana")
+
+    def child(self) -> "CancellationToken":
+        return CancellationToken(parent=self)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sync čekanje (npr. u threadu treninga) - True ako je otkazan"""
+        return self._event.wait(timeout)
+
+    async def sleep(self, seconds: float) -> bool:
+        """Async čekanje - True ako je token otkazan prije isteka"""
+        return await asyncio.to_thread(self._event.wait, seconds)
+
+    def _attach(self, child: "CancellationToken"):
+        with self._lock:
+            self._children.append(child)
+        if self.is_cancelled:
+            child.cancel()
+
+    def _detach(self, child: "CancellationToken"):
+        with self._lock:
+            if child in self._children:
+                self._children.remove(child)
+
+
+class AgentMetrics:
+    """Po agentu: tick latencija (has_work), trajanje koraka, ishodi, idle udio"""
+
+    def __init__(self, window: int = 256):
+        self.ticks = 0
+        self.outcomes = Counter()
+        self.tick_latencies = deque(maxlen=window)
+        self.step_latencies = deque(maxlen=window)
+        self.busy_s = 0.0
+        self.started_at = time.time()
+        self.last_error: Optional[str] = None
+        self.last_step_at: Optional[float] = None
+        self.current_backoff_s = 0.0
+        self.running_steps = 0
+
+    def snapshot(self) -> dict:
+        uptime = max(time.time() - self.started_at, 1e-9)
+        return {
+            "ticks": self.ticks,
+            "outcomes": dict(self.outcomes),
+            "tick_latency_p50_ms": _percentile_ms(self.tick_latencies, 0.5),
+            "tick_latency_p95_ms": _percentile_ms(self.tick_latencies, 0.95),
+            "step_latency_p50_ms": _percentile_ms(self.step_latencies, 0.5),
+            "step_latency_p95_ms": _percentile_ms(self.step_latencies, 0.95),
+            "idle_ratio": round(max(0.0, 1.0 - self.busy_s / uptime), 4),
+            "current_backoff_s": round(self.current_backoff_s, 3),
+            "running_steps": self.running_steps,
+            "last_step_at": self.last_step_at,
+            "last_error": self.last_error
+        }
+
+
+def _percentile_ms(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(int(len(ordered) * q), len(ordered) - 1)] * 1000, 2)
+
+
+class _Registration:
+    def __init__(self, name, agent, max_concurrency, min_backoff_s, max_backoff_s):
+        self.name = name
+        self.agent = agent
+        self.max_concurrency = max_concurrency
+        self.min_backoff_s = min_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.metrics = AgentMetrics()
+        self.last_outcome: Optional[str] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wake: Optional[asyncio.Event] = None
+        self.thread: Optional[threading.Thread] = None
+
+
+class AgentHost:
+    """
+    Pokreće registrovane agente u pozadini
+
+    - svaki agent ima svoju nit + event loop (blokirajući korak jednog
+      agenta ne zaustavlja ostale)
+    - has_work() se provjerava jeftino; bez posla pauza raste
+      eksponencijalno (min_backoff_s → max_backoff_s), a posao je vraća
+      na minimum; trigger(name) budi agenta odmah
+    - max_concurrency: najviše ovoliko istovremenih step_async po agentu
+    - svaki korak dobija child CancellationToken; stop() ih sve otkazuje
+    - ishodi koraka: ok / no_work (None) / error / cancelled
+    """
+
+    def __init__(self):
+        self._agents: Dict[str, _Registration] = {}
+        self._token = CancellationToken()
+        self._started = False
+
+    def register(
+            self,
+            name: str,
+            agent: SoftwareAgent,
+            max_concurrency: int = 1,
+            min_backoff_s: float = 0.5,
+            max_backoff_s: float = 30.0
+    ) -> None:
+        if name in self._agents:
+            raise ValueError(f"Agent '{name}' je već registrovan")
+        registration = _Registration(name, agent, max_concurrency, min_backoff_s, max_backoff_s)
+        self._agents[name] = registration
+        if self._started:
+            self._start_agent(registration)
+
+    def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+        for registration in self._agents.values():
+            self._start_agent(registration)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Otkazuje sve korake i čeka da se niti završe"""
+        self._token.cancel()
+        for registration in self._agents.values():
+            self._wake(registration)
+        deadline = time.time() + timeout
+        for registration in self._agents.values():
+            if registration.thread:
+                registration.thread.join(max(0.0, deadline - time.time()))
+
+    def trigger(self, name: str) -> None:
+        """Novi posao je stigao - agent ne čeka kraj backoff-a"""
+        registration = self._agents.get(name)
+        if registration:
+            self._wake(registration)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "agent": type(r.agent).__name__,
+                "max_concurrency": r.max_concurrency,
+                "alive": bool(r.thread and r.thread.is_alive()),
+                **r.metrics.snapshot()
+            }
+            for name, r in self._agents.items()
+        }
+
+    # ------------------------------------------------------------------
+    # Interno
+    # ------------------------------------------------------------------
+    def _start_agent(self, registration: _Registration):
+        registration.thread = threading.Thread(
+            target=lambda: asyncio.run(self._agent_loop(registration)),
+            name=f"agent-{registration.name}",
+            daemon=True
+        )
+        registration.thread.start()
+
+    @staticmethod
+    def _wake(registration: _Registration):
+        loop, wake = registration.loop, registration.wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # loop se upravo zatvara
+
+    async def _agent_loop(self, r: _Registration):
+        r.loop = asyncio.get_running_loop()
+        r.wake = asyncio.Event()
+        slots = asyncio.Semaphore(r.max_concurrency)
+        steps = set()
+        backoff = r.min_backoff_s
+
+        while not self._token.is_cancelled:
+            await slots.acquire()
+            if self._token.is_cancelled:
+                slots.release()
+                break
+
+            # Korak bez rezultata ili sa greškom - ne vrti petlju, odmori
+            if r.last_outcome in ("no_work", "error"):
+                r.last_outcome = None
+                slots.release()
+                r.metrics.current_backoff_s = backoff
+                await self._idle(r, backoff)
+                backoff = min(backoff * 2, r.max_backoff_s)
+                continue
+
+            # Jeftina provjera (u threadu - može biti upit u bazu)
+            started = time.perf_counter()
+            try:
+                has_work = await asyncio.to_thread(r.agent.has_work)
+            except Exception as e:
+                has_work = False
+                r.metrics.last_error = f"has_work: {e}"
+            r.metrics.ticks += 1
+            r.metrics.tick_latencies.append(time.perf_counter() - started)
+
+            if has_work:
+                backoff = r.min_backoff_s
+                r.metrics.current_backoff_s = 0.0
+                step = asyncio.create_task(self._run_step(r, slots))
+                steps.add(step)
+                step.add_done_callback(steps.discard)
+                # Daj koraku priliku da krene prije sljedeće provjere
+                await asyncio.sleep(0)
+                continue
+
+            slots.release()
+            r.metrics.outcomes["idle"] += 1
+            r.metrics.current_backoff_s = backoff
+            await self._idle(r, backoff)
+            backoff = min(backoff * 2, r.max_backoff_s)
+
+        # Stop: koraci su dobili otkazan token - sačekaj da izađu
+        if steps:
+            await asyncio.gather(*steps, return_exceptions=True)
+
+    async def _run_step(self, r: _Registration, slots: asyncio.Semaphore):
+        token = self._token.child()
+        r.metrics.running_steps += 1
+        started = time.perf_counter()
+        try:
+            result = await r.agent.step_async(cancellation_token=token)
+            r.last_outcome = "no_work" if result is None else "ok"
+        except OperationCancelledError:
+            r.last_outcome = "cancelled"
+        except Exception as e:
+            r.last_outcome = "error"
+            r.metrics.last_error = str(e)
+            print(f"❌ Agent '{r.name}': {e}")
+        finally:
+            r.metrics.outcomes[r.last_outcome or "error"] += 1
+            elapsed = time.perf_counter() - started
+            r.metrics.step_latencies.append(elapsed)
+            r.metrics.busy_s += elapsed / r.max_concurrency
+            r.metrics.last_step_at = time.time()
+            r.metrics.running_steps -= 1
+            self._token._detach(token)
+            slots.release()
+
+    async def _idle(self, r: _Registration, seconds: float):
+        """Pauza koju prekida trigger() ili stop()"""
+        try:
+            await asyncio.wait_for(r.wake.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        r.wake.clear()
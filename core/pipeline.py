@@ -0,0 +1,317 @@
+"""
+Core framework sloj - Staged Pipeline
+Sense → Think → Act kao niz faza povezanih ograničenim async redovima
+Nema domenskog znanja - faze su obične funkcije ili adapteri interfejsa
+"""
+import time
+import asyncio
+import inspect
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, List, Optional, AsyncIterator, Any
+
+from core.software_agent import IPerceptionSource, IPolicy, IActuator, ILearningComponent
+
+_STOP = object()
+
+
+class Stage:
+    """
+    Jedna faza pipeline-a
+
+    fn(item) → novi item (None = item se odbacuje, ne ide dalje)
+    executor:
+        "async"   - fn je coroutine, radi na event loop-u (I/O faze)
+        "thread"  - fn je sync, radi u ThreadPoolExecutor (C ekstenzije bez GIL-a)
+        "process" - fn je sync top-level funkcija, radi u ProcessPoolExecutor
+    workers: broj paralelnih radnika faze
+    batch_size > 1: fn dobija listu itema (do batch_size, čeka najviše
+        batch_timeout_s) i vraća listu rezultata iste dužine
+    queue_size: kapacitet ulaznog reda (backpressure prema prethodnoj fazi)
+    """
+
+    EXECUTORS = ("async", "thread", "process")
+
+    def __init__(
+            self,
+            name: str,
+            fn: Callable,
+            workers: int = 1,
+            executor: str = "async",
+            queue_size: int = 32,
+            batch_size: int = 1,
+            batch_timeout_s: float = 0.05
+    ):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Nepoznat executor '{executor}' (dozvoljeno: {self.EXECUTORS})")
+        if executor == "async" and not inspect.iscoroutinefunction(fn):
+            raise ValueError(f"Faza '{name}': executor 'async' zahtijeva coroutine funkciju")
+
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.executor = executor
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_timeout_s = batch_timeout_s
+        self.metrics = StageMetrics()
+
+
+class StageMetrics:
+    """Brojači faze + latencija zadnjih N obrada"""
+
+    def __init__(self, window: int = 512):
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.busy_s = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, seconds: float, items: int):
+        self.processed += items
+        self.busy_s += seconds
+        per_item = seconds / max(items, 1)
+        self.latencies.extend([per_item] * items)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.latencies)
+        p50 = ordered[len(ordered) // 2] if ordered else 0.0
+        p95 = ordered[int(len(ordered) * 0.95)] if ordered else 0.0
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "busy_s": round(self.busy_s, 3),
+            "latency_p50_ms": round(p50 * 1000, 2),
+            "latency_p95_ms": round(p95 * 1000, 2)
+        }
+
+
+class Pipeline:
+    """
+    Faze povezane ograničenim asyncio redovima:
+
+        source → [q0] → faza 0 → [q1] → faza 1 → ... → izlaz
+
+    - svaka faza ima svoje radnike i tip executora, pa CPU faze (dekodiranje,
+      inferencija) teku paralelno sa I/O fazama (baza, disk)
+    - pun red blokira prethodnu fazu (backpressure) - memorija je ograničena
+    - sa workers > 1 redoslijed izlaza nije garantovan
+    - greška u fazi: item se odbacuje, poziva se on_error(stage, item, exc)
+    """
+
+    def __init__(
+            self,
+            stages: List[Stage],
+            on_error: Optional[Callable[[str, Any, Exception], None]] = None,
+            output_queue_size: int = 64
+    ):
+        if not stages:
+            raise ValueError("Pipeline mora imati bar jednu fazu")
+        self.stages = stages
+        self.on_error = on_error
+        self.output_queue_size = output_queue_size
+        self._queues: List[asyncio.Queue] = []
+        self._pools = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # Pokretanje
+    # ------------------------------------------------------------------
+    async def stream(self, source) -> AsyncIterator[Any]:
+        """
+        Pokreće pipeline i vraća rezultate zadnje faze kako stižu
+        source: IPerceptionSource, async iterator ili običan iterable
+        """
+        self._queues = [asyncio.Queue(maxsize=s.queue_size) for s in self.stages]
+        self._queues.append(asyncio.Queue(maxsize=self.output_queue_size))
+        self._create_pools()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+        tasks = [asyncio.create_task(self._feed(source))]
+        for i, stage in enumerate(self.stages):
+            tasks.append(asyncio.create_task(self._run_stage(i, stage)))
+
+        output = self._queues[-1]
+        try:
+            while True:
+                item = await output.get()
+                if item is _STOP:
+                    break
+                yield item
+            # Propagiraj eventualnu grešku izvora/faze
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._shutdown_pools()
+            self.finished_at = time.perf_counter()
+
+    async def run(self, source) -> int:
+        """Pokreće pipeline do kraja izvora; vraća broj izlaznih itema"""
+        count = 0
+        async for _ in self.stream(source):
+            count += 1
+        return count
+
+    # ------------------------------------------------------------------
+    # Metrike
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        """Dubina reda, latencija i protok po fazi"""
+        end = self.finished_at or time.perf_counter()
+        wall = (end - self.started_at) if self.started_at else 0.0
+        stages = {}
+        for i, stage in enumerate(self.stages):
+            snapshot = stage.metrics.snapshot()
+            snapshot.update({
+                "workers": stage.workers,
+                "executor": stage.executor,
+                "queue_depth": self._queues[i].qsize() if self._queues else 0,
+                "queue_max": stage.queue_size,
+                "per_s": round(snapshot["processed"] / wall, 1) if wall else 0.0,
+                # udio vremena u kojem su radnici faze bili zauzeti
+                "utilization": round(stage.metrics.busy_s / (wall * stage.workers), 3) if wall else 0.0
+            })
+            stages[stage.name] = snapshot
+        return {"wall_s": round(wall, 3), "stages": stages}
+
+    # ------------------------------------------------------------------
+    # Interno
+    # ------------------------------------------------------------------
+    async def _feed(self, source):
+        first = self._queues[0]
+        try:
+            async for item in self._iterate(source):
+                await first.put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                await first.put(_STOP)
+
+    @staticmethod
+    async def _iterate(source):
+        if isinstance(source, IPerceptionSource):
+            while True:
+                percept = await source.get_next_percept()
+                if percept is None:
+                    return
+                yield percept
+        elif hasattr(source, "__aiter__"):
+            async for item in source:
+                yield item
+        else:
+            for item in source:
+                yield item
+
+    async def _run_stage(self, index: int, stage: Stage):
+        inbox, outbox = self._queues[index], self._queues[index + 1]
+        workers = [
+            asyncio.create_task(self._worker(stage, inbox, outbox))
+            for _ in range(stage.workers)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # Svi radnici završili → zatvori sljedeću fazu
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            for _ in range(next_workers):
+                await outbox.put(_STOP)
+
+    async def _worker(self, stage: Stage, inbox: asyncio.Queue, outbox: asyncio.Queue):
+        while True:
+            batch, stopped = await self._take(stage, inbox)
+            if batch:
+                for result in await self._process(stage, batch):
+                    if result is None:
+                        stage.metrics.dropped += 1
+                    else:
+                        await outbox.put(result)
+            if stopped:
+                return
+
+    @staticmethod
+    async def _take(stage: Stage, inbox: asyncio.Queue):
+        """Jedan item ili batch (do batch_size / batch_timeout_s)"""
+        item = await inbox.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        if stage.batch_size <= 1:
+            return batch, False
+
+        deadline = time.perf_counter() + stage.batch_timeout_s
+        while len(batch) < stage.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(inbox.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _process(self, stage: Stage, batch: list) -> list:
+        payload = batch if stage.batch_size > 1 else batch[0]
+        stage.metrics.in_flight += len(batch)
+        started = time.perf_counter()
+        try:
+            if stage.executor == "async":
+                result = await stage.fn(payload)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._pools[stage.name], stage.fn, payload)
+        except Exception as e:
+            stage.metrics.failed += len(batch)
+            if self.on_error:
+                self.on_error(stage.name, payload, e)
+            else:
+                print(f"❌ Pipeline faza '{stage.name}': {e}")
+            return []
+        finally:
+            stage.metrics.in_flight -= len(batch)
+
+        stage.metrics.record(time.perf_counter() - started, len(batch))
+        return list(result) if stage.batch_size > 1 else [result]
+
+    def _create_pools(self):
+        for stage in self.stages:
+            if stage.executor == "thread":
+                self._pools[stage.name] = ThreadPoolExecutor(
+                    stage.workers, thread_name_prefix=f"stage-{stage.name}"
+                )
+            elif stage.executor == "process":
+                self._pools[stage.name] = ProcessPoolExecutor(stage.workers)
+
+    def _shutdown_pools(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._pools = {}
+
+
+# ----------------------------------------------------------------------
+# Adapteri: interfejsi agenta kao faze
+# ----------------------------------------------------------------------
+def policy_stage(name: str, policy: IPolicy, workers: int = 1, executor: str = "thread", **kwargs) -> Stage:
+    """THINK: IPolicy.decide (sync) - po defaultu u thread pool-u"""
+    return Stage(name, policy.decide, workers=workers, executor=executor, **kwargs)
+
+
+def actuator_stage(name: str, actuator: IActuator, workers: int = 1, **kwargs) -> Stage:
+    """ACT: IActuator.execute (async)"""
+    return Stage(name, actuator.execute, workers=workers, executor="async", **kwargs)
+
+
+def learning_stage(name: str, learner: ILearningComponent, **kwargs) -> Stage:
+    """LEARN: ILearningComponent.learn - rezultat prolazi dalje nepromijenjen"""
+    async def learn(result):
+        await learner.learn(result)
+        return result
+
+    return Stage(name, learn, executor="async", **kwargs)
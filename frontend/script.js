@@ -10,6 +10,7 @@ const API_OK_DETECTION = "http://localhost:8000/record_ok_detection";
 //API endpointi za učenje
 const API_LEARNING_STATS = "http://localhost:8000/learning_stats";
 const API_RETRAIN = "http://localhost:8000/retrain_model";
+const API_TRAINING_JOBS = "http://localhost:8000/training_jobs";
 
 
 // ------------------------------------------------------------------
@@ -21,6 +22,7 @@ let detectedDriver = null;
 let firstImagePath = null;
 let secondImagePath = null;
 let isOnReservation = false;
+let sessionId = null;
 
 // ------------------------------------------------------------------
 // LOADING SPINNER
@@ -110,6 +112,10 @@ async function analyzeFirstImage(file) {
         console.log("data.on_reservation:", data.on_reservation);
         console.log("════════════════════════════════════");
 
+        // Sesija veže zoom/potvrdu uz OVU prvu sliku
+        sessionId = data.session_id;
+        firstImagePath = data.slika1;
+
         await showFirstDetection(file);
         await drawDetectionsOnImage("canvas1", "firstImage", file);
 
@@ -124,6 +130,34 @@ async function analyzeFirstImage(file) {
             return;
         }
 
+        // Single-shot: tablica pročitana već sa prve slike - nema zoom koraka
+        if (data.status === "READY_TO_CONFIRM") {
+            currentViolationId = data.prekrsaj_id;
+            isOnReservation = data.on_reservation || false;
+            detectedDriver = data.vozac;
+            secondImagePath = null;
+
+            showMessage(data.message, "orange");
+            showDriverCard(
+                data.vozac,
+                data.prekrsaj_opis,
+                data.prekrsaj_kazna
+            );
+            enableConfirmButtons();
+            return;
+        }
+
+        if (data.status === "OK_WITH_RESERVATION") {
+            showMessage(data.message, "green");
+            showDriverCard(
+                data.vozac,
+                "Parkiranje na rezervaciji",
+                "0 (Dozvoljeno)"
+            );
+            enableConfirmButtons();
+            return;
+        }
+
         console.log("⚠️ Status nije OK, provjeravam NEEDS_ZOOM...");
         console.log("Uslov 1:", data.status === "NEEDS_ZOOM");
         console.log("Uslov 2:", data.status === "NeedsZoom");
@@ -204,8 +238,8 @@ async function analyzeFirstImage(file) {
 async function analyzeZoomImage(file) {
     const formData = new FormData();
     formData.append("file", file);
-    formData.append("on_reservation", isOnReservation);
-    formData.append("prekrsaj_id", currentViolationId);
+    // prekrsaj_id/on_reservation server pamti u sesiji analize
+    formData.append("session_id", sessionId);
 
     showSpinner();
 
@@ -283,7 +317,8 @@ async function confirmViolation() {
 
         try {
             const formData = new FormData();
-            formData.append("image_path", "backend/uploads/first_image.jpg");
+            formData.append("session_id", sessionId);
+            formData.append("image_path", firstImagePath);
 
             let res = await fetch(API_OK_DETECTION, {
                 method: 'POST',
@@ -313,7 +348,8 @@ async function confirmViolation() {
         vozac_id: detectedDriver.vozac_id,
         prekrsaj_id: currentViolationId,
         slika1: firstImagePath,
-        slika2: secondImagePath
+        slika2: secondImagePath,
+        session_id: sessionId
     };
 
     console.log("Payload:", payload);
@@ -354,7 +390,8 @@ async function rejectViolation() {
     try {
         // UVIJEK šalji first image (čak i ako ima second)
         const formData = new FormData();
-        formData.append("image_path", firstImagePath || "backend/uploads/first_image.jpg");
+        formData.append("session_id", sessionId);
+        formData.append("image_path", firstImagePath);
 
         // Ako ima i second image, pošalji i njega
         if (secondImagePath) {
@@ -421,6 +458,9 @@ function resetUI() {
     state = "FIRST";
     currentViolationId = null;
     detectedDriver = null;
+    sessionId = null;
+    firstImagePath = null;
+    secondImagePath = null;
 
     document.getElementById("resultsText").innerHTML = "<p>Još nema rezultata.</p>";
 
@@ -601,28 +641,100 @@ async function triggerRetraining() {
         return;
     }
 
-    showSpinner();
-
     try {
         let res = await fetch(API_RETRAIN, { method: "POST" });
         let data = await res.json();
 
-        hideSpinner();
-
-        if (data.status === "SUCCESS") {
-            alert(`✅ ${data.message}\n\nPoboljšanje: +${(data.improvement * 100).toFixed(1)}%`);
-        } else if (data.status === "NO_IMPROVEMENT") {
-            alert(`⚠️ ${data.message}`);
-        } else {
+        if (res.status === 409) {
+            // Retraining je već u toku - prati postojeći posao
+            followTrainingJob(data.detail.job_id);
+            return;
+        }
+        if (!data.job_id) {
             alert(`ℹ️ ${data.message}`);
+            return;
         }
 
-        // Osvježi statistiku
-        checkLearningStats();
+        followTrainingJob(data.job_id);
     } catch (err) {
-        hideSpinner();
         console.error("Greška pri retrainingu:", err);
-        alert("Greška prilikom retraininga modela.");
+        alert("Greška prilikom pokretanja retraininga modela.");
+    }
+}
+
+// ------------------------------------------------------------------
+// LEARNING SYSTEM - Napredak retraining posla (SSE)
+// ------------------------------------------------------------------
+function followTrainingJob(jobId) {
+    let btn = document.getElementById("retrainBtn");
+    if (btn) {
+        btn.disabled = true;
+    }
+
+    let source = new EventSource(`${API_TRAINING_JOBS}/${jobId}/events`);
+
+    source.onmessage = (msg) => {
+        let event = JSON.parse(msg.data);
+
+        if (event.type === "phase") {
+            showTrainingProgress(`⏳ Faza: <b>${event.phase}</b>`);
+        } else if (event.type === "epoch") {
+            let map50 = event.metrics["metrics/mAP50(B)"];
+            showTrainingProgress(
+                `🏋️ Epoha <b>${event.epoch}/${event.epochs}</b>` +
+                (map50 !== undefined ? ` - mAP50: <b>${map50.toFixed(3)}</b>` : "") +
+                ` - ${Math.round(event.stopper.elapsed_s / 60)} min`
+            );
+        } else if (event.type === "benchmark") {
+            showTrainingProgress(
+                `⚙️ Batch <b>${event.batch}</b>, niti <b>${event.threads}</b>` +
+                (event.processes > 1 ? `, procesa <b>${event.processes}</b>` : "")
+            );
+        } else if (event.type === "scaling") {
+            showTrainingProgress(
+                `📊 ${event.processes} procesa: <b>${event.images_per_s}</b> slika/s` +
+                (event.efficiency !== null ? ` - efikasnost <b>${(event.efficiency * 100).toFixed(0)}%</b>` : "")
+            );
+        } else if (event.type === "early_stop") {
+            showTrainingProgress(`⏹️ Rano zaustavljanje (<b>${event.reason}</b>) nakon epohe ${event.epoch}`);
+        } else if (event.type === "resume") {
+            showTrainingProgress(`♻️ Nastavak prekinutog treninga <b>${event.name}</b>`);
+        } else if (event.type === "done") {
+            source.close();
+            showTrainingResult(event.result);
+            checkLearningStats();
+        }
+    };
+
+    source.onerror = () => {
+        // Veza prekinuta - EventSource se sam ponovo spaja; ako je posao gotov, zatvori
+        fetch(`${API_TRAINING_JOBS}/${jobId}`)
+            .then(res => res.json())
+            .then(job => {
+                if (job.result) {
+                    source.close();
+                    showTrainingResult(job.result);
+                    checkLearningStats();
+                }
+            })
+            .catch(() => {});
+    };
+}
+
+function showTrainingProgress(html) {
+    let info = document.getElementById("learningInfo");
+    if (info) {
+        info.innerHTML = html;
+    }
+}
+
+function showTrainingResult(result) {
+    if (result.status === "Success") {
+        alert(`✅ ${result.message}\n\nPoboljšanje: +${(result.improvement * 100).toFixed(1)}%`);
+    } else if (result.status === "NoImprovement" || result.status === "Cancelled") {
+        alert(`⚠️ ${result.message}`);
+    } else {
+        alert(`ℹ️ ${result.message}`);
     }
 }
 
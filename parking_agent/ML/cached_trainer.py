@@ -0,0 +1,164 @@
+"""
+ML sloj - Cached Trainer
+Ultralytics trainer/validator koji slike i labele čitaju iz DatasetCache
+(bez dekodiranja JPEG-a po epohi i bez ponovne verifikacije labela)
+"""
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional
+import sys
+
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer, DetectionValidator
+from ultralytics.utils import colorstr
+
+sys.path.append('..')
+from parking_agent.ML.dataset_cache import DatasetCache
+
+
+class CachedYOLODataset(YOLODataset):
+    """
+    YOLODataset sa unaprijed popunjenim ims / im_hw0 / im_hw
+
+    - get_labels: labele iz keša (preskače PIL verifikaciju svake slike,
+      koja se inače ponavlja jer je svaki snapshot novi folder)
+    - slike: memmap view iz keša; load_image ih vraća direktno, pa se
+      JPEG ne dekodira ni u jednoj epohi
+    - slika koje nema u kešu → standardni Ultralytics put za cijeli dataset
+    - cache_labels=False: labele iz .txt fajlova (npr. pseudo-labele učitelja),
+      slike i dalje iz keša
+    """
+
+    def __init__(self, *args, dataset_cache: DatasetCache, cache_labels: bool = True, **kwargs):
+        self.dataset_cache = dataset_cache
+        self.cache_labels = cache_labels
+        self._hashes: Dict[str, str] = {}
+        super().__init__(*args, **kwargs)
+        self._prefill()
+
+    def get_labels(self) -> List[dict]:
+        self._hashes = _file_hashes(self.im_files)
+        if not all(h in self.dataset_cache for h in self._hashes.values()):
+            missing = sum(h not in self.dataset_cache for h in self._hashes.values())
+            print(f"⚠️ {missing} slika nije u keširanom datasetu - standardno učitavanje")
+            self._hashes = {}
+            return super().get_labels()
+        if not self.cache_labels:
+            return super().get_labels()
+
+        labels = []
+        for im_file in self.im_files:
+            image_hash = self._hashes[im_file]
+            rows = self.dataset_cache.labels(image_hash)
+            labels.append({
+                "im_file": im_file,
+                "shape": self.dataset_cache.original_shape(image_hash),
+                "cls": rows[:, 0:1].copy(),
+                "bboxes": rows[:, 1:5].copy(),
+                "segments": [],
+                "keypoints": None,
+                "normalized": True,
+                "bbox_format": "xywh"
+            })
+        return labels
+
+    def _prefill(self):
+        if not self._hashes:
+            return
+        for i, im_file in enumerate(self.im_files):
+            image_hash = self._hashes.get(im_file)
+            if image_hash is None:
+                continue
+            image = self.dataset_cache.get_key(image_hash)
+            self.ims[i] = image
+            self.im_hw0[i] = self.dataset_cache.original_shape(image_hash)
+            self.im_hw[i] = image.shape[:2]
+
+
+def _file_hashes(im_files: List[str]) -> Dict[str, str]:
+    """
+    Putanja slike → sha256
+    Snapshot ima snapshot.json (ime → sha256); inače se hashira sadržaj
+    """
+    hashes, indexes = {}, {}
+    for im_file in im_files:
+        snapshot_index = os.path.join(os.path.dirname(os.path.dirname(im_file)), "snapshot.json")
+        if snapshot_index not in indexes:
+            indexes[snapshot_index] = _read_index(snapshot_index)
+        entry = indexes[snapshot_index].get(os.path.basename(im_file))
+        if entry:
+            hashes[im_file] = entry["sha256"]
+        else:
+            with open(im_file, "rb") as f:
+                hashes[im_file] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def _read_index(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _build_cached_dataset(cfg, img_path: str, batch: Optional[int], data: dict, mode: str,
+                          stride: int, dataset_cache: DatasetCache,
+                          cache_labels: bool = True) -> CachedYOLODataset:
+    """Isti argumenti kao ultralytics build_yolo_dataset, ali CachedYOLODataset"""
+    if cfg.imgsz != dataset_cache.imgsz:
+        raise ValueError(f"DatasetCache imgsz={dataset_cache.imgsz}, trening imgsz={cfg.imgsz}")
+    return CachedYOLODataset(
+        dataset_cache=dataset_cache,
+        cache_labels=cache_labels,
+        img_path=img_path,
+        imgsz=cfg.imgsz,
+        batch_size=batch,
+        augment=mode == "train",
+        hyp=cfg,
+        rect=cfg.rect or mode == "val",
+        cache=None,
+        single_cls=cfg.single_cls or False,
+        stride=int(stride),
+        pad=0.0 if mode == "train" else 0.5,
+        prefix=colorstr(f"{mode}: "),
+        task=cfg.task,
+        classes=cfg.classes,
+        data=data,
+        fraction=cfg.fraction if mode == "train" else 1.0
+    )
+
+
+class CachedDetectionTrainer(DetectionTrainer):
+    """
+    DetectionTrainer čiji train/val dataset dolazi iz DatasetCache
+    Koristi se kao model.train(trainer=partial(CachedDetectionTrainer, dataset_cache=...))
+    """
+
+    def __init__(self, *args, dataset_cache: Optional[DatasetCache] = None, cache_labels: bool = True, **kwargs):
+        self.dataset_cache = dataset_cache
+        self.cache_labels = cache_labels
+        super().__init__(*args, **kwargs)
+
+    def build_dataset(self, img_path, mode="train", batch=None):
+        if self.dataset_cache is None:
+            return super().build_dataset(img_path, mode, batch)
+        model = getattr(self.model, "module", self.model)
+        stride = max(int(model.stride.max()) if model is not None and hasattr(model, "stride") else 0, 32)
+        # Validacija uvijek na ground truth labelama iz keša
+        cache_labels = self.cache_labels or mode != "train"
+        return _build_cached_dataset(self.args, img_path, batch, self.data, mode, stride,
+                                     self.dataset_cache, cache_labels)
+
+
+class CachedDetectionValidator(DetectionValidator):
+    """Samostalna validacija (model.val) nad DatasetCache"""
+
+    def __init__(self, *args, dataset_cache: Optional[DatasetCache] = None, **kwargs):
+        self.dataset_cache = dataset_cache
+        super().__init__(*args, **kwargs)
+
+    def build_dataset(self, img_path, mode="val", batch=None):
+        if self.dataset_cache is None:
+            return super().build_dataset(img_path, mode, batch)
+        return _build_cached_dataset(self.args, img_path, batch, self.data, mode, self.stride, self.dataset_cache)
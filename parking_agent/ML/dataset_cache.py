@@ -0,0 +1,258 @@
+"""
+ML sloj - Dataset Cache
+Perzistentni keš trening slika: dekodirano + smanjeno na imgsz JEDNOM,
+memory-mapped za trening i evaluaciju; raste inkrementalno (append-only)
+"""
+import os
+import time
+import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+import sys
+
+import numpy as np
+
+sys.path.append('..')
+from parking_agent.ML.image_cache import load_resized
+
+LABEL_COLUMNS = 5  # cls, cx, cy, w, h (YOLO, normalizovano)
+
+
+class DatasetCache:
+    """
+    <root>/<imgsz>/
+        images.bin - slike jedna za drugom (uint8, HWC, BGR, duža stranica = imgsz)
+        labels.bin - YOLO labele (float32, redovi po 5)
+        index.db   - sha256 slike → offset, oblik, originalne dimenzije, offset labela
+
+    - ključ je sha256 slike (kao BlobStore) - ista slika u confirmed/snapshot/
+      arhivi je jedan zapis
+    - fajlovi su append-only; upis je serijalizovan SQLite zaključavanjem
+      (web proces i proces treninga mogu dodavati istovremeno)
+    - promijenjene labele se dopisuju, a indeks pokazuje na novi offset
+    - čitanje je copy-on-write memmap: augmentacije mogu mijenjati sliku
+      "u mjestu" bez diranja fajla
+    """
+
+    def __init__(self, root: str = "backend/dataset_cache", imgsz: int = 640):
+        self.base_root = root
+        self.imgsz = imgsz
+        self.root = os.path.join(root, str(imgsz))
+        os.makedirs(self.root, exist_ok=True)
+        self.images_path = os.path.join(self.root, "images.bin")
+        self.labels_path = os.path.join(self.root, "labels.bin")
+        self.db_path = os.path.join(self.root, "index.db")
+        for path in (self.images_path, self.labels_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                image_hash TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                width INTEGER NOT NULL,
+                channels INTEGER NOT NULL,
+                orig_height INTEGER NOT NULL,
+                orig_width INTEGER NOT NULL,
+                label_offset INTEGER NOT NULL,
+                label_count INTEGER NOT NULL,
+                label_hash TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+        self._entries: Dict[str, tuple] = {}
+        self._images: Optional[np.memmap] = None
+        self._labels: Optional[np.memmap] = None
+        self.refresh()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=60)
+
+    # ===================================
+    # PISANJE
+    # ===================================
+    def add(self, image_hash: str, image_path: str, label_path: Optional[str] = None) -> bool:
+        """Dodaje jednu sliku (ili nove labele postojeće); True ako je nešto upisano"""
+        return sum(self.sync([(image_hash, image_path, label_path)], workers=1).values()) > 0
+
+    def sync(
+            self,
+            items: Iterable[Tuple[str, str, Optional[str]]],
+            workers: int = 8,
+            chunk: int = 64
+    ) -> dict:
+        """
+        Dovodi keš u sklad sa datasetom: (sha256, putanja slike, putanja labela)
+        Dekodira samo slike kojih nema; za postojeće provjerava samo labele.
+        """
+        known = self._index_rows()
+        new_items, relabeled = [], []
+        for image_hash, image_path, label_path in items:
+            labels, label_hash = _read_labels(label_path)
+            if image_hash not in known:
+                new_items.append((image_hash, image_path, labels, label_hash))
+                known[image_hash] = label_hash
+            elif known[image_hash] != label_hash:
+                relabeled.append((image_hash, labels, label_hash))
+                known[image_hash] = label_hash
+
+        added = 0
+        if new_items:
+            with ThreadPoolExecutor(max(1, workers)) as pool:
+                for start in range(0, len(new_items), chunk):
+                    batch = new_items[start:start + chunk]
+                    # Dekodiranje van zaključavanja - upis je kratak
+                    loaded = list(pool.map(lambda item: load_resized(item[1], self.imgsz), batch))
+                    added += self._write(
+                        (image_hash, image, original, labels, label_hash)
+                        for (image_hash, _, labels, label_hash), (image, original) in zip(batch, loaded)
+                        if image is not None
+                    )
+        if relabeled:
+            self._write_labels(relabeled)
+
+        if added or relabeled:
+            self.refresh()
+        return {"added": added, "relabeled": len(relabeled)}
+
+    def _write(self, rows) -> int:
+        conn = self._connect()
+        count = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")  # zaključava upis i između procesa
+            with open(self.images_path, "ab") as images_file, open(self.labels_path, "ab") as labels_file:
+                images_file.seek(0, os.SEEK_END)
+                labels_file.seek(0, os.SEEK_END)
+                for image_hash, image, original, labels, label_hash in rows:
+                    # Drugi proces ju je možda upisao u međuvremenu
+                    if conn.execute("SELECT 1 FROM entries WHERE image_hash = ?", (image_hash,)).fetchone():
+                        continue
+                    offset = images_file.tell()
+                    images_file.write(image.tobytes())
+                    label_offset = _align_labels(labels_file)
+                    labels_file.write(labels.tobytes())
+                    h, w, c = image.shape
+                    conn.execute(
+                        "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (image_hash, offset, h, w, c, original[0], original[1],
+                         label_offset, len(labels), label_hash, time.time())
+                    )
+                    count += 1
+            conn.commit()
+        finally:
+            conn.close()
+        return count
+
+    def _write_labels(self, rows: List[tuple]) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            with open(self.labels_path, "ab") as labels_file:
+                labels_file.seek(0, os.SEEK_END)
+                for image_hash, labels, label_hash in rows:
+                    label_offset = _align_labels(labels_file)
+                    labels_file.write(labels.tobytes())
+                    conn.execute(
+                        "UPDATE entries SET label_offset = ?, label_count = ?, label_hash = ? WHERE image_hash = ?",
+                        (label_offset, len(labels), label_hash, image_hash)
+                    )
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ===================================
+    # ČITANJE
+    # ===================================
+    def refresh(self) -> None:
+        """Ponovo učitava indeks i memmap (nakon upisa drugog procesa)"""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT image_hash, offset, height, width, channels, orig_height, orig_width, "
+            "label_offset, label_count FROM entries"
+        ).fetchall()
+        conn.close()
+        self._entries = {row[0]: row[1:] for row in rows}
+        self._images = _memmap(self.images_path, np.uint8)
+        self._labels = _memmap(self.labels_path, np.float32)
+
+    def __contains__(self, image_hash: str) -> bool:
+        return image_hash in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_key(self, image_hash: str) -> np.ndarray:
+        """Smanjena slika (h, w, c) kao memmap view - bez dekodiranja i kopiranja"""
+        offset, h, w, c = self._entries[image_hash][:4]
+        return self._images[offset:offset + h * w * c].reshape(h, w, c)
+
+    def original_shape(self, image_hash: str) -> Tuple[int, int]:
+        _, _, _, _, orig_h, orig_w, _, _ = self._entries[image_hash]
+        return orig_h, orig_w
+
+    def labels(self, image_hash: str) -> np.ndarray:
+        """YOLO labele (n, 5): cls, cx, cy, w, h"""
+        label_offset, label_count = self._entries[image_hash][6:8]
+        flat = self._labels[label_offset * LABEL_COLUMNS:(label_offset + label_count) * LABEL_COLUMNS]
+        return np.asarray(flat).reshape(-1, LABEL_COLUMNS)
+
+    def stats(self) -> dict:
+        return {
+            "imgsz": self.imgsz,
+            "images": len(self._entries),
+            "images_bytes": os.path.getsize(self.images_path),
+            "labels_bytes": os.path.getsize(self.labels_path)
+        }
+
+    def _index_rows(self) -> Dict[str, str]:
+        conn = self._connect()
+        rows = conn.execute("SELECT image_hash, label_hash FROM entries").fetchall()
+        conn.close()
+        return dict(rows)
+
+    def __getstate__(self):
+        # Proces (spawn) ne dobija kopiju memmap-a - otvara fajlove sam
+        state = self.__dict__.copy()
+        state["_images"] = state["_labels"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.refresh()
+
+
+def _align_labels(labels_file) -> int:
+    """Indeks sljedećeg reda labela (prekinut upis može ostaviti nepotpun red)"""
+    row_bytes = 4 * LABEL_COLUMNS
+    pad = -labels_file.tell() % row_bytes
+    if pad:
+        labels_file.write(b"\0" * pad)
+    return labels_file.tell() // row_bytes
+
+
+def _memmap(path: str, dtype) -> Optional[np.memmap]:
+    size = os.path.getsize(path) // np.dtype(dtype).itemsize
+    if size == 0:
+        return None
+    return np.memmap(path, dtype=dtype, mode="c", shape=(size,))
+
+
+def _read_labels(label_path: Optional[str]) -> Tuple[np.ndarray, str]:
+    """YOLO label fajl → (n, 5) float32 + hash sadržaja"""
+    data = b""
+    if label_path and os.path.exists(label_path):
+        with open(label_path, "rb") as f:
+            data = f.read()
+    rows = [
+        [float(v) for v in line.split()]
+        for line in data.decode().splitlines()
+        if len(line.split()) == LABEL_COLUMNS
+    ]
+    labels = np.array(rows, dtype=np.float32).reshape(-1, LABEL_COLUMNS)
+    return labels, hashlib.sha256(data).hexdigest()[:16]
@@ -0,0 +1,250 @@
+"""
+ML sloj - Distillation
+Manji student detektor uči iz učitelja (trenutni best.pt): ground truth +
+pseudo-labele učitelja; student služi brzu detekciju na CPU-u
+"""
+import os
+import json
+import time
+import shutil
+from functools import partial
+from typing import Dict, List, Optional
+import sys
+
+sys.path.append('..')
+from parking_agent.ML.training_process import YoloTrainingProcess
+
+PSEUDO_LABEL_CONF = 0.5
+
+
+def merge_pseudo_labels(ground_truth: List[list], predictions: List[list], conf: float = PSEUDO_LABEL_CONF,
+                        iou_threshold: float = 0.5) -> List[list]:
+    """
+    Labele studenta: ground truth [cls, x1, y1, x2, y2] + sigurne detekcije učitelja
+    [cls, conf, x1, y1, x2, y2] koje se ne poklapaju ni sa jednim GT boxom iste klase
+    (objekti koje oficir nije označio, a učitelj ih vidi)
+    """
+    labels = [list(gt) for gt in ground_truth]
+    for cls_id, score, *box in predictions:
+        if score < conf:
+            continue
+        if any(gt[0] == cls_id and _box_iou(box, gt[1:]) >= iou_threshold for gt in ground_truth):
+            continue
+        labels.append([cls_id, *box])
+    return labels
+
+
+def _box_iou(a: list, b: list) -> float:
+    w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = w * h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def write_distillation_dataset(run_dir: str, train: List[dict], val: List[dict],
+                               labels: Dict[str, List[list]], names: Dict[int, str]) -> str:
+    """
+    <run_dir>/images/<sha256><ext> - linkovi na originalne slike (train)
+    <run_dir>/labels/<sha256>.txt  - GT + pseudo-labele (YOLO format)
+    snapshot.json (ime → sha256) - CachedYOLODataset čita slike iz keša
+    Validacija ostaje na originalnim slikama i ground truth labelama
+    Vraća putanju data.yaml
+    """
+    import yaml
+
+    images_dir = os.path.join(run_dir, "images")
+    labels_dir = os.path.join(run_dir, "labels")
+    os.makedirs(images_dir, exist_ok=True)
+    os.makedirs(labels_dir, exist_ok=True)
+
+    index, train_paths = {}, []
+    for item in train:
+        name = item["image_hash"] + os.path.splitext(item["image_path"])[1]
+        link_path = os.path.join(images_dir, name)
+        if not os.path.exists(link_path):
+            try:
+                os.symlink(os.path.abspath(item["image_path"]), link_path)
+            except OSError:
+                shutil.copy(item["image_path"], link_path)
+        with open(os.path.join(labels_dir, item["image_hash"] + ".txt"), "w") as f:
+            for cls_id, x1, y1, x2, y2 in labels[item["image_hash"]]:
+                f.write(f"{int(cls_id)} {(x1 + x2) / 2:.6f} {(y1 + y2) / 2:.6f} {x2 - x1:.6f} {y2 - y1:.6f}\n")
+        index[name] = {"sha256": item["image_hash"]}
+        train_paths.append(os.path.abspath(link_path))
+
+    with open(os.path.join(run_dir, "snapshot.json"), "w") as f:
+        json.dump(index, f)
+    with open(os.path.join(run_dir, "train.txt"), "w") as f:
+        f.writelines(path + "\n" for path in train_paths)
+    with open(os.path.join(run_dir, "val.txt"), "w") as f:
+        f.writelines(os.path.abspath(item["image_path"]) + "\n" for item in val)
+
+    config_path = os.path.join(os.path.abspath(run_dir), "data.yaml")
+    with open(config_path, "w") as f:
+        yaml.dump({
+            "path": os.path.abspath(run_dir),
+            "train": "train.txt",
+            "val": "val.txt",
+            "nc": len(names),
+            "names": [names[i] for i in sorted(names)]
+        }, f)
+    return config_path
+
+
+def measure_latency(weights_path: str, images: list, imgsz: int) -> Optional[float]:
+    """Medijan ms po slici (jedna slika po pozivu - kao detekcija uživo)"""
+    if not images:
+        return None
+    from ultralytics import YOLO
+
+    model = YOLO(weights_path)
+    model.predict(images[0], imgsz=imgsz, verbose=False)  # zagrijavanje
+    timings = []
+    for image in images:
+        started = time.perf_counter()
+        model.predict(image, imgsz=imgsz, verbose=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return round(timings[len(timings) // 2], 2)
+
+
+def _distill_worker(
+        teacher_path: str,
+        student_init: str,
+        run_dir: str,
+        evaluation_db_path: str,
+        dataset_cache_dir: str,
+        train_kwargs: dict,
+        events,
+        budget=None,
+        conf: float = PSEUDO_LABEL_CONF,
+        latency_images: int = 20
+):
+    """
+    Ulazna tačka procesa destilacije (top-level - spawn)
+
+    1. keš slika (DatasetCache) za selection.json iz run_dir-a
+    2. predikcije učitelja na train slikama (ModelEvaluator - keširane po slici)
+    3. GT + pseudo-labele → dataset studenta
+    4. trening studenta (BudgetStopper, slike iz keša, labele iz .txt)
+    5. učitelj i student na ISTOM val skupu (GT) + latencija po slici
+
+    Događaji kao _train_worker; na kraju
+        {"type": "result", "best_path", "student_metrics", "teacher_metrics", "latency", "pseudo_labels"}
+    """
+    try:
+        from ultralytics import YOLO
+        from parking_agent.ML.evaluation import ModelEvaluator, load_selection
+        from parking_agent.ML.yolo_classifier import YoloClassifier
+        from parking_agent.ML.dataset_cache import DatasetCache
+        from parking_agent.ML.cached_trainer import CachedDetectionTrainer
+        from parking_agent.ML.training_budget import TrainingBudget, BudgetStopper
+        from parking_agent.infrastructure.evaluation_store import EvaluationStore
+
+        budget = budget or TrainingBudget()
+        stopper = BudgetStopper(budget)
+        imgsz = train_kwargs.get("imgsz", 640)
+        train = load_selection(run_dir, splits=("train",))
+        val = load_selection(run_dir, splits=("val",))
+
+        events.put({"type": "phase", "phase": "cache"})
+        dataset_cache = DatasetCache(dataset_cache_dir, imgsz)
+        synced = dataset_cache.sync([(d["image_hash"], d["image_path"], d["label_path"]) for d in train + val])
+        events.put({"type": "cache", **synced, "cached_images": len(dataset_cache)})
+
+        # Predikcije učitelja - iste (keširane) kao za evaluaciju pri retrainingu
+        events.put({"type": "phase", "phase": "pseudo_labels"})
+        store = EvaluationStore(evaluation_db_path)
+        evaluator = ModelEvaluator(store, imgsz=imgsz, dataset_cache=dataset_cache)
+        evaluator.evaluate(teacher_path, train, progress=events.put)
+        predictions = store.get_predictions(
+            YoloClassifier.weights_hash(teacher_path), [d["image_hash"] for d in train]
+        )
+        labels = {
+            d["image_hash"]: merge_pseudo_labels(d["labels"], predictions.get(d["image_hash"], []), conf)
+            for d in train
+        }
+        pseudo = sum(len(labels[d["image_hash"]]) - len(d["labels"]) for d in train)
+        events.put({"type": "pseudo_labels", "images": len(train), "ground_truth": sum(len(d["labels"]) for d in train),
+                    "pseudo": pseudo})
+        config_path = write_distillation_dataset(run_dir, train, val, labels, YOLO(teacher_path).names)
+
+        model = YOLO(student_init)
+
+        def on_fit_epoch_end(trainer):
+            stopper(trainer)
+            events.put({
+                "type": "epoch",
+                "epoch": trainer.epoch + 1,
+                "epochs": trainer.epochs,
+                "metrics": {k: round(float(v), 5) for k, v in (trainer.metrics or {}).items()},
+                "stopper": stopper.state()
+            })
+            if stopper.reason:
+                events.put({"type": "early_stop", "reason": stopper.reason,
+                            "epoch": trainer.epoch + 1, "stopper": stopper.state()})
+
+        model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+
+        events.put({"type": "phase", "phase": "train"})
+        model.train(
+            trainer=partial(CachedDetectionTrainer, dataset_cache=dataset_cache, cache_labels=False),
+            data=config_path,
+            epochs=budget.max_epochs,
+            patience=budget.max_epochs,
+            **train_kwargs
+        )
+        best_path = str(model.trainer.best)
+
+        events.put({"type": "phase", "phase": "evaluate"})
+        reports = evaluator.evaluate_many({"student": best_path, "teacher": teacher_path}, val, progress=events.put)
+        sample = [dataset_cache.get_key(d["image_hash"]) for d in val[:latency_images] if d["image_hash"] in dataset_cache]
+        latency = {
+            "teacher_ms": measure_latency(teacher_path, sample, imgsz),
+            "student_ms": measure_latency(best_path, sample, imgsz)
+        }
+
+        events.put({
+            "type": "result",
+            "best_path": best_path,
+            "student_metrics": reports["student"],
+            "teacher_metrics": reports["teacher"],
+            "latency": latency,
+            "pseudo_labels": pseudo
+        })
+    except Exception as e:
+        events.put({"type": "error", "message": str(e)})
+
+
+class StudentDistillationProcess(YoloTrainingProcess):
+    """Destilacija u child procesu - isti red događaja i terminate() kao trening"""
+
+    process_name = "yolo-distillation"
+
+    def __init__(
+            self,
+            teacher_path: str,
+            student_init: str,
+            run_dir: str,
+            evaluation_db_path: str,
+            dataset_cache_dir: str,
+            budget=None,
+            conf: float = PSEUDO_LABEL_CONF,
+            **train_kwargs
+    ):
+        super().__init__(
+            teacher_path, os.path.join(run_dir, "data.yaml"), run_dir, evaluation_db_path,
+            dataset_cache_dir, budget=budget, **train_kwargs
+        )
+        self.student_init = student_init
+        self.conf = conf
+
+    def _target(self):
+        return _distill_worker
+
+    def _args(self) -> tuple:
+        return (
+            self.weights_path, self.student_init, self.dataset_dir, self.evaluation_db_path,
+            self.dataset_cache_dir, self.train_kwargs, self._events, self.budget, self.conf
+        )
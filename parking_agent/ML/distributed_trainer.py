@@ -0,0 +1,334 @@
+"""
+ML sloj - Distributed CPU Trainer
+Data-parallel fine-tuning na CPU-u: N procesa (gloo), svaki trenira na svom
+dijelu dataseta (DistributedSampler), gradijenti se usrednjavaju (DDP all-reduce)
+
+Opt-in (TrainingBudget.processes). Kao Ultralytics trener: isti dataset
+(CachedYOLODataset + augmentacije), loss, zamrznuti slojevi, EMA težine u
+checkpoint-u (validacija i best.pt nad EMA modelom). Razlike:
+- optimizer je uvijek AdamW sa lr0 (Ultralytics "auto" bira optimizer i lr)
+- nema warmup epoha (warmup_epochs / warmup_bias_lr se ignorišu)
+- nema AMP ni close_mosaic promjene augmentacije u zadnjim epohama
+Zato retraining sa više procesa ne prati isti put optimizacije kao jedan proces.
+"""
+import os
+import time
+import queue
+import tempfile
+import multiprocessing as mp
+from copy import deepcopy
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Optional
+import sys
+
+sys.path.append('..')
+
+
+def _ddp_worker(
+        rank: int,
+        world_size: int,
+        init_file: str,
+        weights_path: str,
+        config_path: str,
+        dataset_cache,
+        threads: int,
+        batch: int,
+        budget,
+        resume: Optional[dict],
+        train_kwargs: dict,
+        events,
+        results
+):
+    """
+    Jedan rank (top-level - spawn)
+
+    Svi rankovi: forward/backward nad svojim dijelom batch-a, DDP all-reduce
+    Rank 0: validacija, BudgetStopper, checkpoint (last.pt / best.pt), događaji
+    Odluka o zaustavljanju se broadcast-uje svim rankovima
+    """
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    import torch
+    import torch.distributed as dist
+    from torch.nn.parallel import DistributedDataParallel
+    from torch.utils.data import DataLoader, DistributedSampler
+    from ultralytics import YOLO, __version__
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data.utils import check_det_dataset
+    from ultralytics.utils.torch_utils import ModelEMA
+    from parking_agent.ML.cached_trainer import CachedDetectionValidator, _build_cached_dataset
+    from parking_agent.ML.training_budget import BudgetStopper, MAP50_KEY
+
+    torch.set_num_threads(threads)
+    dist.init_process_group(
+        "gloo", init_method=f"file://{init_file}", rank=rank, world_size=world_size,
+        # Rank 0 validira dok ostali čekaju na broadcast
+        timeout=timedelta(hours=2)
+    )
+    try:
+        resume = resume or {}
+        checkpoint = resume.get("checkpoint")
+        ckpt = torch.load(checkpoint, map_location="cpu", weights_only=False) if checkpoint else None
+        args = get_cfg(overrides={
+            **(ckpt["train_args"] if ckpt else train_kwargs),
+            "data": config_path, "batch": batch, "device": "cpu", "mode": "train"
+        })
+        data = check_det_dataset(config_path)
+        save_dir = os.path.join(args.project, args.name)
+        weights_dir = os.path.join(save_dir, "weights")
+        os.makedirs(weights_dir, exist_ok=True)
+        last_path, best_path = os.path.join(weights_dir, "last.pt"), os.path.join(weights_dir, "best.pt")
+
+        # Nastavak: sirove težine iz checkpoint-a ("model"), EMA posebno ("ema")
+        model = ckpt["model"].float() if ckpt else YOLO(weights_path).model.float()
+        model.nc, model.names, model.args = data["nc"], data["names"], args
+        # Zamrznuti slojevi kao u Ultralytics trenerima (+ DFL uvijek)
+        frozen = tuple(f"model.{i}." for i in range(args.freeze or 0))
+        for name, param in model.named_parameters():
+            param.requires_grad = not (name.startswith(frozen) or ".dfl" in name)
+        model.train()
+        ddp_model = DistributedDataParallel(model)
+
+        # Svaki rank vidi svoj dio; globalni batch ostaje `batch` (kao Ultralytics DDP)
+        rank_batch = max(1, batch // world_size)
+        stride = max(int(model.stride.max()), 32)
+        dataset = _build_cached_dataset(args, data["train"], rank_batch, data, "train", stride, dataset_cache)
+        sampler = DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=True, seed=args.seed)
+        loader = DataLoader(dataset, batch_size=rank_batch, sampler=sampler, num_workers=0,
+                            collate_fn=dataset.collate_fn)
+
+        decay = [p for n, p in model.named_parameters() if p.requires_grad and p.ndim > 1]
+        no_decay = [p for n, p in model.named_parameters() if p.requires_grad and p.ndim <= 1]
+        optimizer = torch.optim.AdamW(
+            [{"params": decay, "weight_decay": args.weight_decay}, {"params": no_decay, "weight_decay": 0.0}],
+            lr=args.lr0, betas=(args.momentum, 0.999)
+        )
+        epochs = args.epochs
+        lr_lambda = lambda e: (1 - e / epochs) * (1.0 - args.lrf) + args.lrf
+        scheduler = torch.optim.lr_scheduler.LambdaLR(optimizer, lr_lambda)
+
+        start_epoch, best_map50 = 0, -1.0
+        if ckpt:
+            optimizer.load_state_dict(ckpt["optimizer"])
+            start_epoch, best_map50 = ckpt["epoch"] + 1, ckpt.get("best_fitness") or -1.0
+            scheduler.last_epoch = start_epoch - 1
+
+        # EMA kao u Ultralytics trenerima - težine su iste na svim rankovima, prati je rank 0
+        ema = ModelEMA(model) if rank == 0 else None
+        if ema is not None and ckpt and ckpt.get("ema") is not None:
+            ema.ema.load_state_dict(ckpt["ema"].float().state_dict())
+            ema.updates = ckpt.get("updates") or 0
+
+        stopper = BudgetStopper(budget, resume.get("stopper")) if rank == 0 else None
+        validator = CachedDetectionValidator(
+            args=dict(data=config_path, imgsz=args.imgsz, batch=batch, device="cpu",
+                      plots=False, verbose=False, save_json=False),
+            dataset_cache=dataset_cache
+        ) if rank == 0 else None
+
+        epoch = start_epoch - 1
+        for epoch in range(start_epoch, epochs):
+            sampler.set_epoch(epoch)
+            started, seen = time.perf_counter(), 0
+            loss_sum = torch.zeros(3)
+            for batch_data in loader:
+                batch_data["img"] = batch_data["img"].float() / 255
+                preds = ddp_model(batch_data["img"])
+                loss, loss_items = model.loss(batch_data, preds)
+                optimizer.zero_grad(set_to_none=True)
+                loss.sum().backward()
+                torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=10.0)
+                optimizer.step()
+                if ema is not None:
+                    ema.update(model)
+                loss_sum += loss_items.detach()[:3]
+                seen += len(batch_data["img"])
+            scheduler.step()
+            train_s = time.perf_counter() - started
+
+            # Propusnost i loss svih rankova
+            totals = torch.tensor([float(seen), *loss_sum.tolist(), float(len(loader))])
+            dist.all_reduce(totals)
+            images_per_s = totals[0].item() / train_s
+
+            stop = torch.zeros(1)
+            if rank == 0:
+                metrics = validator(model=deepcopy(ema.ema).eval())
+                map50 = float(metrics.get(MAP50_KEY, 0.0))
+                batches = max(totals[4].item(), 1.0)
+                metrics.update({
+                    f"train/{name}": round(totals[1 + i].item() / batches, 5)
+                    for i, name in enumerate(("box_loss", "cls_loss", "dfl_loss"))
+                })
+                state = SimpleNamespace(metrics=metrics, stop=epoch + 1 >= epochs)
+                stopper(state)
+
+                saved, saved_ema = deepcopy(model).half(), deepcopy(ema.ema).half()
+                saved.criterion = saved_ema.criterion = None
+                ckpt = {
+                    "epoch": epoch,
+                    "best_fitness": max(best_map50, map50),
+                    "model": saved,
+                    "ema": saved_ema,
+                    "updates": ema.updates,
+                    "optimizer": optimizer.state_dict(),
+                    "train_args": vars(args),
+                    "date": datetime.now().isoformat(),
+                    "version": __version__
+                }
+                torch.save(ckpt, last_path)
+                if map50 > best_map50 or not os.path.exists(best_path):
+                    best_map50 = map50
+                    torch.save(ckpt, best_path)
+
+                events.put({
+                    "type": "epoch",
+                    "epoch": epoch + 1,
+                    "epochs": epochs,
+                    "metrics": {k: round(float(v), 5) for k, v in metrics.items()},
+                    "checkpoint": last_path,
+                    "stopper": stopper.state(),
+                    "images_per_s": round(images_per_s, 2)
+                })
+                if stopper.reason:
+                    events.put({"type": "early_stop", "reason": stopper.reason,
+                                "epoch": epoch + 1, "stopper": stopper.state()})
+                stop[0] = float(state.stop)
+            dist.broadcast(stop, src=0)
+
+            if rank == 0:
+                results.put({"type": "epoch", "images_per_s": images_per_s})
+            if stop.item():
+                break
+
+        if rank == 0:
+            results.put({"type": "done", "best_path": best_path, "last_path": last_path, "epochs": epoch + 1})
+    except Exception as e:
+        results.put({"type": "error", "rank": rank, "message": str(e)})
+        raise
+    finally:
+        dist.destroy_process_group()
+
+
+def train_distributed(
+        weights_path: str,
+        config_path: str,
+        dataset_cache,
+        processes: int,
+        threads: int,
+        batch: int,
+        budget=None,
+        resume: Optional[dict] = None,
+        events=None,
+        baseline: Optional[dict] = None,
+        **train_kwargs
+) -> dict:
+    """
+    Pokreće `processes` rankova sa po threads // processes niti i čeka kraj
+    batch je globalni - svaki rank trenira batch // processes slika po koraku
+
+    baseline: rezultat benchmark_throughput - za efikasnost skaliranja
+    Vraća {"best_path", "last_path", "epochs", "scaling": {...}}
+    """
+    from parking_agent.ML.training_budget import TrainingBudget
+
+    budget = budget or TrainingBudget()
+    threads_per_process = max(1, threads // processes)
+    ctx = mp.get_context("spawn")
+    # Bez pozivaočevog reda događaji se prazne ovdje - pun red bi blokirao izlaz ranka 0
+    drain = events is None
+    events = ctx.Queue() if drain else events
+    results = ctx.Queue()
+
+    with tempfile.TemporaryDirectory(prefix="ddp_") as tmp_dir:
+        init_file = os.path.join(tmp_dir, "init")
+        workers = [
+            ctx.Process(
+                target=_ddp_worker,
+                args=(rank, processes, init_file, weights_path, config_path, dataset_cache,
+                      threads_per_process, batch, budget, resume, train_kwargs, events, results),
+                name=f"ddp-rank-{rank}",
+                daemon=False
+            )
+            for rank in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+
+        epoch_throughput, done = [], None
+        try:
+            while done is None:
+                while drain and _discard(events):
+                    pass
+                try:
+                    message = results.get(timeout=1.0)
+                except queue.Empty:
+                    # Rank koji padne bez poruke bi ostale ostavio da čekaju all-reduce
+                    failed = [w for w in workers if w.exitcode not in (None, 0)]
+                    if failed:
+                        raise RuntimeError(f"{failed[0].name} je prekinut (exit code {failed[0].exitcode})")
+                    if all(w.exitcode == 0 for w in workers):
+                        raise RuntimeError("Distribuirani trening završen bez rezultata")
+                    continue
+                if message["type"] == "error":
+                    raise RuntimeError(f"Rank {message['rank']}: {message['message']}")
+                if message["type"] == "epoch":
+                    epoch_throughput.append(message["images_per_s"])
+                else:
+                    done = message
+            for worker in workers:
+                worker.join()
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join(10)
+
+    scaling = _scaling_report(epoch_throughput, processes, threads_per_process, batch, baseline)
+    if not drain:
+        events.put({"type": "scaling", **scaling})
+    return {**done, "scaling": scaling}
+
+
+def _discard(events) -> bool:
+    try:
+        events.get_nowait()
+        return True
+    except queue.Empty:
+        return False
+
+
+def _scaling_report(
+        epoch_throughput: list,
+        processes: int,
+        threads_per_process: int,
+        batch: int,
+        baseline: Optional[dict]
+) -> dict:
+    """
+    images_per_s: prosjek epoha (bez prve - zagrijavanje keša/alokatora)
+    speedup: u odnosu na najbolji jedan proces (sve niti) iz benchmark-a
+    efficiency: images_per_s / (processes x jedan proces sa istim nitima i batch-om)
+    """
+    steady = epoch_throughput[1:] or epoch_throughput
+    images_per_s = sum(steady) / len(steady) if steady else 0.0
+    report = {
+        "processes": processes,
+        "threads_per_process": threads_per_process,
+        "images_per_s": round(images_per_s, 2),
+        "speedup": None,
+        "efficiency": None
+    }
+    if baseline and baseline.get("images_per_s"):
+        report["speedup"] = round(images_per_s / baseline["images_per_s"], 3)
+        rank_batch = max(1, batch // processes)
+        single = next(
+            (r["images_per_s"] for r in baseline.get("results", [])
+             if r["threads"] == threads_per_process and r["batch"] == rank_batch),
+            None
+        )
+        if single:
+            report["efficiency"] = round(images_per_s / (processes * single), 3)
+    return report
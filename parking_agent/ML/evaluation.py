@@ -0,0 +1,326 @@
+"""
+ML sloj - Evaluation
+mAP50 iz predikcija po slici - isti kod za stari i novi model,
+pa se predikcije starog modela mogu keširati između retraining rundi.
+Više modela se evaluira paralelno (proces po modelu, zajednički memmap keš slika)
+"""
+import os
+import json
+import time
+import hashlib
+import multiprocessing as mp
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Callable
+import sys
+
+import numpy as np
+
+sys.path.append('..')
+from parking_agent.ML.yolo_classifier import YoloClassifier
+from parking_agent.ML.image_cache import MemmapImageCache
+from parking_agent.ML.dataset_cache import DatasetCache
+from parking_agent.infrastructure.evaluation_store import EvaluationStore
+
+IOU_THRESHOLD = 0.5
+
+
+# ===================================
+# DATASET (snapshot: selection.json iz ReplayBuffer-a)
+# ===================================
+def load_selection(snapshot_dir: str, splits=("val",)) -> List[dict]:
+    """
+    Slike izabrane za trening/validaciju sa ground truth labelama
+    Vraća [{"image_path", "label_path", "image_hash", "labels": [[cls, x1, y1, x2, y2], ...]}]
+    (koordinate normalizovane 0-1; slika u više splitova se vraća jednom)
+    """
+    with open(os.path.join(snapshot_dir, "selection.json")) as f:
+        selection = json.load(f)
+
+    dataset, seen = [], set()
+    for split in splits:
+        for item in selection[split]:
+            if item["image_hash"] in seen:
+                continue
+            seen.add(item["image_hash"])
+            dataset.append({**item, "labels": _read_yolo_labels(item["label_path"])})
+    return dataset
+
+
+def _read_yolo_labels(label_path: str) -> List[list]:
+    """YOLO format (cls cx cy w h) → [cls, x1, y1, x2, y2]"""
+    if not label_path or not os.path.exists(label_path):
+        return []
+    labels = []
+    with open(label_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) != 5:
+                continue
+            cls_id, cx, cy, w, h = int(parts[0]), *map(float, parts[1:])
+            labels.append([cls_id, cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+    return labels
+
+
+def dataset_hash(dataset: List[dict]) -> str:
+    """Hash sadržaja dataseta: slike (sha256) + ground truth labele"""
+    h = hashlib.sha256()
+    for item in sorted(dataset, key=lambda d: d["image_hash"]):
+        h.update(item["image_hash"].encode())
+        h.update(json.dumps(item["labels"]).encode())
+    return h.hexdigest()[:16]
+
+
+# ===================================
+# mAP50
+# ===================================
+def _iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-12)
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """AP - površina ispod P/R krive, 101 tačka (COCO, kao Ultralytics)"""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    trapezoid = getattr(np, "trapezoid", None) or np.trapz  # NumPy 2 preimenovao trapz
+    return float(trapezoid(np.interp(x, mrec, mpre), x))
+
+
+def compute_map50(dataset: List[dict], predictions: Dict[str, list]) -> dict:
+    """
+    mAP@0.5 po klasama koje imaju ground truth
+    predictions: image_hash → [[cls, conf, x1, y1, x2, y2], ...] (normalizovano)
+    """
+    scores: Dict[int, List[float]] = {}
+    hits: Dict[int, List[bool]] = {}
+    instances: Dict[int, int] = {}
+
+    for item in dataset:
+        gt = np.array(item["labels"], dtype=np.float64).reshape(-1, 5)
+        for cls_id in gt[:, 0].astype(int):
+            instances[cls_id] = instances.get(cls_id, 0) + 1
+
+        preds = sorted(predictions.get(item["image_hash"], []), key=lambda p: -p[1])
+        matched = np.zeros(len(gt), dtype=bool)
+        for cls_id, conf, *box in preds:
+            cls_id = int(cls_id)
+            candidates = np.where((gt[:, 0] == cls_id) & ~matched)[0]
+            hit = False
+            if len(candidates):
+                ious = _iou(np.array(box), gt[candidates, 1:])
+                best = int(np.argmax(ious))
+                if ious[best] >= IOU_THRESHOLD:
+                    matched[candidates[best]] = True
+                    hit = True
+            scores.setdefault(cls_id, []).append(conf)
+            hits.setdefault(cls_id, []).append(hit)
+
+    per_class = {}
+    for cls_id, n_gt in sorted(instances.items()):
+        if cls_id not in scores:
+            per_class[cls_id] = 0.0
+            continue
+        order = np.argsort(-np.array(scores[cls_id]))
+        tp = np.array(hits[cls_id])[order].astype(np.float64)
+        tp_cum = np.cumsum(tp)
+        fp_cum = np.cumsum(1.0 - tp)
+        recall = tp_cum / n_gt
+        precision = tp_cum / np.maximum(tp_cum + fp_cum, 1e-12)
+        per_class[cls_id] = average_precision(recall, precision)
+
+    return {
+        "map50": float(np.mean(list(per_class.values()))) if per_class else 0.0,
+        "per_class": {str(k): round(v, 5) for k, v in per_class.items()},
+        "images": len(dataset),
+        "instances": int(sum(instances.values()))
+    }
+
+
+# ===================================
+# WORKER PROCES (top-level - spawn)
+# ===================================
+def _predict_worker(
+        weights_path: str,
+        open_cache: Callable,
+        keys: List[str],
+        threads: int,
+        imgsz: int,
+        batch_size: int
+) -> Dict[str, list]:
+    """
+    Predikcije jednog modela nad slikama iz zajedničkog memmap keša
+    open_cache: picklable fabrika keša (DatasetCache ili MemmapImageCache) - get_key(sha256)
+    threads: udio CPU niti ovog procesa (postavlja se PRIJE importa torch-a)
+    """
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(threads)
+    cache = open_cache()
+    model = YOLO(weights_path)
+
+    predictions = {}
+    for i in range(0, len(keys), batch_size):
+        chunk = keys[i:i + batch_size]
+        results = model.predict(
+            [cache.get_key(key) for key in chunk],
+            imgsz=imgsz,
+            conf=0.001,
+            iou=0.7,
+            verbose=False
+        )
+        for key, result in zip(chunk, results):
+            # Keš čuva smanjenu sliku - normalizovane koordinate su iste kao na originalu
+            boxes = result.boxes
+            predictions[key] = [
+                [int(cls_id), round(float(conf), 5), *[round(v, 6) for v in box]]
+                for cls_id, conf, box in zip(boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxyn.tolist())
+            ]
+    return predictions
+
+
+# ===================================
+# EVALUATOR
+# ===================================
+class ModelEvaluator:
+    """
+    Evaluira težine na snapshot datasetu sa keširanjem (EvaluationStore)
+
+    - isti (težine, dataset) → metrike iz keša, bez učitavanja modela
+    - dataset je narastao → predikcije samo za nove slike
+    - evaluate_many: više modela PARALELNO, svaki u svom procesu sa svojim
+      dijelom CPU niti; slike se dekodiraju jednom - u DatasetCache (perzistentno,
+      ako je zadan) ili u privremeni MemmapImageCache
+    - predikcije sa conf=0.001 (kao val) - P/R kriva pokriva sve pragove
+    """
+
+    def __init__(
+            self,
+            store: EvaluationStore,
+            imgsz: int = 640,
+            batch_size: int = 16,
+            threads: Optional[int] = None,
+            cache_dir: str = "backend/eval_cache",
+            dataset_cache: Optional[DatasetCache] = None
+    ):
+        if dataset_cache is not None and dataset_cache.imgsz != imgsz:
+            raise ValueError(f"DatasetCache imgsz={dataset_cache.imgsz}, evaluacija imgsz={imgsz}")
+        self.store = store
+        self.imgsz = imgsz
+        self.batch_size = batch_size
+        self.threads = threads or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.dataset_cache = dataset_cache
+
+    def evaluate(
+            self,
+            weights_path: str,
+            dataset: List[dict],
+            progress: Optional[Callable[[dict], None]] = None
+    ) -> dict:
+        return self.evaluate_many({"model": weights_path}, dataset, progress)["model"]
+
+    def evaluate_many(
+            self,
+            weights: Dict[str, str],
+            dataset: List[dict],
+            progress: Optional[Callable[[dict], None]] = None
+    ) -> Dict[str, dict]:
+        """
+        weights: ime → putanja težina (npr. {"new": ..., "old": ...})
+        Vraća ime → izvještaj (mAP50, AP po klasi, broj slika, keš statistika)
+        """
+        data_hash = dataset_hash(dataset)
+        image_hashes = [item["image_hash"] for item in dataset]
+        reports, pending = {}, {}
+
+        for name, weights_path in weights.items():
+            weights_hash = YoloClassifier.weights_hash(weights_path)
+            cached_result = self.store.get_result(weights_hash, data_hash)
+            if cached_result is not None:
+                reports[name] = {**cached_result, "weights_hash": weights_hash, "predicted_images": 0, "cached": True}
+                continue
+
+            predictions = self.store.get_predictions(weights_hash, image_hashes)
+            missing = [item for item in dataset if item["image_hash"] not in predictions]
+            pending[name] = (weights_path, weights_hash, predictions, missing)
+            if progress:
+                progress({"type": "evaluate", "model": name, "weights_hash": weights_hash,
+                          "cached_images": len(predictions), "new_images": len(missing)})
+
+        to_predict = {name: (entry[0], entry[3]) for name, entry in pending.items() if entry[3]}
+        new_predictions = self._predict_parallel(to_predict) if to_predict else {}
+
+        for name, (weights_path, weights_hash, predictions, missing) in pending.items():
+            if missing:
+                self.store.save_predictions(weights_hash, new_predictions[name])
+                predictions.update(new_predictions[name])
+            metrics = compute_map50(dataset, predictions)
+            self.store.save_result(weights_hash, data_hash, metrics)
+            reports[name] = {**metrics, "weights_hash": weights_hash, "predicted_images": len(missing), "cached": False}
+
+        return reports
+
+    def _predict_parallel(self, jobs: Dict[str, tuple]) -> Dict[str, Dict[str, list]]:
+        """
+        jobs: ime → (težine, slike bez predikcija)
+        Unija slika se dekodira jednom; svaki model dobija svoj proces
+        i threads // broj_modela CPU niti
+        """
+        items = {}
+        for _, missing in jobs.values():
+            items.update((item["image_hash"], item) for item in missing)
+
+        if self.dataset_cache is not None:
+            # Perzistentni keš: dekodiraju se samo slike koje još nisu u njemu
+            self.dataset_cache.sync(
+                [(h, item["image_path"], item.get("label_path")) for h, item in items.items()],
+                workers=self.threads
+            )
+            cache = self.dataset_cache
+            open_cache = partial(DatasetCache, self.dataset_cache.base_root, self.dataset_cache.imgsz)
+            cleanup = None
+        else:
+            prefix = os.path.join(self.cache_dir, f"eval_{os.getpid()}_{int(time.time())}")
+            cache = MemmapImageCache.build(
+                prefix,
+                list(items),
+                [item["image_path"] for item in items.values()],
+                imgsz=self.imgsz,
+                workers=self.threads
+            )
+            open_cache = partial(MemmapImageCache, prefix)
+            cleanup = cache.remove
+        threads_per_model = max(1, self.threads // len(jobs))
+
+        try:
+            with ProcessPoolExecutor(len(jobs), mp_context=mp.get_context("spawn")) as pool:
+                futures = {}
+                for name, (weights_path, missing) in jobs.items():
+                    keys = [item["image_hash"] for item in missing if item["image_hash"] in cache]
+                    futures[name] = pool.submit(
+                        _predict_worker, weights_path, open_cache, keys,
+                        threads_per_model, self.imgsz, self.batch_size
+                    )
+
+                results = {}
+                for name, future in futures.items():
+                    # Slika koja se ne može dekodirati = bez predikcija (sve GT su promašaji)
+                    results[name] = {item["image_hash"]: [] for item in jobs[name][1]}
+                    results[name].update(future.result())
+                return results
+        finally:
+            if cleanup:
+                cleanup()
@@ -0,0 +1,117 @@
+"""
+ML sloj - Memory-mapped Image Cache
+Slike se dekodiraju i smanje JEDNOM; procesi (evaluacija, trening) ih čitaju
+iz istog memory-mapped fajla bez ponovnog dekodiranja i bez kopiranja
+"""
+import os
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def load_resized(image_path: str, imgsz: int) -> Tuple[Optional[np.ndarray], Optional[List[int]]]:
+    """
+    Dekodira BGR sliku i smanjuje dužu stranicu na imgsz (kao Ultralytics load_image)
+    Vraća (slika, originalne dimenzije [h, w]) ili (None, None)
+    """
+    image = cv2.imread(image_path)
+    if image is None:
+        return None, None
+    h, w = image.shape[:2]
+    ratio = imgsz / max(h, w)
+    if ratio != 1:
+        size = (min(math.ceil(w * ratio), imgsz), min(math.ceil(h * ratio), imgsz))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+    return np.ascontiguousarray(image), [h, w]
+
+
+class MemmapImageCache:
+    """
+    Dva fajla sa zajedničkim prefiksom:
+        <prefix>.bin  - sve slike jedna za drugom (uint8, HWC, BGR)
+        <prefix>.json - ključevi, offseti, oblici (h, w, c) i originalne dimenzije
+
+    Čitanje je np.memmap view - OS page cache dijeli stranice između procesa
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        with open(f"{prefix}.json") as f:
+            index = json.load(f)
+        self.imgsz = index["imgsz"]
+        self.keys: List[str] = index["keys"]
+        self.offsets: List[int] = index["offsets"]
+        self.shapes: List[List[int]] = index["shapes"]
+        self.original_shapes: List[List[int]] = index["original_shapes"]
+        self._position = {key: i for i, key in enumerate(self.keys)}
+        total = index["total_bytes"]
+        self._data = np.memmap(f"{prefix}.bin", dtype=np.uint8, mode="r", shape=(max(total, 1),))
+
+    @classmethod
+    def build(
+            cls,
+            prefix: str,
+            keys: List[str],
+            image_paths: List[str],
+            imgsz: int = 640,
+            workers: int = 8,
+            chunk: int = 64
+    ) -> "MemmapImageCache":
+        """
+        Dekodira + smanjuje slike u thread pool-u (cv2 oslobađa GIL) i upisuje
+        ih redom; u memoriji je najviše `chunk` slika odjednom.
+        Slike koje se ne mogu dekodirati se preskaču (nisu u keys).
+        """
+        os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+        index = {"imgsz": imgsz, "keys": [], "offsets": [], "shapes": [], "original_shapes": []}
+        offset = 0
+
+        with open(f"{prefix}.bin.tmp", "wb") as f, ThreadPoolExecutor(workers) as pool:
+            for start in range(0, len(image_paths), chunk):
+                paths = image_paths[start:start + chunk]
+                loaded = pool.map(lambda p: load_resized(p, imgsz), paths)
+                for key, (image, original) in zip(keys[start:start + chunk], loaded):
+                    if image is None:
+                        continue
+                    f.write(image.tobytes())
+                    index["keys"].append(key)
+                    index["offsets"].append(offset)
+                    index["shapes"].append(list(image.shape))
+                    index["original_shapes"].append(original)
+                    offset += image.nbytes
+
+        index["total_bytes"] = offset
+        with open(f"{prefix}.json.tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(f"{prefix}.bin.tmp", f"{prefix}.bin")
+        os.replace(f"{prefix}.json.tmp", f"{prefix}.json")
+        return cls(prefix)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._position
+
+    def position(self, key: str) -> int:
+        return self._position[key]
+
+    def get_key(self, key: str) -> np.ndarray:
+        return self.get(self._position[key])
+
+    def get(self, i: int) -> np.ndarray:
+        """Slika i kao read-only view (bez kopiranja)"""
+        h, w, c = self.shapes[i]
+        start = self.offsets[i]
+        return self._data[start:start + h * w * c].reshape(h, w, c)
+
+    def remove(self) -> None:
+        self._data = None
+        for suffix in (".bin", ".json"):
+            if os.path.exists(self.prefix + suffix):
+                os.remove(self.prefix + suffix)
+
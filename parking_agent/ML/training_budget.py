@@ -0,0 +1,209 @@
+"""
+ML sloj - Training Budget
+Trening ograničen vremenom i CPU-om: rano zaustavljanje (plato mAP50 ili
+istrošen budžet) i izbor batch/niti po izmjerenoj propusnosti
+"""
+import os
+import json
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+MAP50_KEY = "metrics/mAP50(B)"
+
+
+@dataclass(frozen=True)
+class TrainingBudget:
+    """
+    Granice jednog retraining posla (zbir svih nastavaka nakon prekida)
+
+    max_hours / max_cpu_hours: zid sata i CPU vremena procesa treninga
+    max_epochs: gornja granica epoha (obično stane ranije)
+    patience / min_delta: plato - toliko epoha bez rasta val mAP50 za min_delta
+    batch_sizes / max_threads: kandidati za benchmark propusnosti
+    processes: broj data-parallel procesa (None = 1; više procesa je opt-in -
+               vidi distributed_trainer za razlike od Ultralytics trenera)
+    """
+    max_hours: float = 2.0
+    max_cpu_hours: Optional[float] = None
+    max_epochs: int = 50
+    patience: int = 5
+    min_delta: float = 0.001
+    batch_sizes: Sequence[int] = (4, 8, 16)
+    max_threads: Optional[int] = None
+    processes: Optional[int] = None
+
+
+class BudgetStopper:
+    """
+    on_fit_epoch_end callback: postavlja trainer.stop kad
+
+    - val mAP50 nije porastao za min_delta `patience` epoha zaredom ("plateau")
+    - sljedeća epoha (procjena: trajanje zadnje) ne staje u vremenski budžet ("time")
+    - potrošeno CPU vrijeme premaši budžet ("cpu")
+
+    Ultralytics nakon zaustavljanja radi završnu validaciju nad best.pt.
+    Stanje (state) se prenosi kroz nastavak nakon prekida.
+    """
+
+    def __init__(self, budget: TrainingBudget, state: Optional[dict] = None):
+        state = state or {}
+        self.budget = budget
+        self.best_map50: float = state.get("best_map50", -1.0)
+        self.stale_epochs: int = state.get("stale_epochs", 0)
+        # Potrošeno u prethodnim pokušajima + od starta ovog procesa
+        self._elapsed_before = state.get("elapsed_s", 0.0)
+        self._cpu_before = state.get("cpu_s", 0.0)
+        self._started = time.monotonic()
+        self._cpu_started = time.process_time()
+        self._last_epoch_end = self._started
+        self.reason: Optional[str] = None
+
+    @property
+    def elapsed_s(self) -> float:
+        return self._elapsed_before + time.monotonic() - self._started
+
+    @property
+    def cpu_s(self) -> float:
+        return self._cpu_before + time.process_time() - self._cpu_started
+
+    def state(self) -> dict:
+        return {
+            "best_map50": round(self.best_map50, 5),
+            "stale_epochs": self.stale_epochs,
+            "elapsed_s": round(self.elapsed_s, 1),
+            "cpu_s": round(self.cpu_s, 1)
+        }
+
+    def __call__(self, trainer) -> None:
+        now = time.monotonic()
+        epoch_s = now - self._last_epoch_end
+        self._last_epoch_end = now
+
+        map50 = float((trainer.metrics or {}).get(MAP50_KEY, 0.0))
+        if map50 > self.best_map50 + self.budget.min_delta:
+            self.best_map50 = map50
+            self.stale_epochs = 0
+        else:
+            self.stale_epochs += 1
+
+        if self.stale_epochs >= self.budget.patience:
+            self.reason = "plateau"
+        elif self.elapsed_s + epoch_s > self.budget.max_hours * 3600:
+            self.reason = "time"
+        elif self.budget.max_cpu_hours is not None and self.cpu_s >= self.budget.max_cpu_hours * 3600:
+            self.reason = "cpu"
+        if self.reason:
+            trainer.stop = True
+
+
+def thread_options(max_threads: Optional[int] = None) -> List[int]:
+    """Kandidati za broj niti: pola i sva dostupna jezgra (uz gornju granicu)"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    limit = max(1, min(cpus, max_threads or cpus))
+    return sorted({max(1, limit // 2), limit})
+
+
+def process_count(budget: TrainingBudget, threads: int) -> int:
+    """
+    Data-parallel procesi: jedan proces sa 32 niti slabo koristi jezgra
+    (konvolucije malih batch-eva se ne dijele dobro), pa veće mašine mogu
+    trenirati u više procesa sa po ~8 niti (npr. processes=threads // 8)
+
+    Samo kad je budget.processes zadat - inače jedan proces (Ultralytics
+    trener), da rezultat retraininga ne zavisi od broja jezgara mašine
+    """
+    return max(1, min(budget.processes or 1, threads))
+
+
+def benchmark_throughput(
+        weights_path: str,
+        images: List[np.ndarray],
+        imgsz: int,
+        batch_sizes: Sequence[int],
+        threads: Sequence[int],
+        freeze: int = 0,
+        steps: int = 3,
+        cache_path: Optional[str] = None
+) -> dict:
+    """
+    Mjeri slike/s (forward + backward) za svaku kombinaciju niti i batch-a
+    na stvarnim slikama iz keša; bira najbrži (u 5% - manji batch, manje niti)
+
+    Rezultat se pamti u cache_path po arhitekturi, imgsz, freeze i nitima -
+    hardver i model se rijetko mijenjaju, pa se mjeri samo prvi put.
+    Vraća {"batch", "threads", "images_per_s", "results": [...]}
+    """
+    import torch
+    from ultralytics import YOLO
+
+    model = YOLO(weights_path).model.float()
+    key = f"{sum(p.numel() for p in model.parameters())}:{imgsz}:{freeze}:{','.join(map(str, threads))}"
+    cached = _read_json(cache_path).get(key) if cache_path else None
+    if cached:
+        return cached
+
+    # Zamrznuti slojevi kao u Ultralytics trenerima (model.0. ... model.{freeze-1}.)
+    frozen = tuple(f"model.{i}." for i in range(freeze))
+    for name, param in model.named_parameters():
+        param.requires_grad = not name.startswith(frozen)
+    model.train()
+
+    pool = torch.from_numpy(np.stack([_pad(image, imgsz) for image in images])).permute(0, 3, 1, 2)
+    results = []
+    for thread_count in threads:
+        torch.set_num_threads(thread_count)
+        for batch in sorted(batch_sizes):
+            imgs = pool[torch.arange(batch) % len(pool)].float() / 255
+            try:
+                _train_step(model, imgs)  # zagrijavanje
+                started = time.perf_counter()
+                for _ in range(steps):
+                    _train_step(model, imgs)
+                seconds = time.perf_counter() - started
+            except RuntimeError:
+                break  # nedovoljno memorije - veći batch neće proći
+            results.append({
+                "batch": batch,
+                "threads": thread_count,
+                "images_per_s": round(batch * steps / seconds, 2)
+            })
+
+    if not results:
+        raise RuntimeError("Benchmark nije uspio ni za jedan batch")
+    best = max(r["images_per_s"] for r in results)
+    choice = min(
+        (r for r in results if r["images_per_s"] >= 0.95 * best),
+        key=lambda r: (r["batch"], r["threads"])
+    )
+    chosen = {**choice, "results": results}
+    if cache_path:
+        stored = _read_json(cache_path)
+        stored[key] = chosen
+        with open(cache_path, "w") as f:
+            json.dump(stored, f, indent=2)
+    return chosen
+
+
+def _train_step(model, imgs) -> None:
+    preds = model(imgs)
+    loss = sum(p.float().mean() for p in (preds if isinstance(preds, (list, tuple)) else [preds]))
+    loss.backward()
+    model.zero_grad(set_to_none=True)
+
+
+def _pad(image: np.ndarray, imgsz: int) -> np.ndarray:
+    """Smanjena slika iz keša → kvadrat imgsz x imgsz (sivi padding kao letterbox)"""
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    h, w = image.shape[:2]
+    canvas[:h, :w] = image[:imgsz, :imgsz]
+    return canvas
+
+
+def _read_json(path: Optional[str]) -> dict:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,269 @@
+"""
+ML sloj - Training Process
+YOLO fine-tuning (DatasetCache) + evaluacija (ModelEvaluator, keširana) u ZASEBNOM procesu
+Web proces (detekcija) ostaje responzivan, a trening se može prekinuti (terminate)
+"""
+import os
+import queue
+import multiprocessing as mp
+from functools import partial
+from typing import Optional
+
+
+def _train_worker(
+        weights_path: str,
+        config_path: str,
+        dataset_dir: str,
+        evaluation_db_path: str,
+        dataset_cache_dir: str,
+        train_kwargs: dict,
+        events,
+        budget=None,
+        resume: Optional[dict] = None
+):
+    """
+    Ulazna tačka procesa (top-level - mora se moći importovati pod spawn)
+
+    budget: TrainingBudget - rano zaustavljanje + izbor batch/niti benchmark-om
+    resume: {"checkpoint", "stopper", "batch", "threads", "processes"} - nastavak prekinutog treninga
+    processes > 1: data-parallel trening (distributed_trainer, gloo)
+
+    Šalje događaje u red:
+        {"type": "phase", "phase": "cache" | "benchmark" | "train" | "evaluate"}
+        {"type": "cache", "added", "relabeled", "cached_images"}
+        {"type": "benchmark", "batch", "threads", "processes", "images_per_s", "results"}
+        {"type": "epoch", "epoch", "epochs", "metrics", "checkpoint", "stopper"}
+        {"type": "early_stop", "reason", "epoch", "stopper"}
+        {"type": "scaling", "processes", "threads_per_process", "images_per_s", "speedup", "efficiency"}
+        {"type": "evaluate", "weights_hash", "cached_images", "new_images"}
+        {"type": "result", "best_path", "new_metrics", "old_metrics"}
+        {"type": "error", "message"}
+    """
+    try:
+        from parking_agent.ML.training_budget import TrainingBudget, BudgetStopper
+
+        budget = budget or TrainingBudget()
+        resume = resume or {}
+        stopper = BudgetStopper(budget, resume.get("stopper"))
+        threads = resume.get("threads")
+        if threads:
+            for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+                os.environ[var] = str(threads)
+
+        import torch
+        from ultralytics import YOLO
+        from parking_agent.ML.evaluation import ModelEvaluator, load_selection
+        from parking_agent.infrastructure.evaluation_store import EvaluationStore
+        from parking_agent.ML.dataset_cache import DatasetCache
+        from parking_agent.ML.cached_trainer import CachedDetectionTrainer
+        from parking_agent.ML.training_budget import benchmark_throughput, thread_options, process_count
+
+        imgsz = train_kwargs.get("imgsz", 640)
+        selected = load_selection(dataset_dir, splits=("train", "val"))
+        val_dataset = load_selection(dataset_dir, splits=("val",))
+
+        # Keš dopunjava samo slike koje FileStorage još nije dodao (ili nove labele)
+        events.put({"type": "phase", "phase": "cache"})
+        dataset_cache = DatasetCache(dataset_cache_dir, imgsz)
+        synced = dataset_cache.sync([(d["image_hash"], d["image_path"], d["label_path"]) for d in selected])
+        events.put({"type": "cache", **synced, "cached_images": len(dataset_cache)})
+
+        # Batch, niti i broj procesa po izmjerenoj propusnosti (nastavak koristi već izabrane)
+        batch, processes, choice = resume.get("batch"), resume.get("processes") or 1, None
+        if not batch:
+            events.put({"type": "phase", "phase": "benchmark"})
+            options = thread_options(budget.max_threads)
+            threads = options[-1]
+            processes = process_count(budget, threads)
+            if processes > 1:
+                # Jedan rank sa svojim udjelom niti - osnova za efikasnost skaliranja
+                options = sorted(set(options) | {threads // processes})
+            images = [
+                dataset_cache.get_key(d["image_hash"])
+                for d in selected[:max(budget.batch_sizes)]
+                if d["image_hash"] in dataset_cache
+            ]
+            if images:
+                os.makedirs(train_kwargs["project"], exist_ok=True)
+                choice = benchmark_throughput(
+                    weights_path, images, imgsz, budget.batch_sizes, options,
+                    freeze=train_kwargs.get("freeze") or 0,
+                    cache_path=os.path.join(train_kwargs["project"], "benchmark.json")
+                )
+                batch = choice["batch"]
+                if processes > 1:
+                    # Najbrži batch za jedan rank; globalni batch = rank batch x procesi
+                    rank_results = [r for r in choice["results"] if r["threads"] == threads // processes]
+                    if rank_results:
+                        batch = max(rank_results, key=lambda r: r["images_per_s"])["batch"] * processes
+                else:
+                    threads = choice["threads"]
+            else:
+                batch = 8 * processes
+            events.put({"type": "benchmark", "batch": batch, "threads": threads, "processes": processes,
+                        "images_per_s": choice["images_per_s"] if choice else None,
+                        "results": choice["results"] if choice else []})
+        if threads and processes == 1:
+            torch.set_num_threads(threads)
+
+        checkpoint = resume.get("checkpoint")
+        model = YOLO(weights_path if processes > 1 else checkpoint or weights_path)
+
+        def on_fit_epoch_end(trainer):
+            metrics = {
+                k: round(float(v), 5)
+                for k, v in (trainer.metrics or {}).items()
+            }
+            if getattr(trainer, "tloss", None) is not None:
+                losses = trainer.label_loss_items(trainer.tloss, prefix="train")
+                metrics.update({k: round(float(v), 5) for k, v in losses.items()})
+            stopper(trainer)
+            # last.pt je upisan prije ovog callback-a - od ovdje se može nastaviti
+            events.put({
+                "type": "epoch",
+                "epoch": trainer.epoch + 1,
+                "epochs": trainer.epochs,
+                "metrics": metrics,
+                "checkpoint": str(trainer.last),
+                "stopper": stopper.state()
+            })
+            if stopper.reason:
+                events.put({
+                    "type": "early_stop",
+                    "reason": stopper.reason,
+                    "epoch": trainer.epoch + 1,
+                    "stopper": stopper.state()
+                })
+
+        model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+
+        events.put({"type": "phase", "phase": "train"})
+        if processes > 1:
+            from parking_agent.ML.distributed_trainer import train_distributed
+
+            trained = train_distributed(
+                weights_path, config_path, dataset_cache, processes, threads, batch,
+                budget=budget,
+                resume=resume if checkpoint else None,
+                events=events,
+                baseline=choice,
+                epochs=budget.max_epochs,
+                patience=budget.max_epochs,
+                **train_kwargs
+            )
+            best_path = trained["best_path"]
+        else:
+            trainer = partial(CachedDetectionTrainer, dataset_cache=dataset_cache)
+            if checkpoint:
+                # Ultralytics vraća argumente, optimizer i epohu iz checkpoint-a
+                model.train(trainer=trainer, resume=True, batch=batch)
+            else:
+                model.train(
+                    trainer=trainer,
+                    data=config_path,
+                    batch=batch,
+                    epochs=budget.max_epochs,
+                    # Ugrađeni EarlyStopping (fitness) isključen - plato prati BudgetStopper
+                    patience=budget.max_epochs,
+                    **train_kwargs
+                )
+            best_path = str(model.trainer.best)
+
+        # Oba modela na ISTOM val skupu, istim kodom, paralelno - stari model
+        # je najčešće već evaluiran na većini slika (keš po slici)
+        events.put({"type": "phase", "phase": "evaluate"})
+        evaluator = ModelEvaluator(EvaluationStore(evaluation_db_path), imgsz=imgsz, dataset_cache=dataset_cache)
+        reports = evaluator.evaluate_many({"new": best_path, "old": weights_path}, val_dataset, progress=events.put)
+
+        events.put({
+            "type": "result",
+            "best_path": best_path,
+            "new_metrics": reports["new"],
+            "old_metrics": reports["old"]
+        })
+    except Exception as e:
+        events.put({"type": "error", "message": str(e)})
+
+
+class YoloTrainingProcess:
+    """
+    Trening + evaluacija starog i novog modela u child procesu
+
+    - spawn (ne fork) - PyTorch/OpenMP niti web procesa se ne kopiraju
+    - evaluacija starog i novog modela teče paralelno (ModelEvaluator.evaluate_many)
+    - budget (TrainingBudget) ograničava trening; resume nastavlja od last.pt
+    - next_event(timeout) čita napredak (epohe) iz reda
+    - terminate() prekida trening (otkazivanje)
+    """
+
+    process_name = "yolo-training"
+
+    def __init__(
+            self,
+            weights_path: str,
+            config_path: str,
+            dataset_dir: str,
+            evaluation_db_path: str,
+            dataset_cache_dir: str,
+            budget=None,
+            resume: Optional[dict] = None,
+            **train_kwargs
+    ):
+        self.weights_path = weights_path
+        self.config_path = config_path
+        self.dataset_dir = dataset_dir
+        self.evaluation_db_path = evaluation_db_path
+        self.dataset_cache_dir = dataset_cache_dir
+        self.budget = budget
+        self.resume = resume
+        self.train_kwargs = train_kwargs
+        self._ctx = mp.get_context("spawn")
+        self._events = self._ctx.Queue()
+        self._process: Optional[mp.Process] = None
+
+    def start(self) -> "YoloTrainingProcess":
+        self._process = self._ctx.Process(
+            target=self._target(),
+            args=self._args(),
+            name=self.process_name,
+            # Ne daemon - trening (DataLoader) i evaluacija pokreću vlastite procese;
+            # gašenje je eksplicitno kroz terminate()
+            daemon=False
+        )
+        self._process.start()
+        return self
+
+    def _target(self):
+        return _train_worker
+
+    def _args(self) -> tuple:
+        return (
+            self.weights_path, self.config_path, self.dataset_dir,
+            self.evaluation_db_path, self.dataset_cache_dir, self.train_kwargs, self._events,
+            self.budget, self.resume
+        )
+
+    @property
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    @property
+    def exitcode(self) -> Optional[int]:
+        return self._process.exitcode if self._process else None
+
+    def next_event(self, timeout: float = 0.5) -> Optional[dict]:
+        """Sljedeći događaj ili None (timeout / proces završio bez poruke)"""
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def terminate(self, timeout: float = 10.0) -> None:
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
@@ -2,7 +2,13 @@
 ML sloj - YOLO Classifier
 Wrapper oko Ultralytics YOLOv8s modela
 """
-from typing import List
+import os
+import time
+import asyncio
+import hashlib
+import threading
+from functools import partial
+from typing import List, Optional, Tuple
 from ultralytics import YOLO
 import sys
 
@@ -14,29 +20,114 @@ class YoloClassifier:
     """
     YOLO wrapper za parking detekciju
     Izvučeno iz main_old_notInUse.py - sva YOLO logika
+
+    Dva modela:
+    - učitelj (model, best.pt): fine-tune, labele za učenje, audit
+    - student (opciono, destilovan): brza detekcija - kad je učitan,
+      predict/predict_batch ga koriste, osim uz use_teacher=True
+
+    predict_tier: jedan nivo kaskade (student → učitelj) sa verzijom i latencijom
     """
 
     def __init__(self, model_path: str):
         self.model_path = model_path
         self.model = YOLO(model_path)
+        self.teacher_version = self.weights_hash(model_path)
+        self.student = None
+        self.student_path: Optional[str] = None
+        self.student_version: Optional[str] = None
+        # Ultralytics predictor nije thread-safe (HTTP + pozadinski worker)
+        self._lock = threading.Lock()
+        self._student_lock = threading.Lock()
+
+    @property
+    def model_version(self) -> str:
+        """Verzija modela koji služi detekciju (student ako je učitan)"""
+        return self.student_version or self.teacher_version
+
+    @property
+    def has_student(self) -> bool:
+        return self.student is not None
 
-    async def predict(self, image_path: str) -> List[Detection]:
+    async def predict(self, image_path: str, image=None, use_teacher: bool = False) -> List[Detection]:
         """
         Detektuje objekte na slici
         Vraća samo "sirove" detekcije - nema domenskih odluka!
+        image: već dekodirana BGR slika (ako postoji - YOLO je ne čita ponovo)
+        use_teacher: učitelj i kad je student učitan (labele za učenje, audit)
 
         OVO JE BILO U main_old_notInUse.py:
             results = model(image_path)
             for box in results[0].boxes:
                 ...
         """
-        results = self.model(image_path)
+        detections, _, _ = await self.predict_tier(image_path, image, use_teacher)
+        return detections
+
+    async def predict_tier(
+            self,
+            image_path: str,
+            image=None,
+            use_teacher: bool = False,
+            conf: Optional[float] = None
+    ) -> Tuple[List[Detection], str, float]:
+        """
+        Kao predict, uz verziju modela koji je odgovorio i ms inferencije
+        conf: prag detekcija (None = Ultralytics default) - kaskada traži
+              i nesigurne detekcije studenta
+        """
+        source = image if image is not None else image_path
+        model, lock, version = self._serving(use_teacher)
+        options = {} if conf is None else {"conf": conf}
+
+        def run():
+            with lock:
+                started = time.perf_counter()
+                results = model(source, **options)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            return self._to_detections(results[0], image_path), elapsed_ms
+
+        # Inferencija (i čekanje na lock pozadinskog workera) radi u threadu
+        detections, elapsed_ms = await asyncio.to_thread(run)
+        return detections, version, elapsed_ms
+
+    async def predict_batch(self, images: list, image_paths: List[str],
+                            use_teacher: bool = False) -> List[List[Detection]]:
+        """
+        Detekcija nad više već dekodiranih slika u JEDNOM pozivu modela
+        (batch inferencija - za offline obradu velikog broja slika)
+        Inferencija radi u threadu - event loop (ostale faze) nije blokiran
+        """
+        if not images:
+            return []
+
+        model, lock, _ = self._serving(use_teacher)
+
+        def run():
+            with lock:
+                results = model(images, verbose=False)
+            return [
+                self._to_detections(result, path)
+                for result, path in zip(results, image_paths)
+            ]
+
+        return await asyncio.to_thread(run)
+
+    def _serving(self, use_teacher: bool):
+        """(model, lock, verzija) za inferenciju - student ako je učitan i nije tražen učitelj"""
+        student, student_version = self.student, self.student_version
+        if student is None or use_teacher:
+            return self.model, self._lock, self.teacher_version
+        return student, self._student_lock, student_version
+
+    def _to_detections(self, result, image_path: str) -> List[Detection]:
+        """Ultralytics rezultat → lista Detection"""
         detections = []
 
-        for box in results[0].boxes:
+        for box in result.boxes:
             xyxy = box.xyxy[0].tolist()
             cls_id = int(box.cls[0])
-            cls_name = self.model.names[cls_id]
+            cls_name = result.names[cls_id]
             conf = float(box.conf[0])
 
             detections.append(Detection(
@@ -58,15 +149,40 @@ class YoloClassifier:
             freeze: int = 10,
             project: str = 'backend/retraining_runs',
             name: str = 'retrain',
-            exist_ok: bool = True
+            exist_ok: bool = True,
+            dataset_cache=None,
+            processes: int = 1,
+            threads: Optional[int] = None
     ):
         """
         Fine-tuning postojećeg modela
+        dataset_cache: DatasetCache - slike/labele iz memmap keša (bez dekodiranja po epohi)
+        processes > 1: data-parallel trening u toliko procesa (gloo, CPU) - traži dataset_cache;
+                       threads (ukupno, default sva jezgra) se dijele među procesima.
+                       Vraća {"best_path", "last_path", "epochs", "scaling"}
 
         OVO JE BILO U main_old_notInUse.py:
             current_model.train(data=config_path, epochs=5, ...)
         """
+        if processes > 1:
+            if dataset_cache is None:
+                raise ValueError("Data-parallel trening traži dataset_cache")
+            from parking_agent.ML.distributed_trainer import train_distributed
+            return await asyncio.to_thread(
+                train_distributed,
+                self.model_path, config_path, dataset_cache, processes,
+                threads or os.cpu_count() or processes, batch,
+                epochs=epochs, imgsz=imgsz, lr0=lr0, freeze=freeze,
+                project=project, name=name, exist_ok=exist_ok
+            )
+
+        trainer = None
+        if dataset_cache is not None:
+            from parking_agent.ML.cached_trainer import CachedDetectionTrainer
+            trainer = partial(CachedDetectionTrainer, dataset_cache=dataset_cache)
+
         results = self.model.train(
+            trainer=trainer,
             data=config_path,
             epochs=epochs,
             imgsz=imgsz,
@@ -79,15 +195,21 @@ class YoloClassifier:
         )
         return results
 
-    async def evaluate(self, config_path: str) -> float:
+    async def evaluate(self, config_path: str, dataset_cache=None) -> float:
         """
         Evaluira model na datasetu i vraća mAP50
+        dataset_cache: DatasetCache - validacija bez dekodiranja slika
 
         OVO JE BILO U main_old_notInUse.py:
             metrics = model.val(data=config_path)
             map50 = metrics.box.map50
         """
-        metrics = self.model.val(data=config_path)
+        validator = None
+        if dataset_cache is not None:
+            from parking_agent.ML.cached_trainer import CachedDetectionValidator
+            validator = partial(CachedDetectionValidator, dataset_cache=dataset_cache)
+
+        metrics = self.model.val(validator=validator, data=config_path)
         return float(metrics.box.map50)
 
     def get_class_names(self) -> dict:
@@ -101,6 +223,40 @@ class YoloClassifier:
         OVO JE BILO U main_old_notInUse.py:
             global model
             model = YOLO("backend/weights/best.pt")
+
+        Student je destilovan iz starog učitelja - novi učitelj služi
+        detekciju dok novi student ne prođe destilaciju
         """
-        self.model_path = new_model_path
-        self.model = YOLO(new_model_path)
\ No newline at end of file
+        new_model = YOLO(new_model_path)
+        new_version = self.weights_hash(new_model_path)
+        with self._lock:
+            changed = new_version != self.teacher_version
+            self.model_path = new_model_path
+            self.model = new_model
+            self.teacher_version = new_version
+        if changed:
+            self.unload_student()
+
+    def load_student(self, student_path: str):
+        """Destilovani student preuzima detekciju (učitelj ostaje za labele/audit)"""
+        student = YOLO(student_path)
+        version = self.weights_hash(student_path)
+        with self._student_lock:
+            self.student = student
+            self.student_path = student_path
+            self.student_version = version
+
+    def unload_student(self):
+        with self._student_lock:
+            self.student = None
+            self.student_path = None
+            self.student_version = None
+
+    @staticmethod
+    def weights_hash(model_path: str) -> str:
+        """Verzija modela = SHA-256 težina (prvih 16 znakova)"""
+        h = hashlib.sha256()
+        with open(model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest()[:16]
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Application Layer - Analysis Pipeline
+Parking faze za core.pipeline: decode → detect → rules → OCR/DB → persist
+"""
+import json
+import asyncio
+import hashlib
+from typing import List
+import sys
+
+import cv2
+import numpy as np
+
+sys.path.append('../..')
+from core.pipeline import Pipeline, Stage, policy_stage, actuator_stage
+from core.software_agent import IPolicy, IActuator
+from parking_agent.domain.enums import DetectionStatus
+from parking_agent.application.services.detection_service import DetectionService
+
+RESULT_COLUMNS = [
+    "source", "image_hash", "model_version", "status", "message",
+    "prekrsaj_id", "detected_violation", "n_detections", "cars"
+]
+
+
+def decode_percept(percept: dict) -> dict:
+    """SENSE: bajtovi → BGR slika + hash (thread pool - cv2 oslobađa GIL)"""
+    data = percept.pop("data")
+    percept["image"] = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    percept["image_hash"] = hashlib.sha256(data).hexdigest()
+    return percept
+
+
+class BatchDetector:
+    """THINK (percepcija): YOLO nad batch-em slika - jedan poziv modela"""
+
+    def __init__(self, detection_service: DetectionService):
+        self.detection_service = detection_service
+
+    async def __call__(self, items: List[dict]) -> List[dict]:
+        valid = [item for item in items if item["image"] is not None]
+        detection_sets = await self.detection_service.detect_batch(
+            [item["source"] for item in valid],
+            [item["image"] for item in valid],
+            [item["image_hash"] for item in valid]
+        )
+        for item, detection_set in zip(valid, detection_sets):
+            item["detection_set"] = detection_set
+        return items
+
+
+class ViolationPolicy(IPolicy):
+    """THINK (odluka): kompajlirana pravila - sync, bez I/O"""
+
+    def __init__(self, detection_service: DetectionService):
+        self.detection_service = detection_service
+
+    def decide(self, item: dict) -> dict:
+        if "detection_set" in item:
+            item["analysis"] = self.detection_service.evaluate_detection_set(item["detection_set"])
+        return item
+
+
+class PlateResolver:
+    """ACT (priprema): OCR tablice + vozač iz baze za svako vozilo sa prekršajem"""
+
+    def __init__(self, detection_service: DetectionService):
+        self.detection_service = detection_service
+
+    async def __call__(self, item: dict) -> dict:
+        row = {"source": item["source"], "image_hash": item["image_hash"]}
+        analysis = item.get("analysis")
+        if analysis is None:
+            row.update({"status": "ERROR", "message": "Slika se ne može dekodirati"})
+            return {c: row.get(c) for c in RESULT_COLUMNS}
+
+        detection_set = item["detection_set"]
+        cars = []
+        for car in analysis.cars:
+            entry = {
+                "bbox": car.bbox,
+                "detected_violation": car.detected_violation.value if car.detected_violation else None,
+                "prekrsaj_id": car.prekrsaj_id,
+                "on_reservation": car.on_reservation
+            }
+            if car.prekrsaj_id is not None and analysis.status == DetectionStatus.NEEDS_ZOOM:
+                single_shot = await self.detection_service.try_single_shot(
+                    item["source"], item["image"], detection_set.detections, analysis, car
+                )
+                if single_shot:
+                    plate, result = single_shot
+                    entry.update({
+                        "plate": plate.plate_text,
+                        "plate_confidence": round(plate.confidence, 3),
+                        "vozac_id": (result.get("vozac") or {}).get("vozac_id"),
+                        "result": result["status"]
+                    })
+            cars.append(entry)
+
+        # Slika se ovdje ispušta - dalje idu samo rezultati
+        row.update({
+            "model_version": detection_set.model_version,
+            "status": analysis.status.value,
+            "message": analysis.message,
+            "prekrsaj_id": analysis.prekrsaj_id,
+            "detected_violation": analysis.detected_violation.value if analysis.detected_violation else None,
+            "n_detections": len(detection_set.detections),
+            "cars": json.dumps(cars, ensure_ascii=False)
+        })
+        return {c: row.get(c) for c in RESULT_COLUMNS}
+
+
+class ResultWriter(IActuator):
+    """ACT: upis rezultata (writer sa write(rows) - JSONL/Parquet)"""
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    async def execute(self, row: dict) -> dict:
+        await asyncio.to_thread(self.writer.write, [row])
+        return row
+
+
+def build_analysis_pipeline(
+        detection_service: DetectionService,
+        writer,
+        decode_workers: int = 4,
+        batch_size: int = 16,
+        ocr_workers: int = 1,
+        queue_size: int = 64
+) -> Pipeline:
+    """
+    decode (thread) → detect (batch) → rules (policy) → ocr+db (async) → persist
+
+    Pravila moraju biti kompajlirana prije pokretanja (await ensure_rules()).
+    ocr_workers: EasyOCR reader nije provjereno thread-safe - default 1
+    (OCR i dalje teče paralelno sa dekodiranjem i YOLO-om sljedećih slika)
+    """
+    return Pipeline([
+        Stage("decode", decode_percept, workers=decode_workers, executor="thread", queue_size=queue_size),
+        Stage("detect", BatchDetector(detection_service).__call__, batch_size=batch_size,
+              queue_size=max(queue_size, batch_size * 2)),
+        policy_stage("rules", ViolationPolicy(detection_service), queue_size=queue_size),
+        Stage("ocr+db", PlateResolver(detection_service).__call__, workers=ocr_workers, queue_size=queue_size),
+        actuator_stage("persist", ResultWriter(writer), queue_size=queue_size)
+    ])
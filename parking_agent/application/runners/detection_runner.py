@@ -9,6 +9,9 @@ sys.path.append('../..')
 from core.software_agent import SoftwareAgent
 from parking_agent.application.services.detection_service import DetectionService
 from parking_agent.application.services.review_service import ReviewService
+from parking_agent.application.services.analysis_session_store import (
+    AnalysisSessionStore, AnalysisSession
+)
 
 
 class DetectionRunner(SoftwareAgent):
@@ -28,12 +31,20 @@ class DetectionRunner(SoftwareAgent):
     def __init__(
             self,
             detection_service: DetectionService,
-            review_service: ReviewService
+            review_service: ReviewService,
+            sessions: AnalysisSessionStore
     ):
         self.detection_service = detection_service
         self.review_service = review_service
+        self.sessions = sessions
 
-    async def step_async(self, image_path: str, step_type: str = "first") -> dict:
+    async def step_async(
+            self,
+            image_path: str,
+            step_type: str = "first",
+            session_id: Optional[str] = None,
+            image_bytes: Optional[bytes] = None
+    ) -> dict:
         """
         Jedan korak detekcije
 
@@ -51,13 +62,15 @@ class DetectionRunner(SoftwareAgent):
         Args:
             image_path: Putanja do slike
             step_type: "first" ili "zoom"
+            session_id: Ako je zadat - kontekst analize se čuva za zoom/potvrdu
+            image_bytes: Sadržaj slike iz memorije (bez ponovnog čitanja diska)
 
         Returns:
             dict: Rezultat detekcije
         """
 
         if step_type == "first":
-            return await self._analyze_first_step(image_path)
+            return await self._analyze_first_step(image_path, session_id, image_bytes)
         elif step_type == "zoom":
             # Za zoom step treba dodatni parametri
             # Ovo će biti pozvano iz endpoint-a sa više parametara
@@ -65,51 +78,175 @@ class DetectionRunner(SoftwareAgent):
 
         return {"status": "error", "message": "Invalid step type"}
 
-    async def _analyze_first_step(self, image_path: str) -> dict:
+    async def _analyze_first_step(
+            self,
+            image_path: str,
+            session_id: Optional[str] = None,
+            image_bytes: Optional[bytes] = None
+    ) -> dict:
         """
         SENSE → THINK → ACT za prvu sliku (široki kadar)
         """
-        # SENSE: Slika je input (parametar)
+        # SENSE: Slika je input (parametar) - dekodira se jednom
+        image = await self.detection_service.load_image(image_path, image_bytes)
 
-        # THINK: Analiziraj kroz servis
-        analysis = await self.detection_service.analyze_first_image(image_path)
+        # THINK: Analiziraj kroz servis (student → učitelj kad student nije siguran)
+        detection_set, analysis = await self.detection_service.detect_and_analyze(
+            image_path, image, image_bytes
+        )
+
+        # Single-shot: čitljiva tablica već na širokoj slici → bez zoom koraka
+        main_car = next(
+            (c for c in analysis.cars if c.prekrsaj_id is not None and c.prekrsaj_id == analysis.prekrsaj_id),
+            None
+        )
+        single_shot = await self.detection_service.try_single_shot(
+            image_path, image, detection_set.detections, analysis, main_car
+        )
+
+        if session_id:
+            session = AnalysisSession(
+                session_id=session_id,
+                first_image_path=image_path,
+                first_image=image,
+                first_detections=detection_set,
+                analysis=analysis
+            )
+            if single_shot:
+                session.plate, session.zoom_result = single_shot
+            self.sessions.put(session)
 
         # ACT: Vrati rezultat
-        return {
+        result = {
             "status": analysis.status.value,
             "message": analysis.message,
             "prekrsaj_id": analysis.prekrsaj_id,
             "detected_violation": analysis.detected_violation.value if analysis.detected_violation else None,
             "on_reservation": analysis.on_reservation
         }
+        if single_shot:
+            plate, plate_result = single_shot
+            result.update(plate_result)
+            result["plate_confidence"] = round(plate.confidence, 3)
+            result["slika1"] = image_path
+
+        # Sva vozila sa slike - tablice ostalih vozila sa prekršajem se
+        # čitaju na zahtjev (read_car_plate), ne u ovom odgovoru
+        result["cars"] = self._cars_summary(analysis, main_car, single_shot)
+        return result
+
+    @staticmethod
+    def _cars_summary(analysis, main_car=None, main_single_shot=None) -> list:
+        """
+        Po vozilu: box, mjesto, prekršaj i tablica/vozač glavnog vozila
+        plate_pending: vozilo sa prekršajem čija tablica još nije čitana
+        (POST /analyze_car_plate sa session_id i car_index)
+        """
+        cars = []
+        for index, car in enumerate(analysis.cars):
+            entry = {
+                "index": index,
+                "bbox": car.bbox,
+                "spot": car.spot_class,
+                "on_reservation": car.on_reservation,
+                "detected_violation": car.detected_violation.value if car.detected_violation else None,
+                "prekrsaj_id": car.prekrsaj_id,
+                "plate_bbox": car.plate_bbox
+            }
+            single_shot = main_single_shot if car is main_car else None
+            if car is not main_car and car.prekrsaj_id is not None:
+                entry["plate_pending"] = True
+
+            if single_shot:
+                plate, plate_result = single_shot
+                entry.update({
+                    "status": plate_result["status"],
+                    "plate": plate.plate_text,
+                    "vozac": plate_result.get("vozac")
+                })
+            cars.append(entry)
+        return cars
+
+    async def read_car_plate(self, session_id: str, car_index: int) -> dict:
+        """
+        Tablica/vozač jednog (ne-glavnog) vozila sa prve slike
+        Koristi dekodiranu sliku i detekcije iz sesije - bez novog YOLO prolaza
+        """
+        session = self.sessions.get(session_id)
+        if not session or session.analysis is None:
+            return {"status": "ERROR", "message": "Sesija je istekla - ponovite analizu prve slike"}
+        if not 0 <= car_index < len(session.analysis.cars):
+            return {"status": "ERROR", "message": f"Nepoznato vozilo: {car_index}"}
+
+        car = session.analysis.cars[car_index]
+        if car.prekrsaj_id is None:
+            return {"car_index": car_index, "status": "NO_VIOLATION"}
+
+        single_shot = await self.detection_service.try_single_shot(
+            session.first_image_path,
+            session.first_image,
+            session.first_detections.detections,
+            session.analysis,
+            car
+        )
+        if not single_shot:
+            return {"car_index": car_index, "status": "NO_PLATE"}
+
+        plate, plate_result = single_shot
+        return {
+            "car_index": car_index,
+            "status": plate_result["status"],
+            "plate": plate.plate_text,
+            "vozac": plate_result.get("vozac")
+        }
 
     async def analyze_zoom_step(
             self,
             image_path: str,
-            prekrsaj_id: int,
-            on_reservation: bool,
-            first_image_path: str
+            prekrsaj_id: Optional[int] = None,
+            on_reservation: Optional[bool] = None,
+            first_image_path: Optional[str] = None,
+            session_id: Optional[str] = None
     ) -> dict:
         """
         SENSE → THINK → ACT za zoom sliku (tablica)
 
         Args:
             image_path: Zoom slika
-            prekrsaj_id: ID prekršaja sa prve slike
-            on_reservation: Da li je auto na rezervaciji
+            prekrsaj_id: ID prekršaja sa prve slike (ako nema sesije)
+            on_reservation: Da li je auto na rezervaciji (ako nema sesije)
             first_image_path: Putanja do prve slike (za rezultat)
+            session_id: Sesija iz prvog koraka - kontekst se uzima iz nje
 
         Returns:
             dict: Kompletan rezultat spremni za potvrdu
         """
-        # SENSE: Zoom slika + kontekst (prekrsaj_id, on_reservation)
+        # SENSE: Zoom slika + kontekst (iz sesije ili iz parametara)
+        session = self.sessions.get(session_id) if session_id else None
+        if session:
+            if prekrsaj_id is None:
+                prekrsaj_id = session.analysis.prekrsaj_id
+            if on_reservation is None:
+                on_reservation = session.analysis.on_reservation
+            first_image_path = first_image_path or session.first_image_path
+
+        if prekrsaj_id is None:
+            return {"status": "ERROR", "message": "Sesija je istekla - ponovite analizu prve slike"}
 
         # THINK: Analiziraj zoom sliku
-        result = await self.detection_service.analyze_zoom_image(
-            image_path,
-            prekrsaj_id,
-            on_reservation
-        )
+        detection_set = await self.detection_service.detect(image_path)
+        plate = await self.detection_service.read_plate(image_path, detection_set.detections)
+        if not plate:
+            result = {"status": "NO_PLATE"}
+        else:
+            result = await self.detection_service.resolve_plate(
+                plate.plate_text, prekrsaj_id, bool(on_reservation), image_path
+            )
+
+        if session:
+            session.plate = plate
+            session.zoom_image_path = image_path
+            session.zoom_result = result
 
         # ACT: Dodaj prvu sliku u rezultat
         if result.get("status") == "READY_TO_CONFIRM":
@@ -119,19 +256,31 @@ class DetectionRunner(SoftwareAgent):
 
     async def confirm_detection(
             self,
-            vozac_id: int,
-            prekrsaj_id: int,
-            slika1: str,
-            slika2: str = None
+            vozac_id: Optional[int] = None,
+            prekrsaj_id: Optional[int] = None,
+            slika1: Optional[str] = None,
+            slika2: str = None,
+            session_id: Optional[str] = None
     ) -> dict:
         """
         Potvrđuje detekciju i čuva za učenje
 
         SENSE → THINK → ACT → LEARN
         """
-        # SENSE: Potvrđeni podaci
-
-        # THINK: Validacija (opciono)
+        # SENSE: Potvrđeni podaci (ono što nedostaje dolazi iz sesije)
+        session = self.sessions.get(session_id) if session_id else None
+        if session:
+            zoom = session.zoom_result or {}
+            if vozac_id is None and zoom.get("vozac"):
+                vozac_id = zoom["vozac"]["vozac_id"]
+            if prekrsaj_id is None:
+                prekrsaj_id = zoom.get("prekrsaj_id", session.analysis.prekrsaj_id)
+            slika1 = slika1 or session.first_image_path
+            slika2 = slika2 or session.zoom_image_path
+
+        # THINK: Validacija
+        if vozac_id is None or prekrsaj_id is None or not slika1:
+            return {"status": "error", "message": "Nedostaju podaci za potvrdu (vozač/prekršaj/slika)"}
 
         # ACT: Evidentira u bazu
         # LEARN: Čuva za retraining
@@ -139,12 +288,15 @@ class DetectionRunner(SoftwareAgent):
             vozac_id, prekrsaj_id, slika1, slika2
         )
 
+        # Slike su već u blob store-u - sesija se zatvara
+        self._close_session(session_id)
         return result
 
     async def reject_detection(
             self,
-            image_path: str,
-            second_image_path: str = None
+            image_path: Optional[str] = None,
+            second_image_path: str = None,
+            session_id: Optional[str] = None
     ) -> dict:
         """
         Odbija detekciju (false positive)
@@ -152,6 +304,12 @@ class DetectionRunner(SoftwareAgent):
         SENSE → THINK → ACT → LEARN
         """
         # SENSE: Odbijeni podaci
+        session = self.sessions.get(session_id) if session_id else None
+        if session:
+            image_path = image_path or session.first_image_path
+            second_image_path = second_image_path or session.zoom_image_path
+        if not image_path:
+            return {"status": "error", "message": "Nema slike za odbijanje"}
 
         # THINK: (nema - direktno čuvamo)
 
@@ -160,19 +318,35 @@ class DetectionRunner(SoftwareAgent):
             image_path, second_image_path
         )
 
+        self._close_session(session_id)
         return result
 
-    async def confirm_ok_detection(self, image_path: str) -> dict:
+    async def confirm_ok_detection(
+            self,
+            image_path: Optional[str] = None,
+            session_id: Optional[str] = None
+    ) -> dict:
         """
         Potvrđuje OK detekciju (nema prekršaja)
 
         SENSE → THINK → ACT → LEARN
         """
         # SENSE: OK slika
+        session = self.sessions.get(session_id) if session_id else None
+        if session:
+            image_path = image_path or session.first_image_path
+        if not image_path:
+            return {"status": "error", "message": "Nema slike za čuvanje"}
 
         # THINK: (nema prekršaja)
 
         # ACT & LEARN: Čuva kao negativan primjer
         result = await self.review_service.save_confirmed_ok_detection(image_path)
 
-        return result
\ No newline at end of file
+        self._close_session(session_id)
+        return result
+
+    def _close_session(self, session_id: Optional[str]):
+        """Odluka je u journalu - kontekst analize više ne treba"""
+        if session_id:
+            self.sessions.discard(session_id)
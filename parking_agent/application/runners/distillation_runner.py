@@ -0,0 +1,62 @@
+"""
+Application Layer - Distillation Runner
+Agent ciklus za destilaciju studenta: Sense → Think → Act → Learn
+"""
+import time
+from typing import Optional
+import sys
+
+sys.path.append('../..')
+from core.software_agent import SoftwareAgent
+from parking_agent.domain.enums import LearningStatus
+from parking_agent.application.services.distillation_service import DistillationService
+from parking_agent.application.services.training_job_manager import TrainingJobManager
+
+
+class DistillationRunner(SoftwareAgent):
+    """
+    Runner za destilaciju
+
+    - SENSE: aktivni učitelj i student u registru (zastarjeli student se povlači)
+    - THINK: učitelj nema studenta (novi best.pt) i retraining ne radi
+    - ACT: pseudo-labele + trening studenta (DistillationService)
+    - LEARN: promovisan student služi detekciju
+
+    Retraining ima prednost - destilacija ne kreće dok posao treninga traje,
+    a nakon neuspjeha čeka cooldown_s.
+    """
+
+    def __init__(
+            self,
+            distillation_service: DistillationService,
+            training_jobs: Optional[TrainingJobManager] = None,
+            cooldown_s: float = 3600.0
+    ):
+        self.distillation_service = distillation_service
+        self.training_jobs = training_jobs
+        self.cooldown_s = cooldown_s
+        self._last_failure: Optional[float] = None
+
+    async def step_async(self, cancellation_token=None) -> Optional[dict]:
+        # SENSE + THINK
+        if not self.has_work():
+            return None
+
+        # ACT
+        result = await self.distillation_service.distill(cancellation_token)
+
+        # LEARN
+        print(f"🎓 LEARN (destilacija): Status = {result.get('status')}")
+        if result["status"] in (LearningStatus.ERROR.value, LearningStatus.CANCELLED.value,
+                                LearningStatus.NOT_ENOUGH_DATA.value):
+            self._last_failure = time.monotonic()
+        return result
+
+    def has_work(self) -> bool:
+        # SENSE: student starog učitelja (nakon retraininga) više ne služi detekciju
+        self.distillation_service.retire_stale_student()
+        if self.training_jobs is not None and self.training_jobs.active() is not None:
+            return False
+        if self._last_failure is not None and time.monotonic() - self._last_failure < self.cooldown_s:
+            return False
+        return self.distillation_service.needs_distillation()
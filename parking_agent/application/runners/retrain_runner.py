@@ -2,13 +2,16 @@
 Application Layer - Retrain Runner
 Agent ciklus za retraining modela: Sense → Think → Act → Learn
 """
+import time
 from typing import Optional
 import sys
 
 sys.path.append('../..')
 from core.software_agent import SoftwareAgent
+from parking_agent.domain.enums import LearningStatus
 from parking_agent.application.services.training_service import TrainingService
 from parking_agent.application.services.review_service import ReviewService
+from parking_agent.application.services.training_job_manager import TrainingJobManager, TrainingJobBusyError
 
 
 class RetrainRunner(SoftwareAgent):
@@ -23,21 +26,32 @@ class RetrainRunner(SoftwareAgent):
 
     OVO JE KLJUČ PROFESOROVOG ZAHTJEVA!
     Agent MORA imati jasno odvojen Sense→Think→Act→Learn ciklus.
+
+    Retraining radi kao pozadinski posao (TrainingJobManager):
+    - start_job() odmah vraća job_id (HTTP), step_async() čeka kraj (AgentHost)
+    - najviše jedan posao u isto vrijeme (drugi poziv dobija BUSY)
+    - nakon neuspjelog ili otkazanog pokušaja čeka cooldown_s i nove potvrđene
+      slike - model koji nije bio bolji ne trenira se ponovo nad istim podacima
+    - prekinut trening (active_run.json) nastavlja se bez čekanja
     """
 
     def __init__(
             self,
             training_service: TrainingService,
             review_service: ReviewService,
-            min_images: int = 20
+            min_images: int = 20,
+            cooldown_s: float = 600.0,
+            job_manager: Optional[TrainingJobManager] = None
     ):
         self.training_service = training_service
         self.review_service = review_service
         self.min_images = min_images
+        self.cooldown_s = cooldown_s
+        self.jobs = job_manager or TrainingJobManager(training_service)
 
     async def step_async(self, cancellation_token=None) -> Optional[dict]:
         """
-        Jedan korak retraining ciklusa
+        Jedan korak retraining ciklusa - čeka kraj posla
 
         PRIJE (u main_old_notInUse.py):
             @app.post("/retrain_model")
@@ -50,14 +64,39 @@ class RetrainRunner(SoftwareAgent):
                     ...
 
         POSLIJE (refaktorisano):
-            @app.post("/retrain_model")
-            async def retrain_model():
-                result = await retrain_runner.step_async()
-                return result  # 2 linije!
+            AgentHost poziva step_async(); HTTP poziva start_job()
+
+        Args:
+            cancellation_token: CancellationToken iz AgentHost-a (opciono)
 
         Returns:
             dict: Rezultat retraining-a (ili None ako nema posla)
         """
+        started = self._start(trigger="agent", cancellation_token=cancellation_token)
+        if "job" not in started:
+            return started
+
+        # ============================================
+        # LEARN: Ažuriraj znanje (dešava se u TrainingService)
+        # ============================================
+        # - Model je reload-ovan (ako je bolji)
+        # - Confirmed slike su arhivirane
+        result = await self.jobs.wait(started["job"])
+        print(f"🎓 LEARN: Status = {result.get('status')}")
+        return result
+
+    def start_job(self) -> dict:
+        """
+        Pokreće retraining u pozadini i odmah vraća job_id
+        Napredak: get_job(job_id) (polling) ili job.events_since (SSE)
+        """
+        started = self._start(trigger="manual")
+        job = started.pop("job", None)
+        if job is not None:
+            started.update(job.snapshot())
+        return started
+
+    def _start(self, trigger: str, cancellation_token=None) -> dict:
 
         # ============================================
         # SENSE: Očitaj stanje svijeta
@@ -81,23 +120,20 @@ class RetrainRunner(SoftwareAgent):
                 "required_count": self.min_images
             }
 
-        print(f"✅ THINK: Pokrećem retraining sa {confirmed_count} slika")
-
         # ============================================
-        # ACT: Pokreni retraining
+        # ACT: Pokreni retraining (pozadinski posao)
         # ============================================
-        result = await self.training_service.retrain_model()
-
-        # ============================================
-        # LEARN: Ažuriraj znanje (desilo se u TrainingService)
-        # ============================================
-        # - Model je reload-ovan (ako je bolji)
-        # - Confirmed slike su arhivirane
-        # - Brojač je resetovan
-
-        print(f"🎓 LEARN: Status = {result.get('status')}")
+        try:
+            job = self.jobs.start(trigger, cancellation_token, dataset_size=confirmed_count)
+        except TrainingJobBusyError as e:
+            return {
+                "status": "BUSY",
+                "message": str(e),
+                "job_id": e.job.job_id
+            }
 
-        return result
+        print(f"✅ THINK: Pokrećem retraining sa {confirmed_count} slika (posao {job.job_id})")
+        return {"job": job}
 
     def _should_retrain(self, confirmed_count: int) -> bool:
         """
@@ -110,19 +146,41 @@ class RetrainRunner(SoftwareAgent):
             confirmed_count: Broj confirmed slika
 
         Returns:
-            bool: True ako treba retraining
+            bool: True ako treba retraining (ili postoji prekinut trening za nastavak)
         """
-        return confirmed_count >= self.min_images
+        return confirmed_count >= self.min_images or self.training_service.has_resumable_run()
 
     def has_work(self) -> bool:
         """
         Override bazne klase - brža provjera bez izvršavanja step-a
 
         Returns:
-            bool: True ako ima dovoljno slika za retraining
+            bool: True ako ima dovoljno slika, nema treninga u toku,
+                  istekao je cooldown i stigle su nove slike od zadnjeg pokušaja
         """
+        if self.jobs.active() is not None:
+            return False
+        # Trening prekinut gašenjem/padom servera nastavlja se odmah
+        if self.training_service.has_resumable_run():
+            return True
         stats = self.review_service.get_learning_stats()
-        return stats["ready_for_retraining"]
+        if not stats["ready_for_retraining"]:
+            return False
+
+        # Neuspješan ili otkazan pokušaj - isti podaci ne pokreću novi trening
+        # (otkazan posao se ne pokreće sam ponovo odmah nakon otkazivanja)
+        last = self.jobs.last_finished()
+        if last is None or last.status not in (LearningStatus.NO_IMPROVEMENT.value, LearningStatus.ERROR.value,
+                                               LearningStatus.CANCELLED.value):
+            return True
+        if time.monotonic() - last.finished_monotonic < self.cooldown_s:
+            return False
+        return stats["confirmed_images"] > (last.dataset_size or 0)
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """Stanje posla za polling (None ako ne postoji)"""
+        job = self.jobs.get(job_id)
+        return job.snapshot() if job else None
 
     def get_learning_stats(self) -> dict:
         """
@@ -0,0 +1,53 @@
+"""
+Application Layer - Review Persistence Runner
+Agent ciklus za pozadinsko čuvanje review odluka: Sense → Act → Learn
+"""
+from typing import Optional
+import sys
+
+sys.path.append('../..')
+from core.software_agent import SoftwareAgent
+from parking_agent.application.services.review_service import ReviewService
+
+
+class ReviewPersistenceRunner(SoftwareAgent):
+    """
+    Runner za obradu review journala
+
+    Implementira agent ciklus:
+    - SENSE: Uzmi sljedeći posao iz journala
+    - ACT: Kopiraj sliku u dataset, generiši labele (ReviewService.process_job)
+    - LEARN: Dataset raste za sljedeći retraining
+
+    Neuspjeli poslovi se vraćaju u red (retry sa backoff-om).
+    """
+
+    def __init__(self, review_service: ReviewService):
+        self.review_service = review_service
+
+    async def step_async(self, cancellation_token=None) -> Optional[dict]:
+        """
+        Jedan korak - obradi TAČNO JEDAN posao iz journala
+
+        Returns:
+            dict: Rezultat posla (ili None ako je red prazan)
+        """
+        # SENSE
+        job = self.review_service.jobs.claim()
+        if job is None:
+            return None
+
+        # ACT + LEARN
+        try:
+            result = await self.review_service.process_job(job)
+        except Exception as e:
+            print(f"❌ Review posao {job['id']} neuspješan (pokušaj {job['attempts']}): {e}")
+            self.review_service.jobs.fail(job["id"], str(e))
+            return {"job_id": job["id"], "status": "retry", "error": str(e)}
+
+        self.review_service.complete_job(job)
+        return result
+
+    def has_work(self) -> bool:
+        """Brza provjera journala (indeksiran upit)"""
+        return self.review_service.jobs.has_pending()
@@ -0,0 +1,130 @@
+"""
+Application Layer - Analysis Session Store
+Kontekst dvostepene analize (prva slika → zoom → potvrda) na serveru
+"""
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Callable, Any
+import sys
+
+sys.path.append('..')
+from parking_agent.domain.entities import DetectionSet, ViolationAnalysis, PlateRecognition
+
+
+@dataclass
+class AnalysisSession:
+    """
+    Sve što je izračunato za jednu analizu - zoom i potvrda ga ponovo koriste
+    """
+    session_id: str
+    first_image_path: str
+    first_image: Any = None  # dekodirana slika (numpy BGR)
+    first_detections: Optional[DetectionSet] = None
+    analysis: Optional[ViolationAnalysis] = None
+    plate: Optional[PlateRecognition] = None
+    zoom_image_path: Optional[str] = None
+    zoom_result: Optional[dict] = None
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+
+    @property
+    def nbytes(self) -> int:
+        return getattr(self.first_image, "nbytes", 0)
+
+
+class AnalysisSessionStore:
+    """
+    In-memory LRU sa TTL-om
+
+    - max_sessions: najviše ovoliko otvorenih analiza
+    - max_bytes: ukupna memorija dekodiranih slika
+    - ttl_seconds: sesija bez pristupa duže od ovoga ističe
+    - on_evict(session_id): poziva se kad sesija ispadne (npr. brisanje uploada)
+    """
+
+    def __init__(
+            self,
+            ttl_seconds: float = 1800,
+            max_sessions: int = 64,
+            max_bytes: int = 512 * 1024 * 1024,
+            on_evict: Optional[Callable[[str], None]] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._sessions: "OrderedDict[str, AnalysisSession]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, session: AnalysisSession) -> None:
+        """Dodaje (ili zamjenjuje) sesiju i izbacuje najstarije preko limita"""
+        with self._lock:
+            old = self._sessions.pop(session.session_id, None)
+            if old:
+                self._bytes -= old.nbytes
+            self._sessions[session.session_id] = session
+            self._bytes += session.nbytes
+            evicted = self._evict_locked()
+        self._notify(evicted)
+
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        """Vraća sesiju (i osvježava je) ili None ako ne postoji/istekla je"""
+        with self._lock:
+            evicted = self._evict_locked()
+            session = self._sessions.get(session_id)
+            if session:
+                session.last_access = time.time()
+                self._sessions.move_to_end(session_id)
+        self._notify(evicted)
+        return session
+
+    def discard(self, session_id: str) -> None:
+        """Zatvara sesiju (npr. nakon potvrde/odbijanja)"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session:
+                self._bytes -= session.nbytes
+        if session:
+            self._notify([session_id])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes
+            }
+
+    def _evict_locked(self) -> list:
+        """Istekle sesije + LRU preko limita (poziva se pod lock-om)"""
+        evicted = []
+        cutoff = time.time() - self.ttl_seconds
+        for session_id, session in list(self._sessions.items()):
+            if session.last_access < cutoff:
+                evicted.append(session_id)
+
+        for session_id in evicted:
+            self._bytes -= self._sessions.pop(session_id).nbytes
+
+        # Najnovija sesija ostaje čak i ako sama prelazi max_bytes
+        while len(self._sessions) > self.max_sessions or (
+                len(self._sessions) > 1 and self._bytes > self.max_bytes
+        ):
+            session_id, session = self._sessions.popitem(last=False)
+            self._bytes -= session.nbytes
+            evicted.append(session_id)
+
+        return evicted
+
+    def _notify(self, session_ids: list):
+        if not self.on_evict:
+            return
+        for session_id in session_ids:
+            try:
+                self.on_evict(session_id)
+            except Exception as e:
+                print(f"⚠️ Greška pri zatvaranju sesije {session_id}: {e}")
@@ -0,0 +1,146 @@
+"""
+Application Layer - Detection Cascade
+Kaskadna detekcija: student (brz) prvi, učitelj samo kad student nije siguran
+ili pravila ne mogu odlučiti
+"""
+import threading
+from collections import deque, Counter
+from dataclasses import dataclass
+from typing import Optional, List, Tuple
+import sys
+
+sys.path.append('..')
+from parking_agent.domain.entities import Detection, ViolationAnalysis
+
+STUDENT_TIER = "student"
+TEACHER_TIER = "teacher"
+
+
+@dataclass(frozen=True)
+class CascadePolicy:
+    """
+    Kada prva slika ide na učitelja
+
+    candidate_conf: student radi sa nižim pragom - vide se i "skoro" detekcije
+    serve_conf: prag detekcija koje student vraća (Ultralytics default)
+    uncertain_below: relevantna klasa sa conf u [candidate_conf, uncertain_below)
+                     → student nije siguran
+    relevant_classes: klase (prefiksi) od kojih zavisi odluka o prekršaju
+                      (Tablica nije - tablicu čita zoom / single-shot)
+    """
+    candidate_conf: float = 0.15
+    serve_conf: float = 0.25
+    uncertain_below: float = 0.6
+    relevant_classes: Tuple[str, ...] = (
+        "Auto", "ZauzetoMjesto", "InvalidskoMjesto",
+        "RezervacijaOznaka", "InvalidskaOznaka", "NepropisnoParkirano"
+    )
+
+    def is_relevant(self, detection: Detection) -> bool:
+        return detection.class_name.startswith(self.relevant_classes)
+
+    def served(self, candidates: List[Detection]) -> List[Detection]:
+        """Detekcije studenta koje ulaze u rezultat (conf >= serve_conf)"""
+        return [d for d in candidates if d.confidence >= self.serve_conf]
+
+    def escalation_reason(self, candidates: List[Detection], analysis: ViolationAnalysis) -> Optional[str]:
+        """
+        Razlog za učitelja (ili None - odluka studenta ostaje)
+        analysis: prostorna asocijacija nad served(candidates), PRIJE pravila
+
+        - "uncertain": relevantna detekcija u pojasu nesigurnosti
+        - "unpaired_violation": box prekršaja bez vozila (asocijacija nagađa vozilo)
+        - "conflicting_violations": vozilo sa više različitih prekršaja
+        - "unassigned_sign": oznaka rezervacije/invalida bez mjesta, a vozilo bez mjesta postoji
+        """
+        if any(self.is_relevant(d) and d.confidence < self.uncertain_below for d in candidates):
+            return "uncertain"
+
+        served = self.served(candidates)
+        if len(analysis.cars) > sum(1 for d in served if d.class_name == "Auto"):
+            return "unpaired_violation"
+        if any(len(set(car.violations)) > 1 for car in analysis.cars):
+            return "conflicting_violations"
+
+        without_spot = any(car.spot_class is None for car in analysis.cars)
+        if without_spot:
+            if analysis.has_reservation_sign and not any(car.on_reservation for car in analysis.cars):
+                return "unassigned_sign"
+            if (any(d.class_name == "InvalidskaOznaka" for d in served)
+                    and not any(car.on_invalid_spot for car in analysis.cars)):
+                return "unassigned_sign"
+        return None
+
+
+class CascadeMetrics:
+    """
+    Stopa eskalacije i latencija po nivou
+
+    - inferencija po nivou (student / učitelj): p50/p95/prosjek u ms
+    - ukupno po slici: samo student vs eskalirano (student + učitelj)
+    - slike iz DetectionRecordStore-a se broje odvojeno (bez latencije)
+    """
+
+    def __init__(self, window: int = 512):
+        self._lock = threading.Lock()
+        self.images = 0
+        self.cached = 0
+        self.escalated = 0
+        self.reasons = Counter()
+        self._tiers = {tier: _Latency(window) for tier in (STUDENT_TIER, TEACHER_TIER)}
+        self._paths = {path: _Latency(window) for path in ("student_only", "escalated")}
+
+    def record_cached(self) -> None:
+        with self._lock:
+            self.images += 1
+            self.cached += 1
+
+    def record(self, tier_ms: dict, reason: Optional[str] = None) -> None:
+        """tier_ms: {"student": ms, "teacher": ms} - nivoi koji su radili za ovu sliku"""
+        with self._lock:
+            self.images += 1
+            for tier, ms in tier_ms.items():
+                self._tiers[tier].add(ms)
+            if reason:
+                self.escalated += 1
+                self.reasons[reason] += 1
+            if STUDENT_TIER in tier_ms:
+                self._paths["escalated" if reason else "student_only"].add(sum(tier_ms.values()))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            computed = self.images - self.cached
+            return {
+                "images": self.images,
+                "cached": self.cached,
+                "escalated": self.escalated,
+                "escalation_rate": round(self.escalated / computed, 4) if computed else 0.0,
+                "reasons": dict(self.reasons),
+                "tiers": {tier: latency.snapshot() for tier, latency in self._tiers.items()},
+                "per_image": {path: latency.snapshot() for path, latency in self._paths.items()}
+            }
+
+
+class _Latency:
+    def __init__(self, window: int):
+        self.count = 0
+        self.total_ms = 0.0
+        self.recent = deque(maxlen=window)
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.recent.append(ms)
+
+    def snapshot(self) -> dict:
+        ordered = sorted(self.recent)
+
+        def percentile(q: float) -> float:
+            return round(ordered[min(int(len(ordered) * q), len(ordered) - 1)], 2) if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95)
+        }
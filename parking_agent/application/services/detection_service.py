@@ -2,16 +2,31 @@
 Application Layer - Detection Service
 Logika za analizu parking prekršaja (izvučeno iz main_old_notInUse.py)
 """
-from typing import Optional, List
+import asyncio
+import hashlib
+from dataclasses import asdict
+from typing import Optional, List, Tuple
 import sys
 
+import cv2
+import numpy as np
+
 sys.path.append('..')
-from parking_agent.domain.entities import ViolationAnalysis, Detection, Driver
-from parking_agent.domain.enums import DetectionStatus, ViolationType
+from parking_agent.domain.entities import (
+    ViolationAnalysis, Detection, DetectionSet, Driver, PlateRecognition, CarAssignment
+)
+from parking_agent.domain.enums import DetectionStatus
 from parking_agent.ML.yolo_classifier import YoloClassifier
-from parking_agent.infrastructure.database import ParkingDbContext
-from backend.ocr import read_plate
-from backend.utils import crop_plate
+from parking_agent.infrastructure.async_database import AsyncParkingDbContext
+from parking_agent.infrastructure.detection_store import DetectionRecordStore
+from parking_agent.infrastructure.dataset_manifest import file_sha256
+from parking_agent.application.services.spatial_association import SpatialAssociator
+from parking_agent.application.services.rule_engine import ViolationRuleEngine, RuleOutcome
+from parking_agent.application.services.cascade import (
+    CascadePolicy, CascadeMetrics, STUDENT_TIER, TEACHER_TIER
+)
+from backend.ocr import read_plate_with_confidence
+from backend.utils import crop_plate, crop_plate_array
 
 
 class DetectionService:
@@ -22,15 +37,202 @@ class DetectionService:
     - @app.post("/analyze_first_image")
     - @app.post("/analyze_zoom_image")
     - Sva poslovna pravila za parking enforcement
+
+    cascade: prva slika ide kroz studenta, a na učitelja samo kad student
+    nije siguran ili pravila ne mogu odlučiti (vidi detect_and_analyze)
     """
 
+    # Single-shot: tablica sa široke slike se čita samo ako je dovoljno čitljiva
+    SINGLE_SHOT_MIN_PLATE_WIDTH = 90  # px - manji box OCR ne čita pouzdano
+    SINGLE_SHOT_MIN_PLATE_HEIGHT = 20
+    SINGLE_SHOT_MIN_BOX_CONFIDENCE = 0.5
+    SINGLE_SHOT_MIN_OCR_CONFIDENCE = 0.6
+
     def __init__(
             self,
             classifier: YoloClassifier,
-            db_context: ParkingDbContext
+            db_context: AsyncParkingDbContext,
+            detection_store: Optional[DetectionRecordStore] = None,
+            associator: Optional[SpatialAssociator] = None,
+            rule_engine: Optional[ViolationRuleEngine] = None,
+            cascade: Optional[CascadePolicy] = None
     ):
         self.classifier = classifier
         self.db = db_context
+        self.detection_store = detection_store or DetectionRecordStore()
+        self.associator = associator or SpatialAssociator()
+        self.rules = rule_engine or ViolationRuleEngine()
+        self.cascade = cascade
+        self.cascade_metrics = CascadeMetrics()
+
+    async def ensure_rules(self) -> ViolationRuleEngine:
+        """Kompajlira pravila nad katalogom prekršaja (jedan upit, samo kad treba)"""
+        if not self.rules.is_compiled:
+            self.rules.compile(await self.db.get_all_violations())
+        return self.rules
+
+    def invalidate_rules(self) -> None:
+        """Katalog prekršaja se promijenio (hot-reload pravila)"""
+        self.rules.invalidate()
+
+    async def load_image(self, image_path: str, image_bytes: Optional[bytes] = None):
+        """
+        Dekodira sliku JEDNOM (iz memorije ako su bajtovi dostupni)
+        Isti dekoder kao YOLO loader (cv2.imdecode)
+        """
+        def decode():
+            data = image_bytes if image_bytes is not None else np.fromfile(image_path, np.uint8)
+            return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+        return await asyncio.to_thread(decode)
+
+    async def detect(
+            self,
+            image_path: str,
+            image=None,
+            image_bytes: Optional[bytes] = None
+    ) -> DetectionSet:
+        """
+        YOLO detekcija sa perzistentnim zapisom
+
+        Ako je ista slika (hash) već analizirana istim modelom,
+        vraća se sačuvani rezultat - bez ponovne inferencije.
+        image/image_bytes: već učitana slika (bez ponovnog čitanja diska)
+        """
+        image_hash = await self._image_hash(image_path, image_bytes)
+        model_version = self.classifier.model_version
+
+        record = await asyncio.to_thread(self.detection_store.get, image_hash, model_version)
+        if record:
+            return record
+
+        detections = await self.classifier.predict(image_path, image)
+        record = DetectionSet(
+            image_hash=image_hash,
+            model_version=model_version,
+            detections=detections,
+            image_path=image_path
+        )
+        await asyncio.to_thread(self.detection_store.save, record)
+        return record
+
+    async def detect_and_analyze(
+            self,
+            image_path: str,
+            image=None,
+            image_bytes: Optional[bytes] = None
+    ) -> Tuple[DetectionSet, ViolationAnalysis]:
+        """
+        Prva slika: detekcija + pravila (kaskadno ako je uključeno)
+
+        Kaskada (cascade zadat i student učitan):
+        1. student sa nižim pragom (CascadePolicy.candidate_conf)
+        2. CascadePolicy.escalation_reason nad detekcijama studenta
+        3. razlog postoji → učitelj, njegove detekcije odlučuju
+        Zapis (DetectionRecordStore) nosi verziju nivoa koji je odlučio -
+        zapis učitelja za sliku znači da je već eskalirana.
+        Bez kaskade: detect() + analyze_detection_set()
+        """
+        student_version = self.classifier.student_version
+        if self.cascade is None or student_version is None:
+            detection_set = await self.detect(image_path, image, image_bytes)
+            return detection_set, await self.analyze_detection_set(detection_set)
+
+        rules = await self.ensure_rules()
+        image_hash = await self._image_hash(image_path, image_bytes)
+
+        record = await asyncio.to_thread(self.detection_store.get, image_hash, self.classifier.teacher_version)
+        if record:
+            self.cascade_metrics.record_cached()
+            return record, self.evaluate_rules(self._analyze_detections(record.detections), rules)
+
+        # Zapis studenta (npr. iz /detect) nema nesigurne detekcije ispod serve_conf -
+        # razlog se ipak provjerava nad sačuvanim detekcijama
+        tier_ms = {}
+        record = await asyncio.to_thread(self.detection_store.get, image_hash, student_version)
+        if record:
+            candidates, version = record.detections, record.model_version
+        else:
+            candidates, version, tier_ms[STUDENT_TIER] = await self.classifier.predict_tier(
+                image_path, image, conf=self.cascade.candidate_conf
+            )
+        detections = self.cascade.served(candidates)
+        analysis = self._analyze_detections(detections)
+
+        reason = self.cascade.escalation_reason(candidates, analysis)
+        if reason:
+            detections, version, tier_ms[TEACHER_TIER] = await self.classifier.predict_tier(
+                image_path, image, use_teacher=True
+            )
+            analysis = self._analyze_detections(detections)
+
+        if not tier_ms:
+            self.cascade_metrics.record_cached()
+            return record, self.evaluate_rules(analysis, rules)
+
+        self.cascade_metrics.record(tier_ms, reason)
+        record = DetectionSet(
+            image_hash=image_hash,
+            model_version=version,
+            detections=detections,
+            image_path=image_path
+        )
+        await asyncio.to_thread(self.detection_store.save, record)
+        return record, self.evaluate_rules(analysis, rules)
+
+    def cascade_stats(self) -> dict:
+        """Stopa eskalacije i latencija po nivou (student / učitelj)"""
+        return {
+            "enabled": self.cascade is not None and self.classifier.has_student,
+            "policy": asdict(self.cascade) if self.cascade else None,
+            **self.cascade_metrics.snapshot()
+        }
+
+    async def _image_hash(self, image_path: str, image_bytes: Optional[bytes] = None) -> str:
+        if image_bytes is not None:
+            return hashlib.sha256(image_bytes).hexdigest()
+        return await asyncio.to_thread(file_sha256, image_path)
+
+    async def detect_batch(
+            self,
+            image_paths: List[str],
+            images: list,
+            image_hashes: List[str]
+    ) -> List[DetectionSet]:
+        """
+        Batch varijanta detect() - za offline obradu
+
+        Slike koje su već analizirane istim modelom dolaze iz store-a,
+        ostale idu kroz JEDAN batch poziv YOLO-a.
+        """
+        model_version = self.classifier.model_version
+
+        def lookup():
+            return [self.detection_store.get(h, model_version) for h in image_hashes]
+
+        records = await asyncio.to_thread(lookup)
+        missing = [i for i, record in enumerate(records) if record is None]
+
+        if missing:
+            predicted = await self.classifier.predict_batch(
+                [images[i] for i in missing],
+                [image_paths[i] for i in missing]
+            )
+            for i, detections in zip(missing, predicted):
+                records[i] = DetectionSet(
+                    image_hash=image_hashes[i],
+                    model_version=model_version,
+                    detections=detections,
+                    image_path=image_paths[i]
+                )
+
+            def save():
+                for i in missing:
+                    self.detection_store.save(records[i])
+
+            await asyncio.to_thread(save)
+
+        return records
 
     async def analyze_first_image(self, image_path: str) -> ViolationAnalysis:
         """
@@ -41,14 +243,26 @@ class DetectionService:
             if car_on_reservation and violations:
                 ...
         """
-        # Dohvati detekcije sa slike
-        detections = await self.classifier.predict(image_path)
+        # Dohvati detekcije sa slike (kaskadno) i primijeni pravila
+        _, analysis = await self.detect_and_analyze(image_path)
+        return analysis
 
+    async def analyze_detection_set(self, detection_set: DetectionSet) -> ViolationAnalysis:
+        """
+        THINK dio prve slike - pravila nad već izračunatim detekcijama
+        """
         # Analiziraj šta je detektovano
-        analysis = self._analyze_detections(detections)
+        analysis = self._analyze_detections(detection_set.detections)
 
         # Primjeni poslovna pravila
-        return self._apply_violation_rules(analysis)
+        return await self._apply_violation_rules(analysis)
+
+    def evaluate_detection_set(self, detection_set: DetectionSet) -> ViolationAnalysis:
+        """
+        Sync varijanta analyze_detection_set (za pipeline/thread pool)
+        Pravila moraju biti kompajlirana (await ensure_rules())
+        """
+        return self.evaluate_rules(self._analyze_detections(detection_set.detections))
 
     def _analyze_detections(self, detections: List[Detection]) -> ViolationAnalysis:
         """
@@ -76,61 +290,57 @@ class DetectionService:
             has_reservation_sign=has_reservation_sign,
             has_auto=has_auto,
             has_occupied_spot=has_occupied_spot,
-            violations=violations
+            violations=violations,
+            cars=self.associator.associate(detections)
         )
 
-    def _apply_violation_rules(self, analysis: ViolationAnalysis) -> ViolationAnalysis:
+    async def _apply_violation_rules(self, analysis: ViolationAnalysis) -> ViolationAnalysis:
         """
         Primjenjuje poslovna pravila za parking prekršaje
         KLJUČNA DOMENSKA LOGIKA - izvučena iz main_old_notInUse.py!
+
+        Pravila su deklarativna (rule_engine.default_rules) i kompajlirana u
+        lookup tabelu - po vozilu jedan lookup, bez upita u bazu. Prvo
+        vozilo sa prekršajem (s lijeva) je "glavno" i popunjava polja analize.
         """
-        car_on_reservation = (
-                analysis.has_reservation_sign and
-                analysis.has_auto and
-                analysis.has_occupied_spot
-        )
+        rules = await self.ensure_rules()
+        return self.evaluate_rules(analysis, rules)
 
-        # PRAVILO 1: Auto na rezervaciji + ima standardni prekršaj
-        if car_on_reservation and analysis.violations:
-            main_violation = analysis.violations[0]
-            violation = self.db.get_violation_by_description(main_violation)
-
-            if violation:
-                analysis.status = DetectionStatus.NEEDS_ZOOM
-                analysis.detected_violation = ViolationType(main_violation)
-                analysis.on_reservation = True
-                analysis.prekrsaj_id = violation.prekrsaj_id
-                analysis.message = f"⚠️ Prekršaj: {main_violation} + Auto na rezervaciji - provjeri tablicu"
-                return analysis
-
-        # PRAVILO 2: Auto na rezervaciji (pravilno parkiran, ali možda nema pravo)
-        if car_on_reservation:
-            violation = self.db.get_violation_by_description("Parkiranje_na_rezervisanom_mjestu")
-
-            if violation:
-                analysis.status = DetectionStatus.NEEDS_ZOOM
-                analysis.detected_violation = ViolationType.PARKIRANJE_NA_REZERVACIJI
-                analysis.on_reservation = True
-                analysis.prekrsaj_id = violation.prekrsaj_id
-                analysis.message = "🅿️ Auto na rezervacijskom mestu - provjeri tablicu"
-                return analysis
-
-        # PRAVILO 3: Standardni prekršaji (ne na rezervaciji)
-        if analysis.violations:
-            main_violation = analysis.violations[0]
-            violation = self.db.get_violation_by_description(main_violation)
-
-            if violation:
-                analysis.status = DetectionStatus.NEEDS_ZOOM
-                analysis.detected_violation = ViolationType(main_violation)
-                analysis.on_reservation = False
-                analysis.prekrsaj_id = violation.prekrsaj_id
-                analysis.message = f"⚠️ Prekršaj: {main_violation} - približi se za tablicu"
-                return analysis
+    def evaluate_rules(
+            self,
+            analysis: ViolationAnalysis,
+            rules: Optional[ViolationRuleEngine] = None
+    ) -> ViolationAnalysis:
+        """
+        Sync evaluacija (bez I/O) - pravila moraju biti kompajlirana (ensure_rules)
+        """
+        rules = rules or self.rules
+
+        main_outcome = None
+        violating = 0
+        for car in analysis.cars:
+            outcome = rules.evaluate(car)
+            if not outcome:
+                continue
+            car.detected_violation = outcome.violation_type
+            car.prekrsaj_id = outcome.prekrsaj_id
+            car.on_reservation = outcome.on_reservation
+            violating += 1
+            main_outcome = main_outcome or outcome
 
         # PRAVILO 4: Sve je OK - nema prekršaja
-        analysis.status = DetectionStatus.OK
-        analysis.message = "✅ Nema prekršaja - pravilno parkirano"
+        if not main_outcome:
+            analysis.status = DetectionStatus.OK
+            analysis.message = "✅ Nema prekršaja - pravilno parkirano"
+            return analysis
+
+        analysis.status = DetectionStatus.NEEDS_ZOOM
+        analysis.detected_violation = main_outcome.violation_type
+        analysis.on_reservation = main_outcome.on_reservation
+        analysis.prekrsaj_id = main_outcome.prekrsaj_id
+        analysis.message = main_outcome.message
+        if violating > 1:
+            analysis.message += f" (+{violating - 1} vozila sa prekršajem)"
         return analysis
 
     async def analyze_zoom_image(
@@ -145,34 +355,148 @@ class DetectionService:
         OVO JE BILO U main_old_notInUse.py @app.post("/analyze_zoom_image")
         """
         # Detektuj tablicu
-        detections = await self.classifier.predict(image_path)
+        detection_set = await self.detect(image_path)
 
-        plate_box = None
-        for det in detections:
-            if det.class_name.lower() == "tablica":
-                plate_box = det.bbox
-                break
+        plate = await self.read_plate(image_path, detection_set.detections)
+        if not plate:
+            return {"status": "NO_PLATE"}
+
+        return await self.resolve_plate(plate.plate_text, prekrsaj_id, on_reservation, image_path)
 
+    async def read_plate(
+            self,
+            image_path: str,
+            detections: List[Detection],
+            image=None
+    ) -> Optional[PlateRecognition]:
+        """
+        Pronalazi 'Tablica' box i čita tekst (OCR)
+        image: dekodirana slika - crop se radi u memoriji
+        """
+        plate_box = self._find_plate(detections)
         if not plate_box:
-            return {"status": "NO_PLATE"}
+            return None
 
         # OCR - pročitaj tablicu
-        crop_path = crop_plate(image_path, plate_box)
-        plate_text = read_plate(crop_path) or "Unknown"
+        return await self._ocr_plate(image_path, plate_box.bbox, image)
+
+    async def try_single_shot(
+            self,
+            image_path: str,
+            image,
+            detections: List[Detection],
+            analysis: ViolationAnalysis,
+            car: Optional[CarAssignment] = None
+    ) -> Optional[tuple]:
+        """
+        Single-shot: tablica se čita direktno sa široke slike
+
+        Samo ako je 'Tablica' box dovoljno velik i OCR dovoljno siguran;
+        inače None → standardni dvostepeni tok (NEEDS_ZOOM).
+        car: vozilo čija se tablica čita (default: glavno vozilo analize)
+        Returns: (PlateRecognition, rezultat kao iz zoom koraka)
+        """
+        if analysis.status != DetectionStatus.NEEDS_ZOOM or image is None:
+            return None
+
+        car = car or next(
+            (c for c in analysis.cars if c.prekrsaj_id == analysis.prekrsaj_id), None
+        )
+        if car is None or car.prekrsaj_id is None:
+            return None
 
+        plate_box = self._plate_for_car(car, detections, analysis)
+        if not plate_box or plate_box.confidence < self.SINGLE_SHOT_MIN_BOX_CONFIDENCE:
+            return None
+
+        x1, y1, x2, y2 = plate_box.bbox
+        if (x2 - x1) < self.SINGLE_SHOT_MIN_PLATE_WIDTH or (y2 - y1) < self.SINGLE_SHOT_MIN_PLATE_HEIGHT:
+            return None
+
+        plate = await self._ocr_plate(image_path, plate_box.bbox, image)
+        if plate.plate_text == "Unknown" or plate.confidence < self.SINGLE_SHOT_MIN_OCR_CONFIDENCE:
+            return None
+
+        result = await self.resolve_plate(
+            plate.plate_text, car.prekrsaj_id, car.on_reservation, image_path
+        )
+
+        # Nepoznat vozač može biti i pogrešno pročitana tablica - zoom odlučuje
+        if result.get("status") not in ("READY_TO_CONFIRM", "OK_WITH_RESERVATION"):
+            return None
+
+        result["slika2"] = None  # nema zoom slike
+        result["single_shot"] = True
+        result.setdefault("message", "📋 Tablica pročitana sa prve slike - spremno za potvrdu")
+        return plate, result
+
+    def _plate_for_car(
+            self,
+            car: CarAssignment,
+            detections: List[Detection],
+            analysis: ViolationAnalysis
+    ) -> Optional[Detection]:
+        """Tablica dodijeljena vozilu; sa jednim vozilom na slici - bilo koja"""
+        if car.plate_bbox:
+            return Detection(
+                image_path="",
+                class_name="Tablica",
+                confidence=car.plate_confidence,
+                bbox=car.plate_bbox
+            )
+        if len(analysis.cars) == 1:
+            return self._find_plate(detections)
+        return None
+
+    @staticmethod
+    def _find_plate(detections: List[Detection]) -> Optional[Detection]:
+        """Najsigurniji 'Tablica' box (ili None)"""
+        plates = [d for d in detections if d.class_name.lower() == "tablica"]
+        return max(plates, key=lambda d: d.confidence) if plates else None
+
+    async def _ocr_plate(self, image_path: str, bbox: List[float], image=None) -> PlateRecognition:
+        if image is not None:
+            crop = crop_plate_array(image, bbox)
+            plate_text, confidence = await asyncio.to_thread(read_plate_with_confidence, crop)
+        else:
+            crop_path = await asyncio.to_thread(crop_plate, image_path, bbox)
+            plate_text, confidence = await asyncio.to_thread(
+                lambda: read_plate_with_confidence(cv2.imread(crop_path))
+            )
+
+        return PlateRecognition(
+            plate_text=plate_text or "Unknown",
+            bbox=bbox,
+            confidence=confidence
+        )
+
+    async def resolve_plate(
+            self,
+            plate_text: str,
+            prekrsaj_id: int,
+            on_reservation: bool,
+            image_path: str
+    ) -> dict:
+        """
+        Tablica → vozač → prekršaj: rezultat spreman za potvrdu
+        """
         # Pronađi vozača
-        driver = self.db.get_driver_by_plate(plate_text)
+        driver = await self.db.get_driver_by_plate(plate_text)
         if not driver:
             return {"status": "NO_DRIVER", "plate": plate_text}
 
-        # Dohvati prekršaj
-        violation = self.db.get_violation_by_id(prekrsaj_id)
+        # Prekršaj iz kataloga (u memoriji)
+        rules = await self.ensure_rules()
+        violation = rules.violation_by_id(prekrsaj_id)
         if not violation:
             return {"status": "ERROR", "message": "Prekršaj nije pronađen"}
 
         # Primjeni logiku za rezervaciju
         if on_reservation:
-            return self._handle_reservation_violation(driver, violation, plate_text, image_path)
+            return self._handle_reservation_violation(
+                driver, violation, plate_text, image_path,
+                rules.combination(prekrsaj_id, True)
+            )
 
         # Standardni prekršaj
         return {
@@ -190,10 +514,12 @@ class DetectionService:
             driver: Driver,
             violation,
             plate_text: str,
-            image_path: str
+            image_path: str,
+            outcome: Optional[RuleOutcome] = None
     ) -> dict:
         """
         Logika za prekršaje na rezervacijskom mestu
+        outcome: kompajlirana kombinacija kazni (dodatni prekršaj ako postoji)
         """
         # Vozač IMA rezervaciju - parkiranje OK
         if driver.rezervacija:
@@ -204,23 +530,21 @@ class DetectionService:
                 "vozac": self._driver_to_dict(driver)
             }
 
-        # Vozač NEMA rezervaciju - dodatna kazna!
-        reservation_violation = self.db.get_violation_by_description(
-            "Parkiranje_na_rezervisanom_mjestu"
-        )
-
-        total_fine = violation.kazna
-        if reservation_violation:
-            total_fine += reservation_violation.kazna
+        # Vozač NEMA rezervaciju - dodatna kazna (ako je pravilo definiše)
+        extra_violation_id = outcome.extra_violation_id if outcome else None
+        total_fine = violation.kazna + (outcome.extra_kazna if outcome else 0)
+        opis = violation.opis
+        if extra_violation_id is not None:
+            opis = f"{violation.opis} + Parkiranje bez rezervacije"
 
         return {
             "status": "READY_TO_CONFIRM",
             "plate": plate_text,
             "vozac": self._driver_to_dict(driver),
-            "prekrsaj_opis": f"{violation.opis} + Parkiranje bez rezervacije",
+            "prekrsaj_opis": opis,
             "prekrsaj_kazna": total_fine,
             "prekrsaj_id": violation.prekrsaj_id,
-            "extra_violation_id": reservation_violation.prekrsaj_id if reservation_violation else None,
+            "extra_violation_id": extra_violation_id,
             "slika2": image_path
         }
 
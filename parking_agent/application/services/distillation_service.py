@@ -0,0 +1,268 @@
+"""
+Application Layer - Distillation Service
+Destilacija učitelja (best.pt) u manji student model za brzu CPU detekciju
+"""
+import os
+import json
+import shutil
+import asyncio
+from typing import Optional, Callable
+from datetime import datetime
+import sys
+
+sys.path.append('..')
+from core.agent_host import CancellationToken, OperationCancelledError
+from parking_agent.domain.entities import ModelVersion
+from parking_agent.domain.enums import LearningStatus
+from parking_agent.ML.yolo_classifier import YoloClassifier
+from parking_agent.ML.distillation import StudentDistillationProcess
+from parking_agent.ML.training_budget import TrainingBudget
+from parking_agent.infrastructure.file_storage import FileStorage
+from parking_agent.infrastructure.evaluation_store import EvaluationStore
+from parking_agent.infrastructure.model_registry import ModelRegistry
+from parking_agent.application.services.replay_buffer import ReplayBuffer
+
+
+class DistillationService:
+    """
+    Student se trenira iz aktivnog učitelja nad potvrđenim + arhiviranim slikama
+
+    - labele studenta: ground truth + sigurne detekcije učitelja (pseudo-labele)
+    - promocija samo ako je student mAP50 >= učitelj mAP50 - tolerance
+      (isti val skup, isti kod evaluacije)
+    - promovisan student se registruje (ModelRegistry, role="student") i
+      YoloClassifier ga koristi za detekciju; učitelj ostaje za labele i audit
+    """
+
+    def __init__(
+            self,
+            classifier: YoloClassifier,
+            file_storage: FileStorage,
+            registry: Optional[ModelRegistry] = None,
+            evaluation_store: Optional[EvaluationStore] = None,
+            dataset_cache_dir: str = "backend/dataset_cache",
+            weights_dir: str = "backend/weights",
+            runs_dir: str = "backend/distillation_runs",
+            student_init: str = "yolov8n.pt",
+            tolerance: float = 0.02,
+            max_images: int = 2000,
+            min_images: int = 20,
+            budget: Optional[TrainingBudget] = None
+    ):
+        self.classifier = classifier
+        self.storage = file_storage
+        self.registry = registry or ModelRegistry()
+        self.evaluations = evaluation_store or EvaluationStore()
+        self.dataset_cache_dir = dataset_cache_dir
+        self.weights_dir = weights_dir
+        self.runs_dir = runs_dir
+        self.student_init = student_init
+        self.tolerance = tolerance
+        self.min_images = min_images
+        self.budget = budget or TrainingBudget()
+        # Destilacija koristi sve potvrđene slike + do max_images iz arhive
+        self.replay_buffer = ReplayBuffer(
+            file_storage.manifest,
+            sorted(FileStorage.CLASS_MAPPING, key=FileStorage.CLASS_MAPPING.get),
+            capacity=max_images
+        )
+        # Učitelj za kojeg je student odbijen - ne destiluj ga ponovo
+        self._rejected_teacher: Optional[str] = None
+
+    def restore_active_student(self) -> Optional[ModelVersion]:
+        """Pri startu: aktivni student iz registra (ako težine postoje) preuzima detekciju"""
+        self.retire_stale_student()
+        student = self.registry.active("student")
+        if student is None or not os.path.exists(student.backup_path):
+            return None
+        self.classifier.load_student(student.backup_path)
+        print(f"🎒 Student {student.version_id} (učitelj {student.teacher_version}) služi detekciju")
+        return student
+
+    def retire_stale_student(self) -> Optional[ModelVersion]:
+        """
+        Aktivni student destilovan iz drugog učitelja (retraining je zamijenio
+        best.pt) se deaktivira i ne služi detekciju - učitelj služi dok novi
+        student ne prođe promociju
+        """
+        student = self.registry.active("student")
+        if student is None or student.teacher_version == self.classifier.teacher_version:
+            return None
+        self.registry.deactivate("student")
+        if self.classifier.student_version == student.version_id:
+            self.classifier.unload_student()
+        print(f"🎒 Student {student.version_id} povučen - učitelj {self.classifier.teacher_version} služi detekciju")
+        return student
+
+    def needs_distillation(self) -> bool:
+        """Aktivni učitelj nema studenta (a njegov student nije već odbijen)"""
+        teacher_version = self.classifier.teacher_version
+        if teacher_version == self._rejected_teacher:
+            return False
+        student = self.registry.active("student")
+        return student is None or student.teacher_version != teacher_version
+
+    async def distill(
+            self,
+            cancellation_token: Optional[CancellationToken] = None,
+            on_progress: Optional[Callable[[dict], None]] = None
+    ) -> dict:
+        """
+        Kompletan ciklus: izbor slika → pseudo-labele + trening studenta
+        (zaseban proces) → evaluacija oba modela → promocija ili odbijanje
+        """
+        token = cancellation_token or CancellationToken()
+        progress = on_progress or (lambda event: None)
+        teacher_path = self.classifier.model_path
+        teacher_version = self.classifier.teacher_version
+
+        run_dir = os.path.join(self.runs_dir, f"distill_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        selection = self._write_selection(run_dir)
+        if selection["train"] + selection["val"] < self.min_images:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            return {
+                "status": LearningStatus.NOT_ENOUGH_DATA.value,
+                "message": f"Potrebno je minimum {self.min_images} slika za destilaciju"
+            }
+        progress({"type": "selection", **selection})
+        print(f"🎒 Destilacija učitelja {teacher_version}: train {selection['train']}, val {selection['val']}")
+
+        try:
+            outcome = await self._run_process(teacher_path, run_dir, token, progress)
+            student_metrics, teacher_metrics = outcome["student_metrics"], outcome["teacher_metrics"]
+            student_map50, teacher_map50 = student_metrics["map50"], teacher_metrics["map50"]
+            latency = outcome["latency"]
+            print(f"📈 Učitelj mAP50: {teacher_map50:.3f} ({latency['teacher_ms']} ms), "
+                  f"student mAP50: {student_map50:.3f} ({latency['student_ms']} ms)")
+
+            token.raise_if_cancelled()
+            report = {
+                "teacher_map50": float(teacher_map50),
+                "student_map50": float(student_map50),
+                "tolerance": self.tolerance,
+                "latency": latency,
+                "pseudo_labels": outcome["pseudo_labels"]
+            }
+            if student_map50 < teacher_map50 - self.tolerance:
+                self._rejected_teacher = teacher_version
+                self.evaluations.forget_weights(student_metrics["weights_hash"])
+                return {
+                    "status": LearningStatus.NO_IMPROVEMENT.value,
+                    "message": f"Student mAP50 {student_map50:.3f} je više od {self.tolerance:.3f} "
+                               f"ispod učitelja ({teacher_map50:.3f}) - student nije promovisan",
+                    **report
+                }
+
+            version = self._promote(outcome["best_path"], student_metrics, teacher_metrics,
+                                    teacher_path, teacher_version, latency)
+            return {
+                "status": LearningStatus.SUCCESS.value,
+                "message": f"Student {version.version_id} služi detekciju "
+                           f"(mAP50 {student_map50:.3f} vs učitelj {teacher_map50:.3f})",
+                "student_version": version.version_id,
+                **report
+            }
+
+        except OperationCancelledError:
+            print("🛑 Destilacija otkazana")
+            return {
+                "status": LearningStatus.CANCELLED.value,
+                "message": "Destilacija je otkazana"
+            }
+
+        except Exception as e:
+            print(f"❌ Greška pri destilaciji: {e}")
+            return {
+                "status": LearningStatus.ERROR.value,
+                "message": f"Greška pri destilaciji: {str(e)}"
+            }
+
+    def _write_selection(self, run_dir: str) -> dict:
+        """selection.json: sve aktivne potvrđene slike + uzorak arhive, stabilna val podjela"""
+        os.makedirs(run_dir, exist_ok=True)
+        active = [
+            {"image_path": os.path.abspath(row["path"]),
+             "label_path": os.path.abspath(row["label_path"]) if row["label_path"] else None,
+             "image_hash": row["sha256"]}
+            for row in self.storage.manifest.iter_images("confirmed", status="active")
+            if os.path.exists(row["path"])
+        ]
+        archived = [
+            {"image_path": os.path.abspath(row["path"]),
+             "label_path": os.path.abspath(row["label_path"]) if row["label_path"] else None,
+             "image_hash": row["sha256"]}
+            for row in self.replay_buffer.sample_archive(exclude={item["image_hash"] for item in active})
+        ]
+        train, val = self.replay_buffer.split(active + archived)
+        with open(os.path.join(run_dir, "selection.json"), "w") as f:
+            json.dump({"train": train, "val": val}, f)
+        return {"active": len(active), "archived": len(archived), "train": len(train), "val": len(val)}
+
+    async def _run_process(
+            self,
+            teacher_path: str,
+            run_dir: str,
+            token: CancellationToken,
+            progress: Callable[[dict], None]
+    ) -> dict:
+        """Prati StudentDistillationProcess; otkazivanje terminira proces"""
+        process = StudentDistillationProcess(
+            teacher_path, self.student_init, run_dir, self.evaluations.db_path, self.dataset_cache_dir,
+            budget=self.budget,
+            imgsz=640,
+            project=self.runs_dir,
+            name=os.path.basename(run_dir) + "_train",
+            exist_ok=True
+        ).start()
+        try:
+            while True:
+                if token.is_cancelled:
+                    raise OperationCancelledError("Destilacija otkazana")
+
+                event = await asyncio.to_thread(process.next_event, 0.5)
+                if event is None:
+                    if not process.is_alive:
+                        event = process.next_event(0.1)
+                        if event is None:
+                            raise RuntimeError(f"Proces destilacije je prekinut (exit code {process.exitcode})")
+                    else:
+                        continue
+
+                if event["type"] == "result":
+                    return event
+                if event["type"] == "error":
+                    raise RuntimeError(event["message"])
+                progress(event)
+        finally:
+            process.terminate()
+
+    def _promote(self, best_path: str, student_metrics: dict, teacher_metrics: dict,
+                 teacher_path: str, teacher_version: str, latency: dict) -> ModelVersion:
+        """Težine studenta u weights/, registracija (učitelj + student) i prebacivanje detekcije"""
+        version_id = YoloClassifier.weights_hash(best_path)
+        student_path = os.path.join(self.weights_dir, f"student_{version_id}.pt")
+        shutil.copy(best_path, student_path)
+
+        now = datetime.now()
+        self.registry.register(ModelVersion(
+            version_id=teacher_version,
+            timestamp=now,
+            map50=float(teacher_metrics["map50"]),
+            backup_path=teacher_path,
+            is_active=True,
+            role="teacher",
+            latency_ms=latency["teacher_ms"]
+        ))
+        version = ModelVersion(
+            version_id=version_id,
+            timestamp=now,
+            map50=float(student_metrics["map50"]),
+            backup_path=student_path,
+            is_active=True,
+            role="student",
+            teacher_version=teacher_version,
+            latency_ms=latency["student_ms"]
+        )
+        self.registry.register(version)
+        self.classifier.load_student(student_path)
+        return version
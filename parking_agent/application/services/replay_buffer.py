@@ -0,0 +1,165 @@
+"""
+Application Layer - Replay Buffer
+Izbor podataka za retraining: nove potvrđene slike + klasno balansiran uzorak arhive
+"""
+import os
+import json
+import random
+import hashlib
+from typing import Dict, List, Optional, Tuple
+import sys
+
+import yaml
+
+sys.path.append('../..')
+from parking_agent.infrastructure.dataset_manifest import DatasetManifest
+
+BACKGROUND = "__background__"
+
+
+class ReplayBuffer:
+    """
+    Kontinuirano učenje bez zaboravljanja, uz fiksnu cijenu treninga
+
+    - nove slike (snapshot) ulaze sve
+    - iz arhive se bira najviše `capacity` slika, reservoir sampling-om
+      u JEDNOM prolazu kroz manifest (memorija O(capacity), ne O(arhive))
+    - balans klasa: svaka slika se nudi rezervoaru svoje najrjeđe klase
+      (po do sada viđenim brojačima); svaka klasa ima capacity // broj_klasa
+      mjesta, a prazna mjesta popunjava globalni rezervoar
+    - val skup: stabilan dio po hash-u slike (val_fraction) - ista slika je
+      uvijek u istom skupu, pa se predikcije starog modela mogu keširati
+    """
+
+    def __init__(
+            self,
+            manifest: DatasetManifest,
+            class_names: List[str],
+            capacity: int = 200,
+            val_fraction: float = 0.2,
+            seed: Optional[int] = None
+    ):
+        self.manifest = manifest
+        self.class_names = class_names
+        self.capacity = capacity
+        self.val_fraction = val_fraction
+        self.seed = seed
+
+    def sample_archive(self, exclude: Optional[set] = None) -> List[dict]:
+        """Klasno balansiran uzorak arhiviranih confirmed slika (najviše capacity)"""
+        exclude = set(exclude or ())
+        rng = random.Random(self.seed)
+        per_class = max(1, self.capacity // max(len(self.class_names), 1))
+
+        reservoirs: Dict[str, List[dict]] = {}
+        offered: Dict[str, int] = {}
+        seen_counts: Dict[str, int] = {}
+        overall: List[dict] = []
+        total = 0
+
+        for row in self.manifest.iter_images("confirmed", status="archived"):
+            if row["sha256"] in exclude or not os.path.exists(row["path"]):
+                continue
+            exclude.add(row["sha256"])  # ista slika u više arhiva - jednom
+
+            classes = [name for name, count in row["class_counts"].items() if count > 0]
+            for name in classes:
+                seen_counts[name] = seen_counts.get(name, 0) + 1
+            key = min(classes, key=lambda name: seen_counts[name]) if classes else BACKGROUND
+
+            offered[key] = offered.get(key, 0) + 1
+            _reservoir_offer(reservoirs.setdefault(key, []), row, offered[key], per_class, rng)
+            total += 1
+            _reservoir_offer(overall, row, total, self.capacity, rng)
+
+        selected, chosen = [], set()
+        for rows in reservoirs.values():
+            for row in rows:
+                if len(selected) < self.capacity and row["sha256"] not in chosen:
+                    selected.append(row)
+                    chosen.add(row["sha256"])
+        rng.shuffle(overall)
+        for row in overall:
+            if len(selected) >= self.capacity:
+                break
+            if row["sha256"] not in chosen:
+                selected.append(row)
+                chosen.add(row["sha256"])
+        return selected
+
+    def write_training_config(self, snapshot_dir: str) -> dict:
+        """
+        Piše train.txt, val.txt, selection.json i data.yaml u snapshot folder
+        Vraća {"config_path", "new", "replay", "train", "val"}
+        """
+        with open(os.path.join(snapshot_dir, "snapshot.json")) as f:
+            index = json.load(f)
+
+        new_items = [
+            {
+                "image_path": os.path.abspath(os.path.join(snapshot_dir, "images", name)),
+                "label_path": os.path.abspath(
+                    os.path.join(snapshot_dir, "labels", os.path.splitext(name)[0] + ".txt")
+                ),
+                "image_hash": entry["sha256"]
+            }
+            for name, entry in sorted(index.items())
+        ]
+        replay_items = [
+            {
+                "image_path": os.path.abspath(row["path"]),
+                "label_path": os.path.abspath(row["label_path"]) if row["label_path"] else None,
+                "image_hash": row["sha256"]
+            }
+            for row in self.sample_archive(exclude={item["image_hash"] for item in new_items})
+        ]
+
+        train, val = self.split(new_items + replay_items)
+
+        for split, split_items in (("train", train), ("val", val)):
+            with open(os.path.join(snapshot_dir, f"{split}.txt"), "w") as f:
+                f.writelines(item["image_path"] + "\n" for item in split_items)
+        with open(os.path.join(snapshot_dir, "selection.json"), "w") as f:
+            json.dump({"train": train, "val": val}, f)
+
+        config = {
+            'path': os.path.abspath(snapshot_dir),
+            'train': 'train.txt',
+            'val': 'val.txt',
+            'nc': len(self.class_names),
+            'names': self.class_names
+        }
+        config_path = os.path.join(os.path.abspath(snapshot_dir), "data.yaml")
+        with open(config_path, 'w') as f:
+            yaml.dump(config, f)
+
+        return {
+            "config_path": config_path,
+            "new": len(new_items),
+            "replay": len(replay_items),
+            "train": len(train),
+            "val": len(val)
+        }
+
+    def split(self, items: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """Stabilna train/val podjela po hash-u slike (items: {"image_hash", ...})"""
+        val = [item for item in items if self._is_val(item["image_hash"])]
+        train = [item for item in items if not self._is_val(item["image_hash"])]
+        if not val or not train:
+            # Premalo slika za podjelu - kao ranije, evaluacija na svim slikama
+            train, val = items, items
+        return train, val
+
+    def _is_val(self, image_hash: str) -> bool:
+        bucket = int(hashlib.sha256(image_hash.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return bucket < self.val_fraction
+
+
+def _reservoir_offer(reservoir: List[dict], row: dict, seen: int, size: int, rng: random.Random):
+    """Algorithm R: n-ti element ulazi sa vjerovatnoćom size / n"""
+    if len(reservoir) < size:
+        reservoir.append(row)
+        return
+    j = rng.randrange(seen)
+    if j < size:
+        reservoir[j] = row
@@ -2,14 +2,17 @@
 Application Layer - Review Service
 Logika za čuvanje potvrđenih/odbijenih detekcija (učenje)
 """
-from typing import Optional
+import asyncio
+from typing import Optional, List
 from datetime import datetime
 import sys
 
 sys.path.append('..')
 from parking_agent.domain.entities import ViolationRecord
-from parking_agent.infrastructure.database import ParkingDbContext
+from parking_agent.infrastructure.async_database import AsyncParkingDbContext
 from parking_agent.infrastructure.file_storage import FileStorage
+from parking_agent.infrastructure.job_queue import DurableJobQueue
+from parking_agent.infrastructure.detection_store import DetectionRecordStore
 from parking_agent.ML.yolo_classifier import YoloClassifier
 
 
@@ -22,17 +25,24 @@ class ReviewService:
     - @app.post("/record_ok_detection")
     - @app.post("/reject_detection")
     - @app.get("/learning_stats")
+
+    Endpointi samo evidentiraju odluku (DB zapis + slike u blob store +
+    posao u journal). Labele i kopije pravi pozadinski worker (process_job).
     """
 
     def __init__(
             self,
-            db_context: ParkingDbContext,
+            db_context: AsyncParkingDbContext,
             file_storage: FileStorage,
-            classifier: YoloClassifier
+            classifier: YoloClassifier,
+            job_queue: Optional[DurableJobQueue] = None,
+            detection_store: Optional[DetectionRecordStore] = None
     ):
         self.db = db_context
         self.storage = file_storage
         self.classifier = classifier
+        self.jobs = job_queue or DurableJobQueue()
+        self.detection_store = detection_store or DetectionRecordStore()
 
     async def save_confirmed_violation(
             self,
@@ -54,17 +64,18 @@ class ReviewService:
             slika1=slika1,
             slika2=slika2
         )
-        self.db.save_violation_record(record)
-
-        # 2. Čuvanje za učenje - generisanje YOLO labela
-        await self._save_for_learning(slika1, "first")
+        await self.db.save_violation_record(record)
 
+        # 2. Čuvanje za učenje - u pozadini (labele generiše worker)
+        images = [(slika1, "first")]
         if slika2:
-            await self._save_for_learning(slika2, "zoom")
+            images.append((slika2, "zoom"))
+        job_id = await self._enqueue("confirmed", images)
 
         return {
             "status": "success",
-            "message": "Prekršaj evidentiran i dodan u trening dataset"
+            "message": "Prekršaj evidentiran i dodan u trening dataset",
+            "job_id": job_id
         }
 
     async def save_confirmed_ok_detection(self, image_path: str) -> dict:
@@ -74,11 +85,12 @@ class ReviewService:
 
         OVO JE BILO U main_old_notInUse.py @app.post("/record_ok_detection")
         """
-        await self._save_for_learning(image_path, "ok")
+        job_id = await self._enqueue("confirmed", [(image_path, "ok")])
 
         return {
             "status": "success",
-            "message": "OK detekcija sačuvana za učenje"
+            "message": "OK detekcija sačuvana za učenje",
+            "job_id": job_id
         }
 
     async def save_rejected_detection(
@@ -91,32 +103,106 @@ class ReviewService:
 
         OVO JE BILO U main_old_notInUse.py @app.post("/reject_detection")
         """
-        saved_count = 0
-
-        # Sačuvaj first image
-        self.storage.save_rejected_image(image_path, "first")
-        saved_count += 1
-
-        # Sačuvaj zoom image (ako postoji)
+        # first image + zoom image (ako postoji)
+        images = [(image_path, "first")]
         if second_image_path:
-            self.storage.save_rejected_image(second_image_path, "zoom")
-            saved_count += 1
+            images.append((second_image_path, "zoom"))
+
+        job_id = await self._enqueue("rejected", images)
 
         return {
             "status": "success",
-            "message": f"Odbačeno {saved_count} slika",
-            "count": saved_count
+            "message": f"Odbačeno {len(images)} slika",
+            "count": len(images),
+            "job_id": job_id
         }
 
-    async def _save_for_learning(self, image_path: str, suffix: str):
+    async def _enqueue(self, kind: str, images: List[tuple]) -> int:
+        """
+        Upisuje odluku u journal
+        Slike se odmah ubacuju u blob store - upload se smije prepisati
+
+        Posao drži referencu na svaki blob dok se ne završi (complete_job),
+        pa GC ne briše slike poslova koji čekaju, u backoff-u su ili su
+        trajno 'failed' (ostaju za ručni pregled)
+        """
+        def journal():
+            digests = []
+            try:
+                for path, _ in images:
+                    digests.append(self.storage.ingest(path, retain=True))
+                payload = {
+                    "images": [
+                        {"digest": digest, "path": path, "suffix": suffix}
+                        for digest, (path, suffix) in zip(digests, images)
+                    ],
+                    "retained": True
+                }
+                return self.jobs.enqueue(kind, payload)
+            except Exception:
+                for digest in digests:
+                    self.storage.release_blob(digest)
+                raise
+
+        return await asyncio.to_thread(journal)
+
+    def complete_job(self, job: dict) -> None:
+        """
+        Označava posao završenim i vraća reference na njegove blobove
+        (slike su sada u dataset pogledima sa vlastitim referencama)
+        """
+        self.jobs.complete(job["id"])
+        # Poslovi iz journala od prije retain-a nemaju referencu za vratiti
+        if job["payload"].get("retained"):
+            for image in job["payload"]["images"]:
+                self.storage.release_blob(image["digest"])
+
+    async def process_job(self, job: dict) -> dict:
+        """
+        Pozadinska obrada jednog posla iz journala
+        Idempotentno - FileStorage ne duplira već sačuvane slike
+        """
+        saved = []
+        for image in job["payload"]["images"]:
+            blob_path = self.storage.blobs.path_for(image["digest"])
+
+            if job["kind"] == "confirmed":
+                saved.append(await self._save_for_learning(
+                    blob_path, image["suffix"], image["digest"]
+                ))
+            elif job["kind"] == "rejected":
+                saved.append(await asyncio.to_thread(
+                    self.storage.save_rejected_image,
+                    blob_path, image["suffix"], image["digest"]
+                ))
+            else:
+                raise ValueError(f"Nepoznat tip posla: {job['kind']}")
+
+        return {"job_id": job["id"], "kind": job["kind"], "saved": saved}
+
+    async def _save_for_learning(self, image_path: str, suffix: str, digest: Optional[str] = None):
         """
         Pomoćna metoda - čuva sliku + generiše YOLO labele
+
+        Labele za učenje daje učitelj (ne destilovani student): sačuvane
+        detekcije učitelja (npr. eskalirana analiza), inače inferencija učitelja.
         """
-        # Dohvati detekcije sa slike
-        detections = await self.classifier.predict(image_path)
+        digest = digest or await asyncio.to_thread(self.storage.ingest, image_path)
+
+        record = await asyncio.to_thread(self.detection_store.get, digest, self.classifier.teacher_version)
+        if record:
+            detections = record.detections
+        else:
+            detections = await self.classifier.predict(image_path, use_teacher=True)
 
         # Sačuvaj sliku + labele kroz FileStorage
-        self.storage.save_confirmed_image(image_path, detections, suffix)
+        return await asyncio.to_thread(
+            self.storage.save_confirmed_image, image_path, detections, suffix, digest
+        )
+
+    def get_review_queue_stats(self) -> dict:
+        """Stanje pozadinskog reda (backlog)"""
+        return self.jobs.stats()
 
     def get_learning_stats(self) -> dict:
         """
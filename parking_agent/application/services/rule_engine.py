@@ -0,0 +1,198 @@
+"""
+Application Layer - Rule Engine
+Deklarativna pravila za prekršaje, kompajlirana u lookup tabelu
+"""
+import threading
+from dataclasses import dataclass
+from typing import Optional, List, Tuple, Dict
+import sys
+
+sys.path.append('..')
+from parking_agent.domain.entities import CarAssignment, Violation
+from parking_agent.domain.enums import ViolationType
+
+RESERVATION_VIOLATION = ViolationType.PARKIRANJE_NA_REZERVACIJI.value
+
+# Osobine vozila (jedan bit po osobini)
+ON_RESERVATION = "on_reservation"
+ON_INVALID_SPOT = "on_invalid_spot"
+HAS_SPOT = "has_spot"
+VIOLATION_CLASSES = [
+    v.value for v in ViolationType if v is not ViolationType.PARKIRANJE_NA_REZERVACIJI
+]
+FEATURES = [ON_RESERVATION, ON_INVALID_SPOT, HAS_SPOT] + VIOLATION_CLASSES
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    Jedno pravilo: ako vozilo IMA sve 'requires' i NEMA nijednu 'forbids'
+    osobinu → prekršaj 'violation' (opis iz kataloga prekršaja)
+
+    extra_violation: dodatni prekršaj ako vozač nema pravo na mjesto
+    (kombinacija kazni - npr. prekršaj + parkiranje bez rezervacije)
+    """
+    name: str
+    requires: Tuple[str, ...]
+    violation: str
+    message: str
+    forbids: Tuple[str, ...] = ()
+    on_reservation: bool = False
+    extra_violation: Optional[str] = None
+
+
+def default_rules() -> List[Rule]:
+    """
+    Pravila iz main_old_notInUse.py, redom po prioritetu
+    (prvo pravilo koje odgovara pobjeđuje)
+    """
+    rules = []
+
+    # PRAVILO 1: Auto na rezervaciji + ima standardni prekršaj
+    for violation in VIOLATION_CLASSES:
+        rules.append(Rule(
+            name=f"rezervacija+{violation}",
+            requires=(ON_RESERVATION, violation),
+            violation=violation,
+            message=f"⚠️ Prekršaj: {violation} + Auto na rezervaciji - provjeri tablicu",
+            on_reservation=True,
+            extra_violation=RESERVATION_VIOLATION
+        ))
+
+    # PRAVILO 2: Auto na rezervaciji (pravilno parkiran, ali možda nema pravo)
+    rules.append(Rule(
+        name="rezervacija",
+        requires=(ON_RESERVATION,),
+        violation=RESERVATION_VIOLATION,
+        message="🅿️ Auto na rezervacijskom mestu - provjeri tablicu",
+        on_reservation=True
+    ))
+
+    # PRAVILO 3: Standardni prekršaji (ne na rezervaciji)
+    for violation in VIOLATION_CLASSES:
+        rules.append(Rule(
+            name=violation,
+            requires=(violation,),
+            violation=violation,
+            message=f"⚠️ Prekršaj: {violation} - približi se za tablicu"
+        ))
+
+    return rules
+
+
+@dataclass(frozen=True)
+class RuleOutcome:
+    """Kompajliran rezultat pravila - sve iz kataloga je već razriješeno"""
+    rule: str
+    violation_type: ViolationType
+    prekrsaj_id: int
+    opis: str
+    kazna: int
+    message: str
+    on_reservation: bool
+    extra_violation_id: Optional[int] = None
+    extra_kazna: int = 0
+
+
+class ViolationRuleEngine:
+    """
+    Pravila se pri kompajliranju pretvaraju u tabelu od 2^len(FEATURES)
+    ulaza: bitmaska osobina vozila → RuleOutcome (ili None).
+    Evaluacija je jedan lookup - bez I/O i bez if-lanaca.
+
+    Katalog prekršaja (prekrsaji tabela) se drži u memoriji; invalidate()
+    nakon izmjene kataloga (npr. /add_violation_type) → sljedeća
+    evaluacija ponovo učitava katalog i kompajlira tabelu. Do tada stara
+    tabela i dalje služi - nova se kompajlira pa zamjenjuje referencu.
+    """
+
+    def __init__(self, rules: Optional[List[Rule]] = None):
+        self.rules = rules or default_rules()
+        self._bits = {feature: 1 << i for i, feature in enumerate(FEATURES)}
+        self._table: Optional[List[Optional[RuleOutcome]]] = None
+        self._by_id: Dict[int, Violation] = {}
+        self._combinations: Dict[Tuple[int, bool], RuleOutcome] = {}
+        self._stale = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_compiled(self) -> bool:
+        return self._table is not None and not self._stale
+
+    def compile(self, catalog: List[Violation]) -> None:
+        """Katalog prekršaja + pravila → lookup tabela"""
+        by_description = {v.opis: v for v in catalog}
+
+        compiled = []
+        for rule in self.rules:
+            violation = by_description.get(rule.violation)
+            if violation is None:
+                continue  # prekršaj nije u katalogu - pravilo se preskače
+            extra = by_description.get(rule.extra_violation) if rule.extra_violation else None
+            outcome = RuleOutcome(
+                rule=rule.name,
+                violation_type=ViolationType(rule.violation),
+                prekrsaj_id=violation.prekrsaj_id,
+                opis=violation.opis,
+                kazna=violation.kazna,
+                message=rule.message,
+                on_reservation=rule.on_reservation,
+                extra_violation_id=extra.prekrsaj_id if extra else None,
+                extra_kazna=extra.kazna if extra else 0
+            )
+            compiled.append((self._mask(rule.requires), self._mask(rule.forbids), outcome))
+
+        table = [None] * (1 << len(FEATURES))
+        for mask in range(len(table)):
+            for required, forbidden, outcome in compiled:
+                if mask & required == required and not mask & forbidden:
+                    table[mask] = outcome
+                    break
+
+        combinations = {}
+        for _, _, outcome in compiled:
+            combinations.setdefault((outcome.prekrsaj_id, outcome.on_reservation), outcome)
+
+        with self._lock:
+            self._table = table
+            self._by_id = {v.prekrsaj_id: v for v in catalog}
+            self._combinations = combinations
+            self._stale = False
+
+    def invalidate(self) -> None:
+        """
+        Katalog se promijenio - tabela se kompajlira pri sljedećoj upotrebi
+        (evaluacija koja je već u toku koristi staru tabelu - nema None prozora)
+        """
+        with self._lock:
+            self._stale = True
+
+    def features_of(self, car: CarAssignment) -> int:
+        """Bitmaska osobina vozila"""
+        mask = 0
+        if car.on_reservation:
+            mask |= self._bits[ON_RESERVATION]
+        if car.on_invalid_spot:
+            mask |= self._bits[ON_INVALID_SPOT]
+        if car.spot_class:
+            mask |= self._bits[HAS_SPOT]
+        for violation in car.violations:
+            mask |= self._bits.get(violation, 0)
+        return mask
+
+    def evaluate(self, car: CarAssignment) -> Optional[RuleOutcome]:
+        """Pravila za jedno vozilo - jedan lookup u tabeli"""
+        return self._table[self.features_of(car)]
+
+    def violation_by_id(self, prekrsaj_id: int) -> Optional[Violation]:
+        return self._by_id.get(prekrsaj_id)
+
+    def combination(self, prekrsaj_id: int, on_reservation: bool) -> Optional[RuleOutcome]:
+        """Kompajlirana kombinacija kazni za (prekršaj, na rezervaciji)"""
+        return self._combinations.get((prekrsaj_id, on_reservation))
+
+    def _mask(self, features: Tuple[str, ...]) -> int:
+        mask = 0
+        for feature in features:
+            mask |= self._bits[feature]
+        return mask
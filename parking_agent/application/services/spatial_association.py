@@ -0,0 +1,198 @@
+"""
+Application Layer - Spatial Association
+Prostorna asocijacija detekcija: koje vozilo stoji na kojem mjestu,
+koja oznaka pripada kojem mjestu i koja tablica kojem vozilu
+"""
+from typing import List, Tuple
+import sys
+
+import numpy as np
+
+sys.path.append('..')
+from parking_agent.domain.entities import Detection, CarAssignment
+
+
+def boxes_array(detections: List[Detection]) -> np.ndarray:
+    """Lista detekcija → (N, 4) float32 [x1, y1, x2, y2]"""
+    if not detections:
+        return np.zeros((0, 4), dtype=np.float32)
+    return np.asarray([d.bbox for d in detections], dtype=np.float32).reshape(-1, 4)
+
+
+def _areas(boxes: np.ndarray) -> np.ndarray:
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+
+def intersection_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, M) površine presjeka svih parova"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    return np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, M) IoU svih parova"""
+    inter = intersection_matrix(a, b)
+    union = _areas(a)[:, None] + _areas(b)[None, :] - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def containment_matrix(outer: np.ndarray, inner: np.ndarray) -> np.ndarray:
+    """(N, M) udio površine inner[j] koji leži unutar outer[i]"""
+    inter = intersection_matrix(outer, inner)
+    inner_area = _areas(inner)[None, :]
+    return np.divide(inter, inner_area, out=np.zeros_like(inter), where=inner_area > 0)
+
+
+def greedy_match(scores: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """
+    1:1 uparivanje redova i kolona po opadajućem skoru (>= threshold)
+    Dovoljno za desetine boxova - bez Hungarian algoritma
+    """
+    if scores.size == 0:
+        return []
+    rows, cols = np.nonzero(scores >= threshold)
+    order = np.argsort(-scores[rows, cols], kind="stable")
+
+    used_rows, used_cols, pairs = set(), set(), []
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+def sign_to_spot(signs: np.ndarray, spots: np.ndarray, x_margin: float = 0.25) -> np.ndarray:
+    """
+    Oznaka (tabla) pripada mjestu ispod/iznad nje:
+    centar oznake po x mora biti unutar (proširenog) raspona mjesta,
+    a od kandidata se bira vertikalno najbliže mjesto.
+    Returns: (S,) indeks mjesta ili -1
+    """
+    if len(signs) == 0 or len(spots) == 0:
+        return np.full(len(signs), -1, dtype=np.int64)
+
+    cx = (signs[:, 0] + signs[:, 2]) / 2
+    cy = (signs[:, 1] + signs[:, 3]) / 2
+    margin = (spots[:, 2] - spots[:, 0]) * x_margin
+    inside_x = (cx[:, None] >= spots[None, :, 0] - margin) & (cx[:, None] <= spots[None, :, 2] + margin)
+
+    # vertikalna udaljenost od centra oznake do mjesta (0 ako je unutar)
+    dy = np.maximum.reduce([
+        spots[None, :, 1] - cy[:, None],
+        cy[:, None] - spots[None, :, 3],
+        np.zeros((len(signs), len(spots)), dtype=np.float32)
+    ])
+    dy = np.where(inside_x, dy, np.inf)
+
+    best = np.argmin(dy, axis=1)
+    return np.where(np.isfinite(dy[np.arange(len(signs)), best]), best, -1)
+
+
+class SpatialAssociator:
+    """
+    Povezuje sve boxove jedne slike odjednom (NumPy matrice):
+
+    - vozilo ↔ mjesto (ZauzetoMjesto / InvalidskoMjesto): IoU, 1:1
+    - oznaka (RezervacijaOznaka / InvalidskaOznaka) → mjesto: x-raspon + blizina
+    - NepropisnoParkirano_* → vozilo: IoU (box bez Auto para postaje vozilo)
+    - Tablica → vozilo: containment (tablica unutar boxa vozila)
+
+    Rezultat je lista CarAssignment sortirana s lijeva na desno.
+    """
+
+    CAR_CLASS = "Auto"
+    SPOT_CLASSES = ("ZauzetoMjesto", "InvalidskoMjesto")
+    RESERVATION_SIGN = "RezervacijaOznaka"
+    INVALID_SIGN = "InvalidskaOznaka"
+    PLATE_CLASS = "Tablica"
+    VIOLATION_PREFIX = "NepropisnoParkirano"
+
+    def __init__(
+            self,
+            spot_iou_threshold: float = 0.2,
+            violation_iou_threshold: float = 0.3,
+            plate_containment_threshold: float = 0.6
+    ):
+        self.spot_iou_threshold = spot_iou_threshold
+        self.violation_iou_threshold = violation_iou_threshold
+        self.plate_containment_threshold = plate_containment_threshold
+
+    def associate(self, detections: List[Detection]) -> List[CarAssignment]:
+        cars = [d for d in detections if d.class_name == self.CAR_CLASS]
+        spots = [d for d in detections if d.class_name in self.SPOT_CLASSES]
+        res_signs = [d for d in detections if d.class_name == self.RESERVATION_SIGN]
+        inv_signs = [d for d in detections if d.class_name == self.INVALID_SIGN]
+        plates = [d for d in detections if d.class_name.lower() == self.PLATE_CLASS.lower()]
+        violations = [d for d in detections if d.class_name.startswith(self.VIOLATION_PREFIX)]
+
+        car_boxes = boxes_array(cars)
+        violation_boxes = boxes_array(violations)
+
+        # NepropisnoParkirano_* → vozilo; nespareni box prekršaja je i sam vozilo
+        car_violations = {i: [] for i in range(len(cars))}
+        matched = np.zeros(len(violations), dtype=bool)
+        if len(cars) and len(violations):
+            iou = iou_matrix(car_boxes, violation_boxes)
+            best_car = np.argmax(iou, axis=0)
+            matched = iou[best_car, np.arange(len(violations))] >= self.violation_iou_threshold
+            for v in np.nonzero(matched)[0]:
+                car_violations[int(best_car[v])].append(violations[v].class_name)
+
+        for v in np.nonzero(~matched)[0]:
+            cars.append(violations[v])
+            car_violations[len(cars) - 1] = [violations[v].class_name]
+        car_boxes = boxes_array(cars)
+
+        assignments = [
+            CarAssignment(
+                bbox=list(map(float, car.bbox)),
+                confidence=car.confidence,
+                violations=car_violations[i]
+            )
+            for i, car in enumerate(cars)
+        ]
+        if not assignments:
+            return []
+
+        # Vozilo ↔ mjesto (1:1)
+        spot_boxes = boxes_array(spots)
+        spot_of_car = np.full(len(cars), -1, dtype=np.int64)
+        for c, s in greedy_match(iou_matrix(car_boxes, spot_boxes), self.spot_iou_threshold):
+            spot_of_car[c] = s
+            assignments[c].spot_class = spots[s].class_name
+            assignments[c].spot_bbox = list(map(float, spots[s].bbox))
+            assignments[c].on_invalid_spot = spots[s].class_name == "InvalidskoMjesto"
+
+        # Oznake → mjesto (bez detektovanih mjesta: direktno → vozilo)
+        targets = spot_boxes if len(spots) else car_boxes
+        for signs, attr in ((res_signs, "on_reservation"), (inv_signs, "on_invalid_spot")):
+            owner = sign_to_spot(boxes_array(signs), targets)
+            marked = set(int(o) for o in owner if o >= 0)
+            for c, assignment in enumerate(assignments):
+                key = spot_of_car[c] if len(spots) else c
+                if key >= 0 and key in marked:
+                    setattr(assignment, attr, True)
+
+        # Tablica → vozilo (najveći containment; kod jednakog - manje vozilo)
+        if plates:
+            plate_boxes = boxes_array(plates)
+            contain = containment_matrix(car_boxes, plate_boxes)
+            car_area = _areas(car_boxes)
+            score = contain - 1e-9 * car_area[:, None]
+            owner = np.argmax(score, axis=0)
+            for p in range(len(plates)):
+                c = int(owner[p])
+                if contain[c, p] < self.plate_containment_threshold:
+                    continue
+                if plates[p].confidence > assignments[c].plate_confidence:
+                    assignments[c].plate_bbox = list(map(float, plates[p].bbox))
+                    assignments[c].plate_confidence = plates[p].confidence
+
+        order = np.argsort(car_boxes[:, 0], kind="stable")
+        return [assignments[i] for i in order]
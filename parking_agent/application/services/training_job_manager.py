@@ -0,0 +1,200 @@
+"""
+Application Layer - Training Job Manager
+Retraining kao pozadinski posao: ID odmah, napredak (epohe) za polling/SSE, otkazivanje
+"""
+import time
+import uuid
+import asyncio
+import threading
+from typing import Optional, Dict, List, Tuple
+import sys
+
+sys.path.append('../..')
+from core.agent_host import CancellationToken
+from parking_agent.domain.enums import LearningStatus
+from parking_agent.application.services.training_service import TrainingService
+
+
+class TrainingJobBusyError(RuntimeError):
+    """Retraining je već u toku - dozvoljen je samo jedan posao"""
+
+    def __init__(self, job: "TrainingJob"):
+        super().__init__(f"Retraining je već u toku (posao {job.job_id})")
+        self.job = job
+
+
+class TrainingJob:
+    """
+    Jedan retraining posao
+
+    status: Training dok traje, zatim status rezultata (LearningStatus)
+    events: svi događaji redom (faza, epoha, done) - SSE klijent nastavlja od indeksa
+    """
+
+    def __init__(self, trigger: str, token: CancellationToken, dataset_size: Optional[int] = None):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.trigger = trigger
+        self.token = token
+        self.dataset_size = dataset_size
+        self.status = LearningStatus.TRAINING.value
+        self.phase = "queued"
+        self.epoch = 0
+        self.epochs = 0
+        self.metrics: dict = {}
+        self.result: Optional[dict] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.finished_monotonic: Optional[float] = None
+        self._events: List[dict] = []
+        self._cond = threading.Condition()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.finished_at is not None
+
+    def publish(self, event: dict) -> None:
+        """Događaj iz treninga (zove se iz niti posla)"""
+        with self._cond:
+            if event["type"] == "phase":
+                self.phase = event["phase"]
+            elif event["type"] == "epoch":
+                self.epoch = event["epoch"]
+                self.epochs = event["epochs"]
+                self.metrics = event["metrics"]
+            self._events.append({**event, "job_id": self.job_id, "at": time.time()})
+            self._cond.notify_all()
+
+    def finish(self, result: dict) -> None:
+        with self._cond:
+            self.result = result
+            self.status = result.get("status", LearningStatus.ERROR.value)
+            self.phase = "done"
+            self.finished_at = time.time()
+            self.finished_monotonic = time.monotonic()
+            self._events.append({"type": "done", "job_id": self.job_id, "at": self.finished_at, "result": result})
+            self._cond.notify_all()
+
+    def events_since(self, index: int, timeout: float) -> Tuple[List[dict], bool]:
+        """
+        Događaji od indeksa (čeka najviše timeout ako nema novih)
+        Vraća (događaji, kraj) - kraj=True kad je posao gotov i sve je isporučeno
+        """
+        with self._cond:
+            if index >= len(self._events) and not self.is_finished:
+                self._cond.wait(timeout)
+            events = self._events[index:]
+            return events, self.is_finished and index + len(events) >= len(self._events)
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[dict]:
+        with self._cond:
+            self._cond.wait_for(lambda: self.is_finished, timeout)
+            return self.result
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "job_id": self.job_id,
+                "trigger": self.trigger,
+                "status": self.status,
+                "phase": self.phase,
+                "epoch": self.epoch,
+                "epochs": self.epochs,
+                "metrics": dict(self.metrics),
+                "dataset_size": self.dataset_size,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "cancel_requested": self.token.is_cancelled,
+                "result": self.result
+            }
+
+
+class TrainingJobManager:
+    """
+    Pokreće TrainingService.retrain_model kao pozadinski posao
+
+    - start() odmah vraća TrainingJob (najviše jedan aktivan - inače TrainingJobBusyError)
+    - posao ima vlastitu nit + event loop; sam trening je u zasebnom procesu,
+      pa HTTP event loop i detekcija nisu blokirani
+    - cancel(job_id) otkazuje token - proces treninga se terminira
+    - čuva zadnjih `history` završenih poslova
+    """
+
+    def __init__(self, training_service: TrainingService, history: int = 20):
+        self.training_service = training_service
+        self.history = history
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._active: Optional[TrainingJob] = None
+        self._lock = threading.Lock()
+
+    def start(
+            self,
+            trigger: str = "manual",
+            parent_token: Optional[CancellationToken] = None,
+            dataset_size: Optional[int] = None
+    ) -> TrainingJob:
+        with self._lock:
+            if self._active is not None:
+                raise TrainingJobBusyError(self._active)
+            token = parent_token.child() if parent_token else CancellationToken()
+            job = TrainingJob(trigger, token, dataset_size)
+            self._active = job
+            self._jobs[job.job_id] = job
+            self._trim_locked()
+
+        threading.Thread(
+            target=lambda: asyncio.run(self._run(job)),
+            name=f"training-job-{job.job_id}",
+            daemon=True
+        ).start()
+        return job
+
+    def active(self) -> Optional[TrainingJob]:
+        return self._active
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def last_finished(self) -> Optional[TrainingJob]:
+        finished = [job for job in list(self._jobs.values()) if job.is_finished]
+        return max(finished, key=lambda job: job.finished_at) if finished else None
+
+    def list(self) -> List[dict]:
+        jobs = sorted(list(self._jobs.values()), key=lambda job: job.created_at, reverse=True)
+        return [job.snapshot() for job in jobs]
+
+    def cancel(self, job_id: str) -> bool:
+        """True ako je posao postojao i još nije bio završen"""
+        job = self._jobs.get(job_id)
+        if job is None or job.is_finished:
+            return False
+        job.token.cancel()
+        return True
+
+    def cancel_active(self) -> None:
+        job = self._active
+        if job is not None:
+            job.token.cancel()
+
+    async def wait(self, job: TrainingJob) -> dict:
+        """Čeka kraj posla bez blokiranja pozivaočevog event loop-a"""
+        return await asyncio.to_thread(job.wait)
+
+    async def _run(self, job: TrainingJob):
+        result = {"status": LearningStatus.ERROR.value, "message": "Posao je prekinut"}
+        try:
+            result = await self.training_service.retrain_model(job.token, on_progress=job.publish)
+        except Exception as e:
+            result = {"status": LearningStatus.ERROR.value, "message": f"Greška pri treniranju: {e}"}
+        finally:
+            # Prvo rezultat (cooldown/has_work ga vide), pa tek onda slobodan slot
+            with self._lock:
+                job.finish(result)
+                self._active = None
+
+    def _trim_locked(self):
+        finished = sorted(
+            (job for job in self._jobs.values() if job.is_finished),
+            key=lambda job: job.finished_at
+        )
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.job_id]
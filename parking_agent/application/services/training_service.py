@@ -3,15 +3,22 @@ Application Layer - Training Service
 Logika za retraining modela (izvučeno iz main_old_notInUse.py)
 """
 import os
-import yaml
+import json
 import shutil
+import asyncio
+from typing import Optional, Callable
 from datetime import datetime
 import sys
 
 sys.path.append('..')
+from core.agent_host import CancellationToken, OperationCancelledError
 from parking_agent.domain.enums import LearningStatus
 from parking_agent.ML.yolo_classifier import YoloClassifier
+from parking_agent.ML.training_process import YoloTrainingProcess
+from parking_agent.ML.training_budget import TrainingBudget
 from parking_agent.infrastructure.file_storage import FileStorage
+from parking_agent.infrastructure.evaluation_store import EvaluationStore
+from parking_agent.application.services.replay_buffer import ReplayBuffer
 
 
 class TrainingService:
@@ -28,123 +35,300 @@ class TrainingService:
             classifier: YoloClassifier,
             file_storage: FileStorage,
             confirmed_dir: str = "backend/confirmed",
-            weights_dir: str = "backend/weights"
+            weights_dir: str = "backend/weights",
+            evaluation_store: Optional[EvaluationStore] = None,
+            dataset_cache_dir: str = "backend/dataset_cache",
+            replay_buffer: Optional[ReplayBuffer] = None,
+            budget: Optional[TrainingBudget] = None,
+            runs_dir: str = "backend/retraining_runs",
+            max_resume_attempts: int = 3
     ):
         self.classifier = classifier
         self.storage = file_storage
         self.confirmed_dir = confirmed_dir
         self.weights_dir = weights_dir
+        # Keš evaluacije - stari model se evaluira samo na novim slikama
+        self.evaluations = evaluation_store or EvaluationStore()
+        # Dekodirane + smanjene slike (memmap) - dijeli ga FileStorage
+        self.dataset_cache_dir = dataset_cache_dir
+        # Arhiva ulazi u trening kao ograničen, klasno balansiran uzorak
+        self.replay_buffer = replay_buffer or ReplayBuffer(
+            file_storage.manifest,
+            sorted(FileStorage.CLASS_MAPPING, key=FileStorage.CLASS_MAPPING.get)
+        )
+        # Vrijeme/CPU, plato mAP50 i checkpoint svake epohe (noćni prozor održavanja)
+        self.budget = budget or TrainingBudget()
+        self.runs_dir = runs_dir
+        self.active_run_path = os.path.join(runs_dir, "active_run.json")
+        self.max_resume_attempts = max_resume_attempts
+        self._suspended = False
 
-    async def retrain_model(self) -> dict:
+    async def retrain_model(
+            self,
+            cancellation_token: Optional[CancellationToken] = None,
+            on_progress: Optional[Callable[[dict], None]] = None
+    ) -> dict:
         """
         Glavni metod za retraining - kompletan ciklus:
-        1. Provjera podataka
+        1. Provjera podataka (ili nastavak prekinutog treninga)
         2. Backup starog modela
-        3. Fine-tuning
-        4. Evaluacija
+        3. Fine-tuning u budžetu (zaseban proces, checkpoint svake epohe)
+        4. Evaluacija (novi i stari model, isti proces)
         5. Odluka: zamijeniti ili zadržati stari
 
+        cancellation_token: otkazivanje prekida proces treninga
+        on_progress: prima događaje (faza, epoha + metrike) za praćenje posla
+
         OVO JE BILO U main_old_notInUse.py @app.post("/retrain_model")
         """
-        # SENSE: Provjeri broj slika
-        num_images = self.storage.count_confirmed_images()
+        token = cancellation_token or CancellationToken()
+        progress = on_progress or (lambda event: None)
 
-        if num_images < 20:
-            return {
-                "status": LearningStatus.NOT_ENOUGH_DATA.value,
-                "message": f"Potrebno je minimum 20 slika, trenutno ima {num_images}"
-            }
+        run = self._load_active_run()
+        if run is not None:
+            print(f"♻️ Nastavljam prekinut retraining {run['name']} (pokušaj {run['attempts'] + 1})")
+            progress({"type": "resume", "name": run["name"], "attempts": run["attempts"],
+                      "stopper": run["stopper"]})
+        else:
+            # SENSE: Provjeri broj slika
+            num_images = self.storage.count_confirmed_images()
 
-        print(f"🚀 Pokrećem retraining sa {num_images} novih slika...")
+            if num_images < 20:
+                return {
+                    "status": LearningStatus.NOT_ENOUGH_DATA.value,
+                    "message": f"Potrebno je minimum 20 slika, trenutno ima {num_images}"
+                }
 
-        try:
-            # 1. Kreiraj config za YOLO
-            config_path = self._create_training_config()
+            print(f"🚀 Pokrećem retraining sa {num_images} novih slika...")
+            progress({"type": "phase", "phase": "snapshot", "images": num_images})
 
-            # 2. Backup trenutnog modela
-            current_model_path = os.path.join(self.weights_dir, "best.pt")
-            backup_path = self.storage.backup_model(current_model_path)
-            print(f"💾 Backup starog modela: {backup_path}")
+            # Zamrzni dataset - potvrde tokom treninga ne mijenjaju skup
+            snapshot_dir = self.storage.snapshot_confirmed_data()
+            try:
+                run = self._start_run(snapshot_dir, progress)
+            except Exception as e:
+                self.storage.discard_snapshot(snapshot_dir)
+                print(f"❌ Greška pri pripremi treninga: {e}")
+                return {
+                    "status": LearningStatus.ERROR.value,
+                    "message": f"Greška pri treniranju: {str(e)}"
+                }
+
+        snapshot_dir = run["snapshot_dir"]
+        run["attempts"] += 1
+        self._save_active_run(run)
 
-            # 3. Fine-tuning
+        try:
+            # 3 + 4. Fine-tuning i evaluacija - model u memoriji se ne dira
+            token.raise_if_cancelled()
             print("🏋️ Pokrećem treniranje...")
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-            await self.classifier.train(
-                config_path=config_path,
-                epochs=5,
-                imgsz=640,
-                batch=8,
-                lr0=0.0001,
-                freeze=10,
-                project='backend/retraining_runs',
-                name=f'retrain_{timestamp}'
-            )
-
-            # 4. Evaluacija NOVOG modela
-            print("📊 Evaluiram novi model...")
-            new_map50 = await self.classifier.evaluate(config_path)
-
-            # 5. Evaluacija STAROG modela (na istim podacima!)
-            print("📊 Evaluiram stari model...")
-            old_classifier = YoloClassifier(backup_path)
-            old_map50 = await old_classifier.evaluate(config_path)
-
-            print(f"📈 Stari model mAP50: {old_map50:.3f}")
+            outcome = await self._train_in_process(run, token, progress)
+            new_metrics, old_metrics = outcome["new_metrics"], outcome["old_metrics"]
+            new_map50 = new_metrics["map50"]
+            old_map50 = old_metrics["map50"]
+
+            print(f"📈 Stari model mAP50: {old_map50:.3f} (novih slika evaluirano: {old_metrics['predicted_images']})")
             print(f"📈 Novi model mAP50: {new_map50:.3f}")
 
-            # 6. THINK: Da li je novi model bolji?
+            # 5. THINK: Da li je novi model bolji?
+            token.raise_if_cancelled()
+            current_model_path = os.path.join(self.weights_dir, "best.pt")
+            progress({"type": "phase", "phase": "activate" if new_map50 > old_map50 else "keep"})
             if new_map50 > old_map50:
-                return await self._activate_new_model(
-                    timestamp, new_map50, old_map50, current_model_path
+                result = await self._activate_new_model(
+                    outcome["best_path"], new_map50, old_map50, current_model_path, snapshot_dir
                 )
             else:
-                return await self._keep_old_model(
-                    backup_path, current_model_path, new_map50, old_map50
+                self.storage.discard_snapshot(snapshot_dir)
+                # Odbačene težine se više nikad ne evaluiraju - ne čuvaj njihove predikcije
+                self.evaluations.forget_weights(new_metrics["weights_hash"])
+                result = await self._keep_old_model(
+                    run["backup_path"], current_model_path, new_map50, old_map50
                 )
+            self._clear_active_run()
+            result["per_class"] = self._per_class_report(new_metrics, old_metrics)
+            result["training"] = {
+                "epochs": run["epoch"],
+                "stop_reason": run.get("stop_reason"),
+                "attempts": run["attempts"],
+                **run["settings"],
+                **run["stopper"],
+                "scaling": run.get("scaling")
+            }
+            return result
+
+        except OperationCancelledError:
+            if self._suspended:
+                # Gašenje servera - snapshot i checkpoint ostaju za nastavak
+                print("⏸️ Retraining prekinut gašenjem - nastavlja se pri sljedećem pokretanju")
+                return {
+                    "status": LearningStatus.CANCELLED.value,
+                    "message": "Retraining je prekinut i biće nastavljen",
+                    "resumable": True
+                }
+            self._abandon_run(run)
+            print("🛑 Retraining otkazan")
+            return {
+                "status": LearningStatus.CANCELLED.value,
+                "message": "Retraining je otkazan"
+            }
 
         except Exception as e:
+            self._abandon_run(run)
             print(f"❌ Greška pri treniranju: {e}")
             return {
                 "status": LearningStatus.ERROR.value,
                 "message": f"Greška pri treniranju: {str(e)}"
             }
 
-    def _create_training_config(self) -> str:
+    def _start_run(self, snapshot_dir: str, progress: Callable[[dict], None]) -> dict:
+        """Izbor podataka + backup modela; stanje posla za nastavak nakon prekida"""
+        # 1. Izbor podataka: nove slike + uzorak arhive (replay) → train/val + config
+        selection = self.replay_buffer.write_training_config(snapshot_dir)
+        config_path = selection.pop("config_path")
+        progress({"type": "selection", **selection})
+        print(f"🧺 Dataset: {selection['new']} novih + {selection['replay']} iz arhive "
+              f"(train {selection['train']}, val {selection['val']})")
+
+        # 2. Backup trenutnog modela
+        backup_path = self.storage.backup_model(os.path.join(self.weights_dir, "best.pt"))
+        print(f"💾 Backup starog modela: {backup_path}")
+
+        return {
+            "name": f"retrain_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            "snapshot_dir": snapshot_dir,
+            "config_path": config_path,
+            "backup_path": backup_path,
+            "checkpoint": None,
+            "epoch": 0,
+            "attempts": 0,
+            "settings": {},
+            "stopper": {}
+        }
+
+    async def _train_in_process(
+            self,
+            run: dict,
+            token: CancellationToken,
+            progress: Callable[[dict], None]
+    ) -> dict:
         """
-        Generiše data.yaml config za YOLO trening
+        Pokreće YoloTrainingProcess i prosljeđuje njegove događaje
+        Otkazivanje tokena terminira proces (i trening i evaluaciju)
+        Svaka epoha ažurira active_run.json (checkpoint + potrošen budžet)
         """
-        config = {
-            'path': os.path.abspath(self.confirmed_dir),
-            'train': 'images',
-            'val': 'images',
-            'nc': 10,
-            'names': [
-                'Auto',
-                'RezervacijaOznaka',
-                'ZauzetoMjesto',
-                'NepropisnoParkirano_naInvalidskomMjesto',
-                'NepropisnoParkirano_prekoLinije',
-                'NepropisnoParkirano_vanOkviraParkinga',
-                'InvalidskaOznaka',
-                'InvalidskoMjesto',
-                'Tablica',
-                'PravilnoParkirano'
-            ]
-        }
+        resume = None
+        if run["checkpoint"] and os.path.exists(run["checkpoint"]):
+            resume = {"checkpoint": run["checkpoint"], "stopper": run["stopper"], **run["settings"]}
+        process = YoloTrainingProcess(
+            run["backup_path"], run["config_path"], run["snapshot_dir"], self.evaluations.db_path,
+            self.dataset_cache_dir,
+            budget=self.budget,
+            resume=resume,
+            imgsz=640,
+            lr0=0.0001,
+            freeze=10,
+            project=self.runs_dir,
+            name=run["name"],
+            exist_ok=True
+        ).start()
+        try:
+            while True:
+                if token.is_cancelled:
+                    raise OperationCancelledError("Retraining otkazan")
+
+                event = await asyncio.to_thread(process.next_event, 0.5)
+                if event is None:
+                    if not process.is_alive:
+                        # Proces je mogao upisati zadnju poruku neposredno prije izlaza
+                        event = process.next_event(0.1)
+                        if event is None:
+                            raise RuntimeError(f"Proces treninga je prekinut (exit code {process.exitcode})")
+                    else:
+                        continue
+
+                if event["type"] == "result":
+                    return event
+                if event["type"] == "error":
+                    raise RuntimeError(event["message"])
+                if event["type"] == "benchmark":
+                    run["settings"] = {"batch": event["batch"], "threads": event["threads"],
+                                       "processes": event["processes"]}
+                    self._save_active_run(run)
+                elif event["type"] == "scaling":
+                    run["scaling"] = {k: v for k, v in event.items() if k != "type"}
+                elif event["type"] == "epoch":
+                    run.update(checkpoint=event["checkpoint"], epoch=event["epoch"], stopper=event["stopper"])
+                    self._save_active_run(run)
+                elif event["type"] == "early_stop":
+                    run["stop_reason"] = event["reason"]
+                    self._save_active_run(run)
+                progress(event)
+        finally:
+            process.terminate()
+
+    # ===================================
+    # NASTAVAK NAKON PREKIDA (active_run.json)
+    # ===================================
+    def has_resumable_run(self) -> bool:
+        """Postoji prekinut trening (gašenje/pad servera) koji se može nastaviti"""
+        return self._load_active_run() is not None
+
+    def suspend(self) -> None:
+        """
+        Gašenje servera: otkazivanje posla u toku NE briše snapshot ni
+        checkpoint - sljedeći retraining nastavlja od zadnje epohe
+        """
+        self._suspended = True
+
+    def _load_active_run(self) -> Optional[dict]:
+        if not os.path.exists(self.active_run_path):
+            return None
+        with open(self.active_run_path) as f:
+            run = json.load(f)
+        if not os.path.isdir(run["snapshot_dir"]):
+            self._clear_active_run()
+            return None
+        if run["attempts"] >= self.max_resume_attempts:
+            # Trening koji stalno pada ne smije blokirati nove retraining cikluse
+            print(f"⚠️ Retraining {run['name']} prekinut {run['attempts']} puta - odustajem")
+            self._abandon_run(run)
+            return None
+        return run
 
-        config_path = os.path.abspath("backend/data_retrain.yaml")
-        with open(config_path, 'w') as f:
-            yaml.dump(config, f)
+    def _save_active_run(self, run: dict) -> None:
+        os.makedirs(self.runs_dir, exist_ok=True)
+        tmp_path = self.active_run_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(run, f, indent=2)
+        os.replace(tmp_path, self.active_run_path)
 
-        return config_path
+    def _clear_active_run(self) -> None:
+        if os.path.exists(self.active_run_path):
+            os.remove(self.active_run_path)
+
+    def _abandon_run(self, run: dict) -> None:
+        self.storage.discard_snapshot(run["snapshot_dir"])
+        self._clear_active_run()
+
+    def _per_class_report(self, new_metrics: dict, old_metrics: dict) -> dict:
+        """AP50 po klasi: ime klase → {old, new}"""
+        names = self.classifier.get_class_names()
+        return {
+            names.get(int(cls_id), cls_id): {
+                "old": old_metrics["per_class"].get(cls_id, 0.0),
+                "new": ap
+            }
+            for cls_id, ap in new_metrics["per_class"].items()
+        }
 
     async def _activate_new_model(
             self,
-            timestamp: str,
+            new_model_path: str,
             new_map50: float,
             old_map50: float,
-            target_model_path: str
+            target_model_path: str,
+            snapshot_dir: str
     ) -> dict:
         """
         Aktivira novi model (zamjenjuje stari)
@@ -152,14 +336,14 @@ class TrainingService:
         print(f"✅ Novi model je bolji! Ažuriram...")
 
         # Kopiraj novi model preko starog
-        new_model_path = f"backend/retraining_runs/retrain_{timestamp}/weights/best.pt"
         self.storage.replace_model(new_model_path, target_model_path)
 
         # Reload model u memoriji
         self.classifier.reload_model(target_model_path)
 
-        # LEARN: Arhiviraj korištene slike
-        self.storage.archive_confirmed_data()
+        # LEARN: Arhiviraj korištene slike (samo one iz snapshot-a)
+        self.storage.archive_confirmed_data(snapshot_dir)
+        self.storage.collect_garbage()
 
         return {
             "status": LearningStatus.SUCCESS.value,
@@ -19,6 +19,53 @@ class Detection:
     bbox: List[float]  # [x1, y1, x2, y2]
 
 
+@dataclass
+class DetectionSet:
+    """
+    Sve detekcije jedne slike jednim modelom
+    Ključ: (hash sadržaja slike, verzija modela)
+    """
+    image_hash: str
+    model_version: str
+    detections: List[Detection]
+    image_path: str = ""
+
+
+@dataclass
+class ImageMetadata:
+    """
+    Metapodaci slike pročitani iz headera (bez dekodiranja piksela)
+    width/height su NAKON primjene EXIF orijentacije (kao cv2.imread)
+    """
+    width: int
+    height: int
+    orientation: int = 1
+    format: str = "JPEG"
+
+
+@dataclass
+class CarAssignment:
+    """
+    Jedno vozilo na slici + ono što mu je prostorno dodijeljeno
+    (mjesto, oznake, prekršaji, tablica)
+    """
+    bbox: List[float]  # [x1, y1, x2, y2]
+    confidence: float
+    spot_class: Optional[str] = None  # 'ZauzetoMjesto' / 'InvalidskoMjesto'
+    spot_bbox: Optional[List[float]] = None
+    on_reservation: bool = False
+    on_invalid_spot: bool = False
+    violations: List[str] = None
+    plate_bbox: Optional[List[float]] = None
+    plate_confidence: float = 0.0
+    detected_violation: Optional[ViolationType] = None
+    prekrsaj_id: Optional[int] = None
+
+    def __post_init__(self):
+        if self.violations is None:
+            self.violations = []
+
+
 @dataclass
 class ViolationAnalysis:
     """
@@ -34,10 +81,13 @@ class ViolationAnalysis:
     violations: List[str] = None
     prekrsaj_id: Optional[int] = None
     message: str = ""
+    cars: List[CarAssignment] = None  # po vozilu (prostorna asocijacija)
 
     def __post_init__(self):
         if self.violations is None:
             self.violations = []
+        if self.cars is None:
+            self.cars = []
 
 
 @dataclass
@@ -89,12 +139,17 @@ class ViolationRecord:
 class ModelVersion:
     """
     Verzija ML modela
+    role: "teacher" (fine-tune, labele i audit) ili "student" (destilovan, brza detekcija)
+    teacher_version: za studenta - verzija učitelja od kojeg je destilovan
     """
     version_id: str
     timestamp: datetime
     map50: float
     backup_path: str
     is_active: bool = False
+    role: str = "teacher"
+    teacher_version: Optional[str] = None
+    latency_ms: Optional[float] = None
 
 
 @dataclass
@@ -29,4 +29,5 @@ class LearningStatus(Enum):
     TRAINING = "Training"
     SUCCESS = "Success"
     NO_IMPROVEMENT = "NoImprovement"
+    CANCELLED = "Cancelled"
     ERROR = "Error"
\ No newline at end of file
@@ -3,6 +3,9 @@ ParkingAgent Domain Layer
 """
 from .entities import (
     Detection,
+    DetectionSet,
+    ImageMetadata,
+    CarAssignment,
     ViolationAnalysis,
     PlateRecognition,
     Driver,
@@ -15,6 +18,9 @@ from .enums import ViolationType, DetectionStatus, LearningStatus
 
 __all__ = [
     'Detection',
+    'DetectionSet',
+    'ImageMetadata',
+    'CarAssignment',
     'ViolationAnalysis',
     'PlateRecognition',
     'Driver',
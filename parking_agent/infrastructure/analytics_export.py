@@ -0,0 +1,392 @@
+"""
+Infrastructure sloj - Analytics Export
+Kolonarni (Parquet) export detekcija/prekršaja za offline analitiku
+
+Pokretanje (iz root-a projekta):
+    python -m parking_agent.infrastructure.analytics_export
+"""
+import os
+import json
+import sqlite3
+from datetime import datetime
+from typing import Optional, List
+import sys
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+sys.path.append('..')
+
+
+# Šeme su fiksne - da svaki inkrementalni dio ima iste tipove
+DETEKTOVANO_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("vozac_id", pa.int64()),
+    ("prekrsaj_id", pa.int64()),
+    ("vrijeme", pa.timestamp("s")),
+    ("dan", pa.string()),
+    ("opis", pa.string()),
+    ("kazna", pa.int64()),
+    ("tablica", pa.string()),
+    ("invalid", pa.bool_()),
+    ("rezervacija", pa.bool_()),
+    ("slika1", pa.string()),
+    ("slika2", pa.string()),
+])
+
+VOZAC_SCHEMA = pa.schema([
+    ("vozac_id", pa.int64()),
+    ("ime", pa.string()),
+    ("tablica", pa.string()),
+    ("auto_tip", pa.string()),
+    ("invalid", pa.bool_()),
+    ("rezervacija", pa.bool_()),
+])
+
+PREKRSAJI_SCHEMA = pa.schema([
+    ("prekrsaj_id", pa.int64()),
+    ("opis", pa.string()),
+    ("kazna", pa.int64()),
+])
+
+DETECTIONS_SCHEMA = pa.schema([
+    ("record_id", pa.int64()),
+    ("image_hash", pa.string()),
+    ("model_version", pa.string()),
+    ("created_at", pa.timestamp("s")),
+    ("dan", pa.string()),
+    ("class_name", pa.string()),
+    ("confidence", pa.float32()),
+    ("x1", pa.float32()),
+    ("y1", pa.float32()),
+    ("x2", pa.float32()),
+    ("y2", pa.float32()),
+])
+
+DETECTIONS_PARTITIONING = ds.partitioning(pa.schema([("dan", pa.string())]), flavor="hive")
+
+# Particionisanje prekršaja: po danu i tipu prekršaja (hive: dan=.../prekrsaj_id=...)
+DETEKTOVANO_PARTITIONING = ds.partitioning(
+    pa.schema([("dan", pa.string()), ("prekrsaj_id", pa.int64())]),
+    flavor="hive"
+)
+
+
+class AnalyticsExporter:
+    """
+    Inkrementalni export SQLite → Parquet
+
+    - detektovano: particionisano po danu i prekrsaj_id, samo novi redovi
+      (high-water mark = zadnji izvezeni id)
+    - vozac: inkrementalno po vozac_id (vozači se ne mijenjaju, samo dodaju)
+    - dijelovi se imenuju po rasponu id-jeva (_part_name) - export u istoj
+      sekundi ne prepisuje fajlove prethodnog runa
+    - prekrsaji: mali katalog - snapshot svaki put
+    - detections: detekcije po slici (DetectionRecordStore), jedan red po
+      objektu, particionisano po danu
+    """
+
+    def __init__(
+            self,
+            db_path: str,
+            export_dir: str = "backend/analytics",
+            detections_db_path: Optional[str] = "backend/detections.db",
+            batch_size: int = 50_000,
+            compression: str = "zstd"
+    ):
+        self.db_path = db_path
+        self.export_dir = export_dir
+        self.detections_db_path = detections_db_path
+        self.batch_size = batch_size
+        self.compression = compression
+        self.state_path = os.path.join(export_dir, "_watermark.json")
+        os.makedirs(export_dir, exist_ok=True)
+
+    def export(self) -> dict:
+        """
+        Jedan export run - vraća broj izvezenih redova po tabeli
+        """
+        state = self._load_state()
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            exported = {
+                "detektovano": self._export_detektovano(conn, state),
+                "vozac": self._export_vozac(conn, state),
+                "prekrsaji": self._export_prekrsaji(conn),
+            }
+        finally:
+            conn.close()
+
+        if self.detections_db_path and os.path.exists(self.detections_db_path):
+            det_conn = sqlite3.connect(self.detections_db_path)
+            try:
+                exported["detections"] = self._export_detections(det_conn, state)
+            finally:
+                det_conn.close()
+
+        print(f"📦 Analytics export: {exported}")
+        return exported
+
+    def _export_detektovano(self, conn, state: dict) -> int:
+        cursor = conn.execute("""
+            SELECT d.id, d.vozac_id, d.prekrsaj_id, d.vrijeme,
+                   p.opis, p.kazna, v.tablica, v.invalid, v.rezervacija,
+                   d.slika1, d.slika2
+            FROM detektovano d
+            LEFT JOIN prekrsaji p ON p.prekrsaj_id = d.prekrsaj_id
+            LEFT JOIN vozac v ON v.vozac_id = d.vozac_id
+            WHERE d.id > ?
+            ORDER BY d.id
+        """, (state.get("detektovano", 0),))
+
+        total = 0
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+
+            table = pa.Table.from_pylist(
+                [self._detektovano_row(r) for r in rows],
+                schema=DETEKTOVANO_SCHEMA
+            )
+            ds.write_dataset(
+                table,
+                os.path.join(self.export_dir, "detektovano"),
+                format="parquet",
+                partitioning=DETEKTOVANO_PARTITIONING,
+                basename_template=self._part_name(rows) + "-{i}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+                file_options=ds.ParquetFileFormat().make_write_options(
+                    compression=self.compression
+                )
+            )
+
+            # Watermark se pomjera tek kad je batch zapisan
+            state["detektovano"] = rows[-1][0]
+            self._save_state(state)
+            total += len(rows)
+
+        return total
+
+    def _export_vozac(self, conn, state: dict) -> int:
+        cursor = conn.execute("""
+            SELECT vozac_id, ime, tablica, auto_tip, invalid, rezervacija
+            FROM vozac WHERE vozac_id > ? ORDER BY vozac_id
+        """, (state.get("vozac", 0),))
+
+        total = 0
+        vozac_dir = os.path.join(self.export_dir, "vozac")
+        os.makedirs(vozac_dir, exist_ok=True)
+
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+
+            table = pa.Table.from_pylist([
+                {
+                    "vozac_id": r[0], "ime": r[1], "tablica": r[2],
+                    "auto_tip": r[3], "invalid": bool(r[4]), "rezervacija": bool(r[5])
+                }
+                for r in rows
+            ], schema=VOZAC_SCHEMA)
+            target = os.path.join(vozac_dir, self._part_name(rows) + ".parquet")
+            pq.write_table(table, target + ".tmp", compression=self.compression)
+            os.replace(target + ".tmp", target)
+
+            state["vozac"] = rows[-1][0]
+            self._save_state(state)
+            total += len(rows)
+
+        return total
+
+    def _export_detections(self, conn, state: dict) -> int:
+        cursor = conn.execute("""
+            SELECT id, image_hash, model_version, created_at, detections
+            FROM detection_records WHERE id > ? ORDER BY id
+        """, (state.get("detections", 0),))
+
+        total = 0
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                break
+
+            records = []
+            for record_id, image_hash, model_version, created_at, detections in rows:
+                created = datetime.fromtimestamp(int(created_at))
+                for det in json.loads(detections):
+                    x1, y1, x2, y2 = det["bbox"]
+                    records.append({
+                        "record_id": record_id,
+                        "image_hash": image_hash,
+                        "model_version": model_version,
+                        "created_at": created,
+                        "dan": created.strftime("%Y-%m-%d"),
+                        "class_name": det["class_name"],
+                        "confidence": det["confidence"],
+                        "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+                    })
+
+            if records:
+                ds.write_dataset(
+                    pa.Table.from_pylist(records, schema=DETECTIONS_SCHEMA),
+                    os.path.join(self.export_dir, "detections"),
+                    format="parquet",
+                    partitioning=DETECTIONS_PARTITIONING,
+                    basename_template=self._part_name(rows) + "-{i}.parquet",
+                    existing_data_behavior="overwrite_or_ignore",
+                    file_options=ds.ParquetFileFormat().make_write_options(
+                        compression=self.compression
+                    )
+                )
+
+            state["detections"] = rows[-1][0]
+            self._save_state(state)
+            total += len(records)
+
+        return total
+
+    def _export_prekrsaji(self, conn) -> int:
+        rows = conn.execute(
+            "SELECT prekrsaj_id, opis, kazna FROM prekrsaji ORDER BY prekrsaj_id"
+        ).fetchall()
+        table = pa.Table.from_pylist(
+            [{"prekrsaj_id": r[0], "opis": r[1], "kazna": r[2]} for r in rows],
+            schema=PREKRSAJI_SCHEMA
+        )
+
+        # Atomarna zamjena snapshot-a
+        target = os.path.join(self.export_dir, "prekrsaji.parquet")
+        pq.write_table(table, target + ".tmp", compression=self.compression)
+        os.replace(target + ".tmp", target)
+        return len(rows)
+
+    @staticmethod
+    def _part_name(rows) -> str:
+        """
+        Ime dijela = raspon izvezenih id-jeva (ne vrijeme runa)
+        Dva runa nikad ne dijele ime za različite redove; ponovljeni export
+        istog raspona (pad prije upisa watermark-a) prepisuje iste redove
+        """
+        return f"part-{rows[0][0]:012d}-{rows[-1][0]:012d}"
+
+    @staticmethod
+    def _detektovano_row(r) -> dict:
+        vrijeme = datetime.strptime(r[3], "%Y-%m-%d %H:%M:%S") if r[3] else None
+        return {
+            "id": r[0],
+            "vozac_id": r[1],
+            "prekrsaj_id": r[2],
+            "vrijeme": vrijeme,
+            "dan": vrijeme.strftime("%Y-%m-%d") if vrijeme else "unknown",
+            "opis": r[4],
+            "kazna": r[5],
+            "tablica": r[6],
+            "invalid": bool(r[7]) if r[7] is not None else None,
+            "rezervacija": bool(r[8]) if r[8] is not None else None,
+            "slika1": r[9],
+            "slika2": r[10],
+        }
+
+    def _load_state(self) -> dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _save_state(self, state: dict):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+
+class AnalyticsReader:
+    """
+    Čitanje izvezenih Parquet fajlova (memory-mapped)
+    Filteri po particijama (dan, prekrsaj_id) preskaču cijele foldere
+    """
+
+    def __init__(self, export_dir: str = "backend/analytics"):
+        self.export_dir = export_dir
+
+    def violations(
+            self,
+            start_day: Optional[str] = None,
+            end_day: Optional[str] = None,
+            prekrsaj_ids: Optional[List[int]] = None,
+            columns: Optional[List[str]] = None
+    ) -> pa.Table:
+        """
+        Evidentirani prekršaji (dani u formatu YYYY-MM-DD, granice uključene)
+        """
+        path = os.path.join(self.export_dir, "detektovano")
+        if not os.path.isdir(path):
+            return DETEKTOVANO_SCHEMA.empty_table()
+
+        filters = []
+        if start_day:
+            filters.append(("dan", ">=", start_day))
+        if end_day:
+            filters.append(("dan", "<=", end_day))
+        if prekrsaj_ids:
+            filters.append(("prekrsaj_id", "in", list(prekrsaj_ids)))
+
+        return pq.read_table(
+            path,
+            columns=columns,
+            filters=filters or None,
+            partitioning=DETEKTOVANO_PARTITIONING,
+            memory_map=True
+        )
+
+    def detections(
+            self,
+            start_day: Optional[str] = None,
+            end_day: Optional[str] = None,
+            class_names: Optional[List[str]] = None,
+            columns: Optional[List[str]] = None
+    ) -> pa.Table:
+        """Detekcije po slici (jedan red po objektu)"""
+        path = os.path.join(self.export_dir, "detections")
+        if not os.path.isdir(path):
+            return DETECTIONS_SCHEMA.empty_table()
+
+        filters = []
+        if start_day:
+            filters.append(("dan", ">=", start_day))
+        if end_day:
+            filters.append(("dan", "<=", end_day))
+        if class_names:
+            filters.append(("class_name", "in", list(class_names)))
+
+        return pq.read_table(
+            path,
+            columns=columns,
+            filters=filters or None,
+            partitioning=DETECTIONS_PARTITIONING,
+            memory_map=True
+        )
+
+    def drivers(self, columns: Optional[List[str]] = None) -> pa.Table:
+        """Svi izvezeni vozači"""
+        path = os.path.join(self.export_dir, "vozac")
+        if not os.path.isdir(path) or not os.listdir(path):
+            return VOZAC_SCHEMA.empty_table()
+        return pq.read_table(path, columns=columns, memory_map=True)
+
+    def violation_types(self) -> pa.Table:
+        """Katalog prekršaja (zadnji snapshot)"""
+        path = os.path.join(self.export_dir, "prekrsaji.parquet")
+        if not os.path.exists(path):
+            return PREKRSAJI_SCHEMA.empty_table()
+        return pq.read_table(path, memory_map=True)
+
+
+if __name__ == "__main__":
+    from backend.database import DB_PATH
+
+    AnalyticsExporter(DB_PATH).export()
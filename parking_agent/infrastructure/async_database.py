@@ -0,0 +1,133 @@
+"""
+Infrastructure sloj - Async Database Gateway
+SQLite pristup van event loop-a (posvećena DB nit za pisanje + mali pool za čitanje)
+"""
+import asyncio
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple
+import sys
+
+sys.path.append('..')
+from parking_agent.domain.entities import Driver, Violation, ViolationRecord
+from parking_agent.infrastructure.database import ParkingDbContext
+
+
+class AsyncParkingDbContext:
+    """
+    Async omotač oko ParkingDbContext - iste operacije, ali se awaituju
+
+    Upiti ne blokiraju event loop:
+    - sva pisanja idu kroz JEDNU DB nit (red zahtjeva = red executora),
+      pa se commit-i/fsync-ovi nikad ne preklapaju
+    - čitanja idu kroz mali pool niti
+    Za svaki upit se mjeri vrijeme (vidi get_query_stats)
+    """
+
+    def __init__(self, db_context: ParkingDbContext, reader_threads: int = 4):
+        self.sync = db_context
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix="db-reader")
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    # ===================================
+    # ČITANJE
+    # ===================================
+    async def get_driver_by_plate(self, plate: str) -> Optional[Driver]:
+        return await self._read("get_driver_by_plate", self.sync.get_driver_by_plate, plate)
+
+    async def get_violation_by_id(self, prekrsaj_id: int) -> Optional[Violation]:
+        return await self._read("get_violation_by_id", self.sync.get_violation_by_id, prekrsaj_id)
+
+    async def get_violation_by_description(self, opis: str) -> Optional[Violation]:
+        return await self._read(
+            "get_violation_by_description", self.sync.get_violation_by_description, opis
+        )
+
+    async def get_all_drivers(self) -> List[Driver]:
+        return await self._read("get_all_drivers", self.sync.get_all_drivers)
+
+    async def get_all_violations(self) -> List[Violation]:
+        return await self._read("get_all_violations", self.sync.get_all_violations)
+
+    async def get_drivers_page(
+            self,
+            limit: int,
+            after_id: int = 0,
+            plate_prefix: Optional[str] = None,
+            invalid: Optional[bool] = None,
+            rezervacija: Optional[bool] = None
+    ) -> Tuple[List[Driver], Optional[int]]:
+        return await self._read(
+            "get_drivers_page", self.sync.get_drivers_page,
+            limit, after_id, plate_prefix, invalid, rezervacija
+        )
+
+    async def get_violations_page(self, limit: int, after_id: int = 0) -> Tuple[List[Violation], Optional[int]]:
+        return await self._read("get_violations_page", self.sync.get_violations_page, limit, after_id)
+
+    # ===================================
+    # PISANJE
+    # ===================================
+    async def save_violation_record(self, record: ViolationRecord) -> None:
+        await self._write("save_violation_record", self.sync.save_violation_record, record)
+
+    async def add_driver(self, driver: Driver) -> None:
+        await self._write("add_driver", self.sync.add_driver, driver)
+
+    async def add_violation_type(self, violation: Violation) -> None:
+        await self._write("add_violation_type", self.sync.add_violation_type, violation)
+
+    # ===================================
+    # INTERNO
+    # ===================================
+    async def _read(self, name: str, fn, *args):
+        return await self._submit(self._readers, name, fn, *args)
+
+    async def _write(self, name: str, fn, *args):
+        return await self._submit(self._writer, name, fn, *args)
+
+    async def _submit(self, executor: ThreadPoolExecutor, name: str, fn, *args):
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+
+        def timed_call():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                self._record(name, started - queued_at, finished - started)
+
+        return await loop.run_in_executor(executor, timed_call)
+
+    def _record(self, name: str, wait_s: float, run_s: float):
+        """Ažurira statistiku upita (broj, ukupno/max vrijeme, čekanje u redu)"""
+        with self._stats_lock:
+            s = self._stats.setdefault(name, {
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0, "queue_wait_ms": 0.0
+            })
+            s["count"] += 1
+            s["total_ms"] += run_s * 1000
+            s["max_ms"] = max(s["max_ms"], run_s * 1000)
+            s["queue_wait_ms"] += wait_s * 1000
+
+    def get_query_stats(self) -> dict:
+        """Vraća statistiku po upitu (prosjeci u ms)"""
+        with self._stats_lock:
+            return {
+                name: {
+                    "count": s["count"],
+                    "avg_ms": round(s["total_ms"] / s["count"], 3),
+                    "max_ms": round(s["max_ms"], 3),
+                    "avg_queue_wait_ms": round(s["queue_wait_ms"] / s["count"], 3)
+                }
+                for name, s in self._stats.items()
+            }
+
+    def close(self):
+        """Gasi DB niti (čeka da se red isprazni)"""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
@@ -0,0 +1,216 @@
+"""
+Infrastructure sloj - Blob Store
+Content-addressed skladište slika (ključ = SHA-256 sadržaja)
+"""
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import tempfile
+from typing import Optional
+
+
+class BlobStore:
+    """
+    Svaka jedinstvena slika se čuva TAČNO JEDNOM:
+        backend/blobs/ab/cd/abcd....jpg
+
+    Confirmed/rejected/archive folderi su samo "pogledi" - hardlinkovi na
+    blob (ili kopija ako FS ne podržava hardlink). Broj referenci se vodi
+    u indeksu, a collect_garbage() briše blobove bez referenci.
+    """
+
+    def __init__(self, root: str = "backend/blobs"):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.index_path = os.path.join(root, "index.db")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index_path)
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER,
+                refcount INTEGER NOT NULL DEFAULT 0,
+                created_at REAL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS blob_metadata (
+                sha256 TEXT PRIMARY KEY,
+                width INTEGER,
+                height INTEGER,
+                orientation INTEGER,
+                format TEXT
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def path_for(self, digest: str) -> str:
+        """Putanja bloba (shardovano po prva 4 hex znaka)"""
+        return os.path.join(self.root, digest[:2], digest[2:4], f"{digest}.jpg")
+
+    def put(self, source_path: str, retain: bool = False, chunk_size: int = 1024 * 1024) -> str:
+        """
+        Ubacuje fajl u store i vraća njegov hash
+        Ako isti sadržaj već postoji - ništa se ne kopira
+
+        retain=True uzima referencu u istoj transakciji (npr. review job
+        koji drži sliku dok se ne obradi) - vraća se sa release()
+        """
+        h = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix=".part")
+        try:
+            with open(source_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for chunk in iter(lambda: src.read(chunk_size), b""):
+                    h.update(chunk)
+                    dst.write(chunk)
+            digest = h.hexdigest()
+            blob_path = self.path_for(digest)
+
+            # Red + fajl pod write lock-om indeksa - GC ne može obrisati
+            # blob između provjere postojanja i upisa reference.
+            # created_at se osvježava: ponovo ubačen blob opet ima
+            # min_age_seconds zaštitu dok ne dobije link
+            conn = self._connect()
+            with conn:
+                conn.execute("""
+                    INSERT INTO blobs (sha256, size, refcount, created_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(sha256) DO UPDATE SET
+                        refcount = refcount + excluded.refcount,
+                        created_at = excluded.created_at
+                """, (digest, os.path.getsize(tmp_path), 1 if retain else 0, time.time()))
+                if os.path.exists(blob_path):
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(tmp_path, blob_path)
+            conn.close()
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return digest
+
+    def retain(self, digest: str) -> None:
+        """Referenca koja nije pogled (npr. job koji čeka obradu)"""
+        self._add_refs(digest, 1)
+
+    def release(self, digest: str) -> None:
+        """Vraća referencu uzetu sa retain()/put(retain=True)"""
+        self._add_refs(digest, -1)
+
+    def link(self, digest: str, dest_path: str) -> str:
+        """
+        Kreira pogled (hardlink) na blob i povećava broj referenci
+        Ako dest_path već pokazuje na isti blob - ništa (referenca je već brojana)
+        """
+        blob_path = self.path_for(digest)
+        if os.path.exists(dest_path):
+            if self._is_view_of(digest, dest_path):
+                return dest_path
+            os.remove(dest_path)
+        try:
+            os.link(blob_path, dest_path)
+        except OSError:
+            # FS bez hardlinkova (ili drugi disk) - fallback na kopiju
+            shutil.copy2(blob_path, dest_path)
+
+        self._add_refs(digest, 1)
+        return dest_path
+
+    def unlink(self, digest: str, view_path: str) -> None:
+        """Briše pogled i smanjuje broj referenci"""
+        if os.path.exists(view_path):
+            os.remove(view_path)
+        self._add_refs(digest, -1)
+
+    def collect_garbage(self, min_age_seconds: float = 3600) -> dict:
+        """
+        Briše blobove bez referenci
+        min_age_seconds štiti tek ubačene blobove koji još čekaju link
+        """
+        cutoff = time.time() - min_age_seconds
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT sha256, size FROM blobs WHERE refcount <= 0 AND created_at < ?",
+            (cutoff,)
+        ).fetchall()
+
+        deleted = 0
+        freed_bytes = 0
+        for digest, size in rows:
+            # Prvo red (samo ako i dalje nema referenci), pa fajl - pod istim
+            # write lock-om, tako da put()/link() u međuvremenu ne gube blob
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM blobs WHERE sha256 = ? AND refcount <= 0 AND created_at < ?",
+                    (digest, cutoff)
+                )
+                if cursor.rowcount == 0:
+                    continue
+                blob_path = self.path_for(digest)
+                if os.path.exists(blob_path):
+                    os.remove(blob_path)
+                    freed_bytes += size or 0
+                conn.execute("DELETE FROM blob_metadata WHERE sha256 = ?", (digest,))
+            deleted += 1
+        conn.close()
+
+        if deleted:
+            print(f"🧹 Blob GC: obrisano {deleted} blobova ({freed_bytes / 1e6:.1f} MB)")
+        return {"deleted": deleted, "freed_bytes": freed_bytes}
+
+    def get_metadata(self, digest: str) -> Optional[tuple]:
+        """Keširani metapodaci bloba: (width, height, orientation, format)"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT width, height, orientation, format FROM blob_metadata WHERE sha256 = ?",
+            (digest,)
+        ).fetchone()
+        conn.close()
+        return row
+
+    def set_metadata(self, digest: str, width: int, height: int, orientation: int, fmt: str):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO blob_metadata (sha256, width, height, orientation, format) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (digest, width, height, orientation, fmt)
+            )
+        conn.close()
+
+    def refcount(self, digest: str) -> Optional[int]:
+        conn = self._connect()
+        row = conn.execute("SELECT refcount FROM blobs WHERE sha256 = ?", (digest,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def _is_view_of(self, digest: str, path: str) -> bool:
+        """Da li je path već pogled na ovaj blob (hardlink ili kopija istog sadržaja)"""
+        blob_path = self.path_for(digest)
+        if os.path.exists(blob_path) and os.path.samefile(blob_path, path):
+            return True
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        return h.hexdigest() == digest
+
+    def _add_refs(self, digest: str, delta: int):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE blobs SET refcount = refcount + ? WHERE sha256 = ?",
+                (delta, digest)
+            )
+        conn.close()
@@ -3,7 +3,7 @@ Infrastructure sloj - Database Context
 Svi DB operacije za parking agent
 """
 import sqlite3
-from typing import Optional, List
+from typing import Optional, List, Iterator, Tuple
 from datetime import datetime
 import sys
 
@@ -100,36 +100,134 @@ class ParkingDbContext:
 
     def get_all_drivers(self) -> List[Driver]:
         """Vraća sve vozače"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM vozac")
-        rows = cursor.fetchall()
-        conn.close()
-
-        return [
-            Driver(
-                vozac_id=r[0],
-                ime=r[1],
-                tablica=r[2],
-                auto_tip=r[3],
-                invalid=bool(r[4]),
-                rezervacija=bool(r[5])
-            )
-            for r in rows
-        ]
+        return list(self.iter_drivers())
 
     def get_all_violations(self) -> List[Violation]:
         """Vraća sve tipove prekršaja"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT prekrsaj_id, opis, kazna FROM prekrsaji")
-        rows = cursor.fetchall()
-        conn.close()
-
-        return [
-            Violation(prekrsaj_id=r[0], opis=r[1], kazna=r[2])
-            for r in rows
-        ]
+        return list(self.iter_violations())
+
+    def iter_drivers(
+            self,
+            plate_prefix: Optional[str] = None,
+            invalid: Optional[bool] = None,
+            rezervacija: Optional[bool] = None,
+            after_id: int = 0,
+            limit: Optional[int] = None
+    ) -> Iterator[Driver]:
+        """
+        Lijeno iterira vozače (keyset paginacija po vozac_id)
+        Redovi se čitaju direktno sa kursora - nema fetchall()
+        """
+        query = (
+            "SELECT vozac_id, ime, tablica, auto_tip, invalid, rezervacija "
+            "FROM vozac WHERE vozac_id > ?"
+        )
+        params = [after_id]
+
+        if plate_prefix:
+            query += " AND tablica LIKE ? ESCAPE '\\'"
+            params.append(self._escape_like(plate_prefix) + "%")
+        if invalid is not None:
+            query += " AND invalid = ?"
+            params.append(int(invalid))
+        if rezervacija is not None:
+            query += " AND rezervacija = ?"
+            params.append(int(rezervacija))
+
+        query += " ORDER BY vozac_id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect_for_iteration()
+        try:
+            for row in conn.execute(query, params):
+                yield self._row_to_driver(row)
+        finally:
+            conn.close()
+
+    def iter_violations(
+            self,
+            after_id: int = 0,
+            limit: Optional[int] = None
+    ) -> Iterator[Violation]:
+        """Lijeno iterira tipove prekršaja (keyset paginacija po prekrsaj_id)"""
+        query = (
+            "SELECT prekrsaj_id, opis, kazna FROM prekrsaji "
+            "WHERE prekrsaj_id > ? ORDER BY prekrsaj_id"
+        )
+        params = [after_id]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self._connect_for_iteration()
+        try:
+            for r in conn.execute(query, params):
+                yield Violation(prekrsaj_id=r[0], opis=r[1], kazna=r[2])
+        finally:
+            conn.close()
+
+    def _connect_for_iteration(self) -> sqlite3.Connection:
+        """
+        Konekcija za lijeni generator: StreamingResponse ga pomjera kroz
+        thread pool, pa svaki next() može biti na drugom threadu.
+        Generator koristi konekciju sekvencijalno (nikad paralelno).
+        """
+        return sqlite3.connect(self.db_path, check_same_thread=False)
+
+    def get_drivers_page(
+            self,
+            limit: int,
+            after_id: int = 0,
+            plate_prefix: Optional[str] = None,
+            invalid: Optional[bool] = None,
+            rezervacija: Optional[bool] = None
+    ) -> Tuple[List[Driver], Optional[int]]:
+        """
+        Jedna stranica vozača
+        Returns: (vozači, kursor za sljedeću stranicu ili None)
+        """
+        # Čitamo jedan red više da znamo ima li sljedeće stranice
+        drivers = list(self.iter_drivers(
+            plate_prefix, invalid, rezervacija, after_id, limit + 1
+        ))
+        if len(drivers) > limit:
+            drivers = drivers[:limit]
+            return drivers, drivers[-1].vozac_id
+        return drivers, None
+
+    def get_violations_page(
+            self,
+            limit: int,
+            after_id: int = 0
+    ) -> Tuple[List[Violation], Optional[int]]:
+        """
+        Jedna stranica tipova prekršaja
+        Returns: (prekršaji, kursor za sljedeću stranicu ili None)
+        """
+        violations = list(self.iter_violations(after_id, limit + 1))
+        if len(violations) > limit:
+            violations = violations[:limit]
+            return violations, violations[-1].prekrsaj_id
+        return violations, None
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        """Escape-uje specijalne LIKE znakove (%, _)"""
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    @staticmethod
+    def _row_to_driver(row) -> Driver:
+        """Helper za konverziju DB red → Driver"""
+        return Driver(
+            vozac_id=row[0],
+            ime=row[1],
+            tablica=row[2],
+            auto_tip=row[3],
+            invalid=bool(row[4]),
+            rezervacija=bool(row[5])
+        )
 
     def add_driver(self, driver: Driver) -> None:
         """Dodaje novog vozača"""
@@ -0,0 +1,272 @@
+"""
+Infrastructure sloj - Dataset Manifest
+Perzistentni indeks confirmed/rejected slika (SQLite) umjesto skeniranja foldera
+"""
+import os
+import json
+import hashlib
+import sqlite3
+from datetime import datetime
+from typing import Optional, Dict, List, Iterator
+
+
+class DatasetManifest:
+    """
+    Manifest trening dataseta
+
+    Svaka sačuvana slika ima jedan red (putanja, hash, dimenzije, broj
+    objekata po klasi, izvor 'first'/'zoom'/'ok'). Brojači se ažuriraju
+    u istoj transakciji kao i redovi, pa je statistika O(1).
+    """
+
+    def __init__(self, db_path: str = "backend/dataset_manifest.db"):
+        self.db_path = db_path
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT UNIQUE,
+                label_path TEXT,
+                kind TEXT,
+                source TEXT,
+                status TEXT DEFAULT 'active',
+                archive_dir TEXT,
+                width INTEGER,
+                height INTEGER,
+                sha256 TEXT,
+                class_counts TEXT,
+                created_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_images_kind_status ON images(kind, status);
+            CREATE INDEX IF NOT EXISTS idx_images_sha256 ON images(sha256);
+
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        conn.commit()
+        conn.close()
+
+    # ===================================
+    # PISANJE
+    # ===================================
+    def add_image(
+            self,
+            path: str,
+            kind: str,
+            source: str,
+            sha256: str,
+            label_path: Optional[str] = None,
+            width: Optional[int] = None,
+            height: Optional[int] = None,
+            class_counts: Optional[Dict[str, int]] = None
+    ) -> None:
+        """
+        Dodaje sliku u manifest
+        kind: 'confirmed' ili 'rejected'
+        source: 'first', 'zoom' ili 'ok'
+
+        Ista putanja ponovo → red se ažurira; brojač se mijenja samo ako
+        slika do sada nije bila brojana pod istim brojačem
+        """
+        counter = self._counter_name(kind, source)
+        conn = self._connect()
+        with conn:
+            existing = conn.execute(
+                "SELECT kind, source, status FROM images WHERE path = ?", (path,)
+            ).fetchone()
+            conn.execute("""
+                INSERT INTO images
+                    (path, label_path, kind, source, status, width, height,
+                     sha256, class_counts, created_at)
+                VALUES (?, ?, ?, ?, 'active', ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    label_path = excluded.label_path, kind = excluded.kind,
+                    source = excluded.source, status = 'active', archive_dir = NULL,
+                    width = excluded.width, height = excluded.height,
+                    sha256 = excluded.sha256, class_counts = excluded.class_counts,
+                    created_at = excluded.created_at
+            """, (
+                path, label_path, kind, source, width, height, sha256,
+                json.dumps(class_counts or {}),
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            ))
+            previous = self._counter_name(existing[0], existing[1]) \
+                if existing and existing[2] == "active" else None
+            if previous != counter:
+                if previous:
+                    self._increment(conn, previous, -1)
+                self._increment(conn, counter, 1)
+        conn.close()
+
+    def archive_confirmed(self, archive_dir: str, paths: Optional[List[str]] = None) -> int:
+        """
+        Označava aktivne confirmed slike kao arhivirane
+        (nakon što je FileStorage premjestio images/labels u archive_dir)
+        paths: samo ove slike (None = sve aktivne)
+        """
+        conn = self._connect()
+        with conn:
+            rows = conn.execute(
+                "SELECT id, path, label_path FROM images "
+                "WHERE kind = 'confirmed' AND status = 'active'"
+            ).fetchall()
+            if paths is not None:
+                wanted = set(paths)
+                rows = [r for r in rows if r[1] in wanted]
+
+            conn.executemany("""
+                UPDATE images
+                SET status = 'archived', archive_dir = ?, path = ?, label_path = ?
+                WHERE id = ?
+            """, [
+                (
+                    archive_dir,
+                    os.path.join(archive_dir, "images", os.path.basename(path)),
+                    os.path.join(archive_dir, "labels", os.path.basename(label_path))
+                    if label_path else None,
+                    row_id
+                )
+                for row_id, path, label_path in rows
+            ])
+            self._increment(conn, "confirmed", -len(rows))
+        conn.close()
+        return len(rows)
+
+    # ===================================
+    # ČITANJE
+    # ===================================
+    def count(self, name: str) -> int:
+        """O(1) brojač: 'confirmed', 'rejected_first', 'rejected_zoom'"""
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        conn.close()
+        return row[0] if row else 0
+
+    def find_image(self, kind: str, sha256: str, source: str, status: str = "active") -> Optional[dict]:
+        """Pronalazi sliku istog sadržaja (za deduplikaciju)"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute(
+            "SELECT * FROM images WHERE kind = ? AND sha256 = ? AND source = ? AND status = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (kind, sha256, source, status)
+        ).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def list_images(self, kind: str, status: str = "active") -> List[dict]:
+        """Redovi manifesta za dati kind/status"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT * FROM images WHERE kind = ? AND status = ? ORDER BY id",
+            (kind, status)
+        ).fetchall()
+        conn.close()
+        return [
+            {**dict(r), "class_counts": json.loads(r["class_counts"] or "{}")}
+            for r in rows
+        ]
+
+    def iter_images(self, kind: str, status: str = "active") -> Iterator[dict]:
+        """Kao list_images, ali red po red (arhiva može biti velika)"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(
+                "SELECT * FROM images WHERE kind = ? AND status = ? ORDER BY id",
+                (kind, status)
+            )
+            for r in cursor:
+                yield {**dict(r), "class_counts": json.loads(r["class_counts"] or "{}")}
+        finally:
+            conn.close()
+
+    # ===================================
+    # MIGRACIJA
+    # ===================================
+    def is_initialized(self) -> bool:
+        conn = self._connect()
+        row = conn.execute("SELECT 1 FROM counters WHERE name = 'initialized'").fetchone()
+        conn.close()
+        return row is not None
+
+    def rebuild_from_disk(
+            self,
+            confirmed_dir: str,
+            rejected_dir: str,
+            class_names: Dict[int, str]
+    ) -> None:
+        """
+        Jednokratno popunjava manifest iz postojećih foldera
+        (za instalacije koje su imale slike prije manifesta)
+        """
+        images_dir = os.path.join(confirmed_dir, "images")
+        for name in sorted(os.listdir(images_dir)):
+            if not name.endswith('.jpg'):
+                continue
+            path = os.path.join(images_dir, name)
+            label_path = os.path.join(confirmed_dir, "labels", name.replace('.jpg', '.txt'))
+            self.add_image(
+                path=path,
+                kind="confirmed",
+                source=os.path.splitext(name)[0].rsplit("_", 1)[-1],
+                sha256=file_sha256(path),
+                label_path=label_path if os.path.exists(label_path) else None,
+                class_counts=_read_label_class_counts(label_path, class_names)
+            )
+
+        for image_type in ("first", "zoom"):
+            type_dir = os.path.join(rejected_dir, image_type)
+            for name in sorted(os.listdir(type_dir)):
+                if name.endswith('.jpg'):
+                    path = os.path.join(type_dir, name)
+                    self.add_image(path, "rejected", image_type, file_sha256(path))
+
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('initialized', 1)")
+        conn.close()
+
+    # ===================================
+    # INTERNO
+    # ===================================
+    @staticmethod
+    def _counter_name(kind: str, source: str) -> str:
+        return "confirmed" if kind == "confirmed" else f"rejected_{source}"
+
+    @staticmethod
+    def _increment(conn: sqlite3.Connection, name: str, delta: int):
+        conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)", (name,))
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (delta, name))
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 fajla (čita u komadima)"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_label_class_counts(label_path: str, class_names: Dict[int, str]) -> Dict[str, int]:
+    """Broji objekte po klasi iz YOLO label fajla"""
+    counts = {}
+    if not os.path.exists(label_path):
+        return counts
+    with open(label_path) as f:
+        for line in f:
+            parts = line.split()
+            if parts:
+                name = class_names.get(int(parts[0]), parts[0])
+                counts[name] = counts.get(name, 0) + 1
+    return counts
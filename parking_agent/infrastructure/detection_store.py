@@ -0,0 +1,86 @@
+"""
+Infrastructure sloj - Detection Record Store
+Perzistentne detekcije po slici (ključ: hash slike + verzija modela)
+"""
+import json
+import time
+import sqlite3
+from dataclasses import asdict
+from typing import Optional
+import sys
+
+sys.path.append('..')
+from parking_agent.domain.entities import Detection, DetectionSet
+
+
+class DetectionRecordStore:
+    """
+    Čuva rezultat YOLO-a iz trenutka analize
+
+    Ista slika (isti hash) + isti model = iste detekcije, pa se:
+    - /detect poslije /analyze_first_image ne računa ponovo
+    - labele za potvrđene slike prave iz detekcija koje je oficir vidio
+    """
+
+    def __init__(self, db_path: str = "backend/detections.db"):
+        self.db_path = db_path
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS detection_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                image_hash TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                image_path TEXT,
+                detections TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE(image_hash, model_version)
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def save(self, detection_set: DetectionSet) -> None:
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO detection_records
+                    (image_hash, model_version, image_path, detections, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                detection_set.image_hash,
+                detection_set.model_version,
+                detection_set.image_path,
+                json.dumps([asdict(d) for d in detection_set.detections]),
+                time.time()
+            ))
+        conn.close()
+
+    def get(self, image_hash: str, model_version: Optional[str] = None) -> Optional[DetectionSet]:
+        """
+        Detekcije za sliku
+        model_version=None → najnoviji zapis bilo kojeg modela
+        """
+        conn = sqlite3.connect(self.db_path)
+        if model_version:
+            row = conn.execute(
+                "SELECT image_hash, model_version, image_path, detections FROM detection_records "
+                "WHERE image_hash = ? AND model_version = ?",
+                (image_hash, model_version)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT image_hash, model_version, image_path, detections FROM detection_records "
+                "WHERE image_hash = ? ORDER BY created_at DESC LIMIT 1",
+                (image_hash,)
+            ).fetchone()
+        conn.close()
+
+        if not row:
+            return None
+
+        return DetectionSet(
+            image_hash=row[0],
+            model_version=row[1],
+            image_path=row[2] or "",
+            detections=[Detection(**d) for d in json.loads(row[3])]
+        )
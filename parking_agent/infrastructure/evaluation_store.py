@@ -0,0 +1,101 @@
+"""
+Infrastructure sloj - Evaluation Store
+Keš evaluacije modela: predikcije po slici (težine + slika) i metrike po datasetu
+"""
+import json
+import time
+import sqlite3
+from typing import Optional, Dict, List
+
+
+class EvaluationStore:
+    """
+    Dva nivoa keša:
+    - predictions: (hash težina, sha256 slike) → predikcije modela
+      Dataset koji je samo narastao evaluira se samo na novim slikama
+    - results: (hash težina, hash dataseta) → mAP50 + AP po klasi
+      Isti model na istom datasetu se ne evaluira ponovo
+    """
+
+    def __init__(self, db_path: str = "backend/evaluations.db"):
+        self.db_path = db_path
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                weights_hash TEXT NOT NULL,
+                image_hash TEXT NOT NULL,
+                predictions TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (weights_hash, image_hash)
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                weights_hash TEXT NOT NULL,
+                dataset_hash TEXT NOT NULL,
+                metrics TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (weights_hash, dataset_hash)
+            );
+        """)
+        conn.commit()
+        conn.close()
+
+    # ===================================
+    # PREDIKCIJE PO SLICI
+    # ===================================
+    def get_predictions(self, weights_hash: str, image_hashes: List[str]) -> Dict[str, list]:
+        """Keširane predikcije za date slike (slike bez zapisa nisu u rezultatu)"""
+        found = {}
+        conn = sqlite3.connect(self.db_path)
+        # SQLite limit parametara - upit u dijelovima
+        for i in range(0, len(image_hashes), 500):
+            chunk = image_hashes[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT image_hash, predictions FROM predictions "
+                f"WHERE weights_hash = ? AND image_hash IN ({placeholders})",
+                [weights_hash, *chunk]
+            ).fetchall()
+            found.update((image_hash, json.loads(predictions)) for image_hash, predictions in rows)
+        conn.close()
+        return found
+
+    def save_predictions(self, weights_hash: str, predictions: Dict[str, list]) -> None:
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions (weights_hash, image_hash, predictions, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(weights_hash, image_hash, json.dumps(p), now) for image_hash, p in predictions.items()]
+            )
+        conn.close()
+
+    # ===================================
+    # METRIKE PO DATASETU
+    # ===================================
+    def get_result(self, weights_hash: str, dataset_hash: str) -> Optional[dict]:
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute(
+            "SELECT metrics FROM results WHERE weights_hash = ? AND dataset_hash = ?",
+            (weights_hash, dataset_hash)
+        ).fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else None
+
+    def save_result(self, weights_hash: str, dataset_hash: str, metrics: dict) -> None:
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (weights_hash, dataset_hash, metrics, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (weights_hash, dataset_hash, json.dumps(metrics), time.time())
+            )
+        conn.close()
+
+    def forget_weights(self, weights_hash: str) -> None:
+        """Briše sve zapise za težine koje više ne postoje (npr. odbačen kandidat)"""
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute("DELETE FROM predictions WHERE weights_hash = ?", (weights_hash,))
+            conn.execute("DELETE FROM results WHERE weights_hash = ?", (weights_hash,))
+        conn.close()
@@ -3,13 +3,19 @@ Infrastructure sloj - File Storage
 Sve operacije sa fajlovima (čuvanje slika, labela, modela)
 """
 import os
+import json
 import shutil
-from typing import List, Tuple
+from collections import Counter
+from typing import List, Tuple, Optional
 from datetime import datetime
 import sys
 
 sys.path.append('..')
 from parking_agent.domain.entities import Detection
+from parking_agent.infrastructure.dataset_manifest import DatasetManifest
+from parking_agent.infrastructure.blob_store import BlobStore
+from parking_agent.infrastructure.image_metadata import ImageMetadataService
+from parking_agent.ML.dataset_cache import DatasetCache
 
 
 class FileStorage:
@@ -18,12 +24,30 @@ class FileStorage:
     Izvučeno iz main_old_notInUse.py - sve što je bilo shutil.copy, os.makedirs...
     """
 
+    # Mapiranje klasa - SAMO PARKING RELEVANTNE
+    CLASS_MAPPING = {
+        'Auto': 0,
+        'RezervacijaOznaka': 1,
+        'ZauzetoMjesto': 2,
+        'NepropisnoParkirano_naInvalidskomMjesto': 3,
+        'NepropisnoParkirano_prekoLinije': 4,
+        'NepropisnoParkirano_vanOkviraParkinga': 5,
+        'InvalidskaOznaka': 6,
+        'InvalidskoMjesto': 7,
+        'Tablica': 8,
+        'PravilnoParkirano': 9
+    }
+
     def __init__(
             self,
             confirmed_dir: str = "backend/confirmed",
             rejected_dir: str = "backend/rejected",
             uploads_dir: str = "backend/uploads",
-            weights_dir: str = "backend/weights"
+            weights_dir: str = "backend/weights",
+            manifest: Optional[DatasetManifest] = None,
+            blob_store: Optional[BlobStore] = None,
+            metadata_service: Optional[ImageMetadataService] = None,
+            dataset_cache: Optional[DatasetCache] = None
     ):
         self.confirmed_dir = confirmed_dir
         self.rejected_dir = rejected_dir
@@ -33,6 +57,22 @@ class FileStorage:
         # Kreiraj potrebne foldere
         self._ensure_directories()
 
+        # Content-addressed skladište - folderi su samo hardlink pogledi
+        self.blobs = blob_store or BlobStore()
+        self.metadata = metadata_service or ImageMetadataService(self.blobs)
+
+        # Memmap keš za trening - potvrđena slika se dekodira jednom, odmah
+        self.dataset_cache = dataset_cache
+
+        # Manifest - brojanje/metapodaci bez skeniranja foldera
+        self.manifest = manifest or DatasetManifest()
+        if not self.manifest.is_initialized():
+            self.manifest.rebuild_from_disk(
+                self.confirmed_dir,
+                self.rejected_dir,
+                {cls_id: name for name, cls_id in self.CLASS_MAPPING.items()}
+            )
+
     def _ensure_directories(self):
         """Kreira sve potrebne direktorije"""
         os.makedirs(os.path.join(self.confirmed_dir, "images"), exist_ok=True)
@@ -42,57 +82,112 @@ class FileStorage:
         os.makedirs(self.uploads_dir, exist_ok=True)
         os.makedirs(self.weights_dir, exist_ok=True)
 
+    def ingest(self, source_path: str, retain: bool = False) -> str:
+        """
+        Ubacuje upload u blob store (jedna kopija) i vraća SHA-256
+        Nakon ovoga se originalni upload smije prepisati/obrisati
+        retain=True: pozivalac drži referencu dok ne pozove release_blob()
+        """
+        return self.blobs.put(source_path, retain=retain)
+
+    def release_blob(self, digest: str) -> None:
+        """Vraća referencu uzetu sa ingest(retain=True)"""
+        self.blobs.release(digest)
+
     def save_confirmed_image(
             self,
             source_path: str,
             detections: List[Detection],
-            suffix: str = "first"
+            suffix: str = "first",
+            digest: Optional[str] = None
     ) -> Tuple[str, str]:
         """
         Čuva potvrđenu sliku + generiše YOLO labele
+        digest: hash iz ingest() (ako je slika već u blob store-u)
         Returns: (image_path, label_path)
         """
+        digest = digest or self.ingest(source_path)
+
+        # Ista slika već potvrđena (isti izvor) - ne duplira se
+        existing = self.manifest.find_image("confirmed", digest, suffix)
+        if existing:
+            return existing["path"], existing["label_path"]
+
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        # Kopiraj sliku
-        new_img_name = f"confirmed_{timestamp}_{suffix}.jpg"
+        # Pogled na blob (hash u imenu - nema sudara u istoj sekundi)
+        new_img_name = f"confirmed_{timestamp}_{digest[:12]}_{suffix}.jpg"
         new_img_path = os.path.join(self.confirmed_dir, "images", new_img_name)
-        shutil.copy(source_path, new_img_path)
+        self.blobs.link(digest, new_img_path)
 
-        # Generiši YOLO label
+        # Generiši YOLO label (dimenzije iz headera - bez dekodiranja)
+        metadata = self.metadata.for_blob(digest)
         label_name = new_img_name.replace('.jpg', '.txt')
         label_path = os.path.join(self.confirmed_dir, "labels", label_name)
-        self._save_yolo_labels(detections, label_path, source_path)
+        self._save_yolo_labels(detections, label_path, metadata.width, metadata.height)
+
+        # Upiši u manifest
+        class_counts = Counter(
+            d.class_name for d in detections if d.class_name in self.CLASS_MAPPING
+        )
+        self.manifest.add_image(
+            path=new_img_path,
+            kind="confirmed",
+            source=suffix,
+            sha256=digest,
+            label_path=label_path,
+            width=metadata.width,
+            height=metadata.height,
+            class_counts=dict(class_counts)
+        )
+
+        if self.dataset_cache is not None:
+            try:
+                self.dataset_cache.add(digest, new_img_path, label_path)
+            except Exception as e:
+                # Nije kritično - trening dopunjava keš prije početka
+                print(f"⚠️ Dataset keš: {e}")
 
         return new_img_path, label_path
 
-    def save_rejected_image(self, source_path: str, image_type: str = "first") -> str:
+    def save_rejected_image(
+            self,
+            source_path: str,
+            image_type: str = "first",
+            digest: Optional[str] = None
+    ) -> str:
         """
         Čuva odbijenu sliku
         image_type: 'first' ili 'zoom'
         """
+        digest = digest or self.ingest(source_path)
+
+        existing = self.manifest.find_image("rejected", digest, image_type)
+        if existing:
+            return existing["path"]
+
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        new_name = f"rejected_{image_type}_{timestamp}.jpg"
+        new_name = f"rejected_{image_type}_{timestamp}_{digest[:12]}.jpg"
         dest_path = os.path.join(self.rejected_dir, image_type, new_name)
-        shutil.copy(source_path, dest_path)
+        self.blobs.link(digest, dest_path)
+
+        metadata = self.metadata.for_blob(digest)
+        self.manifest.add_image(
+            dest_path, "rejected", image_type, digest,
+            width=metadata.width, height=metadata.height
+        )
         return dest_path
 
     def count_confirmed_images(self) -> int:
-        """Broji koliko ima confirmed slika"""
-        images_dir = os.path.join(self.confirmed_dir, "images")
-        return len([f for f in os.listdir(images_dir) if f.endswith('.jpg')])
+        """Broji koliko ima confirmed slika (O(1) - iz manifesta)"""
+        return self.manifest.count("confirmed")
 
     def count_rejected_images(self) -> Tuple[int, int]:
-        """Broji odbijene slike (first, zoom)"""
-        first_count = len([
-            f for f in os.listdir(os.path.join(self.rejected_dir, "first"))
-            if f.endswith('.jpg')
-        ])
-        zoom_count = len([
-            f for f in os.listdir(os.path.join(self.rejected_dir, "zoom"))
-            if f.endswith('.jpg')
-        ])
-        return first_count, zoom_count
+        """Broji odbijene slike (first, zoom) - iz manifesta"""
+        return (
+            self.manifest.count("rejected_first"),
+            self.manifest.count("rejected_zoom")
+        )
 
     def backup_model(self, model_path: str) -> str:
         """Kreira backup trenutnog modela"""
@@ -105,10 +200,58 @@ class FileStorage:
         """Zamjenjuje stari model sa novim"""
         shutil.copy(new_model_path, target_path)
 
-    def archive_confirmed_data(self) -> str:
-        """Arhivira confirmed podatke nakon uspješnog retraining-a"""
+    def snapshot_confirmed_data(self, snapshot_root: str = "backend/confirmed_snapshots") -> str:
+        """
+        Zamrzava trenutni confirmed dataset za trening (hardlinkovi - bez kopiranja)
+        Slike potvrđene TOKOM treninga ne ulaze u snapshot ni u njegovu arhivu
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        snapshot_dir = os.path.join(snapshot_root, timestamp)
+        os.makedirs(os.path.join(snapshot_dir, "images"), exist_ok=True)
+        os.makedirs(os.path.join(snapshot_dir, "labels"), exist_ok=True)
+
+        index = {}
+        for row in self.manifest.list_images("confirmed"):
+            name = os.path.basename(row["path"])
+            self._link_view(row["sha256"], row["path"], os.path.join(snapshot_dir, "images", name))
+            if row["label_path"] and os.path.exists(row["label_path"]):
+                label_name = os.path.basename(row["label_path"])
+                shutil.copy(row["label_path"], os.path.join(snapshot_dir, "labels", label_name))
+            index[name] = {"sha256": row["sha256"], "path": row["path"], "label_path": row["label_path"]}
+
+        with open(os.path.join(snapshot_dir, "snapshot.json"), "w") as f:
+            json.dump(index, f)
+
+        return snapshot_dir
+
+    def discard_snapshot(self, snapshot_dir: str) -> None:
+        """Briše snapshot (npr. novi model nije bolji) i oslobađa reference"""
+        for name, entry in self._read_snapshot_index(snapshot_dir).items():
+            self._unlink_view(entry["sha256"], os.path.join(snapshot_dir, "images", name))
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+    def archive_confirmed_data(self, snapshot_dir: Optional[str] = None) -> str:
+        """
+        Arhivira confirmed podatke nakon uspješnog retraining-a
+        snapshot_dir: arhiviraj SAMO slike iz snapshot-a na kojem se treniralo
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         archive_dir = f"backend/confirmed_archive/{timestamp}"
+
+        if snapshot_dir:
+            # Snapshot postaje arhiva, a iz confirmed pogleda se uklanjaju iste slike
+            index = self._read_snapshot_index(snapshot_dir)
+            os.makedirs(os.path.dirname(archive_dir), exist_ok=True)
+            shutil.move(snapshot_dir, archive_dir)
+
+            for entry in index.values():
+                self._unlink_view(entry["sha256"], entry["path"])
+                if entry["label_path"] and os.path.exists(entry["label_path"]):
+                    os.remove(entry["label_path"])
+
+            self.manifest.archive_confirmed(archive_dir, [e["path"] for e in index.values()])
+            return archive_dir
+
         os.makedirs(archive_dir, exist_ok=True)
 
         # Premjesti images i labels
@@ -125,31 +268,49 @@ class FileStorage:
         os.makedirs(os.path.join(self.confirmed_dir, "images"), exist_ok=True)
         os.makedirs(os.path.join(self.confirmed_dir, "labels"), exist_ok=True)
 
+        self.manifest.archive_confirmed(archive_dir)
+
         return archive_dir
 
+    def collect_garbage(self) -> dict:
+        """Briše blobove na koje više ne pokazuje nijedan pogled"""
+        return self.blobs.collect_garbage()
+
+    def _link_view(self, digest: str, source_path: str, dest_path: str):
+        """Hardlink pogled - preko blob store-a ako je slika u njemu"""
+        if self.blobs.refcount(digest) is not None:
+            self.blobs.link(digest, dest_path)
+            return
+        # Slike od prije blob store-a
+        try:
+            os.link(source_path, dest_path)
+        except OSError:
+            shutil.copy2(source_path, dest_path)
+
+    def _unlink_view(self, digest: str, view_path: str):
+        if self.blobs.refcount(digest) is not None:
+            self.blobs.unlink(digest, view_path)
+        elif os.path.exists(view_path):
+            os.remove(view_path)
+
+    @staticmethod
+    def _read_snapshot_index(snapshot_dir: str) -> dict:
+        with open(os.path.join(snapshot_dir, "snapshot.json")) as f:
+            return json.load(f)
+
     def _save_yolo_labels(
             self,
             detections: List[Detection],
             label_path: str,
-            original_image_path: str
+            img_w: int,
+            img_h: int
     ):
         """
         Generiše YOLO format labele iz detekcija
         IZVUČENO IZ main_old_notInUse.py - funkcija save_yolo_labels()
+        Dimenzije dolaze iz ImageMetadataService - slika se ne dekodira
         """
-        # Mapiranje klasa - SAMO PARKING RELEVANTNE
-        class_mapping = {
-            'Auto': 0,
-            'RezervacijaOznaka': 1,
-            'ZauzetoMjesto': 2,
-            'NepropisnoParkirano_naInvalidskomMjesto': 3,
-            'NepropisnoParkirano_prekoLinije': 4,
-            'NepropisnoParkirano_vanOkviraParkinga': 5,
-            'InvalidskaOznaka': 6,
-            'InvalidskoMjesto': 7,
-            'Tablica': 8,
-            'PravilnoParkirano': 9
-        }
+        class_mapping = self.CLASS_MAPPING
 
         # Filtriraj samo relevantne detekcije
         valid_detections = [
@@ -157,17 +318,6 @@ class FileStorage:
             if d.class_name in class_mapping
         ]
 
-        if len(valid_detections) == 0:
-            # Prazna label datoteka
-            with open(label_path, 'w') as f:
-                pass
-            return
-
-        # Učitaj dimenzije slike (potrebno za normalizaciju)
-        import cv2
-        img = cv2.imread(original_image_path)
-        img_h, img_w = img.shape[:2]
-
         with open(label_path, 'w') as f:
             for det in valid_detections:
                 new_cls_id = class_mapping[det.class_name]
@@ -179,4 +329,4 @@ class FileStorage:
                 width = (x2 - x1) / img_w
                 height = (y2 - y1) / img_h
 
-                f.write(f"{new_cls_id} {center_x} {center_y} {width} {height}\n")
\ No newline at end of file
+                f.write(f"{new_cls_id} {center_x} {center_y} {width} {height}\n")
@@ -0,0 +1,61 @@
+"""
+Infrastructure sloj - Image Metadata
+Dimenzije i EXIF orijentacija iz headera slike - bez dekodiranja piksela
+"""
+from typing import Optional
+import sys
+
+from PIL import Image
+
+sys.path.append('..')
+from parking_agent.domain.entities import ImageMetadata
+from parking_agent.infrastructure.blob_store import BlobStore
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+class ImageMetadataService:
+    """
+    Servis za metapodatke slika
+
+    PIL.Image.open čita samo header (SOF + EXIF), pikseli se ne dekodiraju.
+    Rezultat se kešira uz blob (po SHA-256), pa se ista slika nikad ne
+    probira dva puta - ni pri ponovnom generisanju labela.
+    """
+
+    def __init__(self, blob_store: BlobStore):
+        self.blobs = blob_store
+
+    @staticmethod
+    def probe(image_path: str) -> ImageMetadata:
+        """Čita dimenzije + orijentaciju iz headera fajla"""
+        with Image.open(image_path) as img:
+            width, height = img.size
+            orientation = img.getexif().get(EXIF_ORIENTATION_TAG, 1)
+            fmt = img.format or "JPEG"
+
+        # Orijentacije 5-8 rotiraju sliku za 90° (cv2.imread ih primjenjuje)
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+
+        return ImageMetadata(width=width, height=height, orientation=orientation, format=fmt)
+
+    def for_blob(self, digest: str, image_path: Optional[str] = None) -> ImageMetadata:
+        """
+        Metapodaci za sliku u blob store-u (keš → header probe)
+        """
+        cached = self.blobs.get_metadata(digest)
+        if cached:
+            return ImageMetadata(
+                width=cached[0], height=cached[1], orientation=cached[2], format=cached[3]
+            )
+
+        metadata = self.probe(image_path or self.blobs.path_for(digest))
+        self.remember(digest, metadata)
+        return metadata
+
+    def remember(self, digest: str, metadata: ImageMetadata) -> None:
+        """Čuva metapodatke već prikupljene npr. pri uploadu"""
+        self.blobs.set_metadata(
+            digest, metadata.width, metadata.height, metadata.orientation, metadata.format
+        )
@@ -0,0 +1,58 @@
+"""
+Infrastructure sloj - Image Source
+Izvor slika za offline obradu (folder ili tar arhiva) kao IPerceptionSource
+"""
+import os
+import asyncio
+import tarfile
+from typing import Iterator, Tuple, Optional, Set
+import sys
+
+sys.path.append('..')
+from core.software_agent import IPerceptionSource
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def iter_sources(path: str) -> Iterator[Tuple[str, bytes]]:
+    """
+    (ključ, sadržaj) za svaku sliku
+    Ključ je relativna putanja (folder) ili ime člana (tar) - koristi se za resume
+    """
+    if os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    full_path = os.path.join(root, name)
+                    with open(full_path, "rb") as f:
+                        yield os.path.relpath(full_path, path), f.read()
+        return
+
+    # tar / tar.gz - čita se sekvencijalno (radi i za stream)
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield member.name, archive.extractfile(member).read()
+
+
+class ImageArchiveSource(IPerceptionSource):
+    """
+    SENSE za batch obradu: {"source": ključ, "data": bajtovi}
+    skip: ključevi koji su već obrađeni (resume)
+    """
+
+    def __init__(self, path: str, skip: Optional[Set[str]] = None):
+        self.path = path
+        self.skip = skip or set()
+        self._iterator = iter_sources(path)
+
+    async def get_next_percept(self) -> Optional[dict]:
+        # Čitanje fajla/arhive u threadu - event loop ostaje slobodan
+        return await asyncio.to_thread(self._next)
+
+    def _next(self) -> Optional[dict]:
+        for key, data in self._iterator:
+            if key not in self.skip:
+                return {"source": key, "data": data}
+        return None
@@ -0,0 +1,182 @@
+"""
+Infrastructure sloj - Durable Job Queue
+Perzistentni red poslova (SQLite journal) za pozadinsku obradu
+"""
+import json
+import time
+import sqlite3
+from typing import Optional
+
+
+class DurableJobQueue:
+    """
+    Jednostavan trajni red poslova
+
+    - enqueue() upisuje posao u journal (commit = posao neće biti izgubljen)
+    - claim() atomarno uzima sljedeći posao (pending → running)
+    - fail() vraća posao u red sa eksponencijalnim backoff-om,
+      a nakon max_attempts ga označava kao 'failed'
+    - poslovi ostali 'running' nakon pada procesa vraćaju se u red pri startu
+    """
+
+    def __init__(
+            self,
+            db_path: str = "backend/review_jobs.db",
+            max_attempts: int = 5,
+            base_backoff_s: float = 2.0
+    ):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.base_backoff_s = base_backoff_s
+        self._init_schema()
+        self.requeue_stale()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                available_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, available_at)"
+        )
+        conn.close()
+
+    def enqueue(self, kind: str, payload: dict) -> int:
+        """Upisuje posao u journal i vraća njegov ID"""
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.execute(
+            "INSERT INTO jobs (kind, payload, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload), now, now, now)
+        )
+        job_id = cursor.lastrowid
+        conn.close()
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """Uzima sljedeći dostupni posao (ili None ako nema)"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' AND available_at <= ? "
+                "ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "attempts": row["attempts"] + 1
+        }
+
+    def complete(self, job_id: int) -> None:
+        self._set_status(job_id, "done")
+
+    def fail(self, job_id: int, error: str) -> None:
+        """Neuspjeh - retry sa backoff-om ili trajno 'failed'"""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row and row["attempts"] < self.max_attempts:
+            delay = self.base_backoff_s * (2 ** (row["attempts"] - 1))
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', last_error = ?, available_at = ?, "
+                "updated_at = ? WHERE id = ?",
+                (error, now + delay, now, job_id)
+            )
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', last_error = ?, updated_at = ? WHERE id = ?",
+                (error, now, job_id)
+            )
+        conn.close()
+
+    def requeue_stale(self) -> None:
+        """Poslovi prekinuti padom procesa se vraćaju u red"""
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET status = 'pending', updated_at = ? WHERE status = 'running'",
+            (time.time(),)
+        )
+        conn.close()
+
+    def has_pending(self) -> bool:
+        """Brza provjera (indeks) - ima li posla spremnog za obradu"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT 1 FROM jobs WHERE status = 'pending' AND available_at <= ? LIMIT 1",
+            (time.time(),)
+        ).fetchone()
+        conn.close()
+        return row is not None
+
+    def stats(self) -> dict:
+        """Stanje reda: broj poslova po statusu + starost najstarijeg na čekanju"""
+        conn = self._connect()
+        counts = {
+            r["status"]: r["n"]
+            for r in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+        }
+        oldest = conn.execute(
+            "SELECT MIN(created_at) AS t FROM jobs WHERE status IN ('pending', 'running')"
+        ).fetchone()["t"]
+        last_errors = [
+            {"id": r["id"], "kind": r["kind"], "error": r["last_error"]}
+            for r in conn.execute(
+                "SELECT id, kind, last_error FROM jobs WHERE status = 'failed' "
+                "ORDER BY updated_at DESC LIMIT 5"
+            )
+        ]
+        conn.close()
+
+        return {
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_pending_age_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "recent_failures": last_errors
+        }
+
+    def _set_status(self, job_id: int, status: str):
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+            (status, time.time(), job_id)
+        )
+        conn.close()
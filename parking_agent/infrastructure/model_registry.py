@@ -0,0 +1,91 @@
+"""
+Infrastructure sloj - Model Registry
+Registrovane verzije modela (učitelj / student) - koja je aktivna i od čega je nastala
+"""
+import sqlite3
+from datetime import datetime
+from typing import List, Optional
+import sys
+
+sys.path.append('..')
+from parking_agent.domain.entities import ModelVersion
+
+
+class ModelRegistry:
+    """
+    ModelVersion po ulozi: najviše jedna aktivna verzija po ulozi
+    version_id je hash težina (kao YoloClassifier.model_version)
+    """
+
+    def __init__(self, db_path: str = "backend/model_registry.db"):
+        self.db_path = db_path
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS model_versions (
+                version_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                map50 REAL NOT NULL,
+                backup_path TEXT NOT NULL,
+                is_active INTEGER NOT NULL DEFAULT 0,
+                teacher_version TEXT,
+                latency_ms REAL,
+                PRIMARY KEY (version_id, role)
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def register(self, version: ModelVersion) -> None:
+        """Upisuje verziju; aktivna verzija deaktivira ostale iste uloge"""
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            if version.is_active:
+                conn.execute("UPDATE model_versions SET is_active = 0 WHERE role = ?", (version.role,))
+            conn.execute(
+                "INSERT OR REPLACE INTO model_versions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (version.version_id, version.role, version.timestamp.isoformat(), version.map50,
+                 version.backup_path, int(version.is_active), version.teacher_version, version.latency_ms)
+            )
+        conn.close()
+
+    def active(self, role: str) -> Optional[ModelVersion]:
+        versions = self._query("WHERE role = ? AND is_active = 1", (role,))
+        return versions[0] if versions else None
+
+    def get(self, version_id: str, role: str) -> Optional[ModelVersion]:
+        versions = self._query("WHERE version_id = ? AND role = ?", (version_id, role))
+        return versions[0] if versions else None
+
+    def list(self, role: Optional[str] = None) -> List[ModelVersion]:
+        if role:
+            return self._query("WHERE role = ? ORDER BY timestamp DESC", (role,))
+        return self._query("ORDER BY timestamp DESC", ())
+
+    def deactivate(self, role: str) -> None:
+        conn = sqlite3.connect(self.db_path)
+        with conn:
+            conn.execute("UPDATE model_versions SET is_active = 0 WHERE role = ?", (role,))
+        conn.close()
+
+    def _query(self, where: str, params: tuple) -> List[ModelVersion]:
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(
+            "SELECT version_id, timestamp, map50, backup_path, is_active, role, teacher_version, latency_ms "
+            f"FROM model_versions {where}",
+            params
+        ).fetchall()
+        conn.close()
+        return [
+            ModelVersion(
+                version_id=row[0],
+                timestamp=datetime.fromisoformat(row[1]),
+                map50=row[2],
+                backup_path=row[3],
+                is_active=bool(row[4]),
+                role=row[5],
+                teacher_version=row[6],
+                latency_ms=row[7]
+            )
+            for row in rows
+        ]
@@ -0,0 +1,135 @@
+"""
+Infrastructure sloj - Upload Workspace
+Izolovani upload prostor po sesiji (umjesto fiksnih first_image.jpg/zoom_image.jpg)
+"""
+import os
+import re
+import time
+import uuid
+import shutil
+import threading
+from typing import Optional, Dict, BinaryIO
+
+SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadSession:
+    """Jedna sesija: folder na disku + mali fajlovi u memoriji"""
+
+    def __init__(self, session_id: str, directory: str):
+        self.session_id = session_id
+        self.directory = directory
+        self.buffers: Dict[str, bytes] = {}
+        self.last_access = time.time()
+
+
+class UploadWorkspace:
+    """
+    Workspace za uploade - svaka analiza dobija svoj session_id
+
+    backend/uploads/<session_id>/first.jpg
+    backend/uploads/<session_id>/zoom.jpg
+
+    - dva oficira više ne prepisuju jedan drugom slike
+    - fajlovi do spool_max_bytes ostaju i u memoriji (get_bytes) pa se
+      za hash/dekodiranje ne čita ponovo disk; YOLO/OCR/blob store i dalje
+      dobijaju putanju
+    - sesije starije od ttl_seconds (od zadnjeg pristupa) se brišu
+    """
+
+    def __init__(
+            self,
+            root: str = "backend/uploads",
+            ttl_seconds: float = 3600,
+            spool_max_bytes: int = 8 * 1024 * 1024
+    ):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.spool_max_bytes = spool_max_bytes
+        self._sessions: Dict[str, UploadSession] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._purge_stale_directories()
+
+    def create_session(self) -> str:
+        """Nova sesija (usput čisti istekle)"""
+        self.cleanup_expired()
+
+        session_id = uuid.uuid4().hex
+        directory = os.path.join(self.root, session_id)
+        os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            self._sessions[session_id] = UploadSession(session_id, directory)
+        return session_id
+
+    def save(self, session_id: str, name: str, fileobj: BinaryIO) -> str:
+        """
+        Čuva upload u sesiju i vraća putanju fajla
+        name: 'first', 'zoom', ...
+        """
+        session = self._get(session_id)
+        path = os.path.join(session.directory, f"{name}.jpg")
+
+        data = fileobj.read(self.spool_max_bytes + 1)
+        with open(path, "wb") as buffer:
+            buffer.write(data)
+            if len(data) > self.spool_max_bytes:
+                # Prevelik za memoriju - ostatak ide direktno na disk
+                shutil.copyfileobj(fileobj, buffer)
+                session.buffers.pop(name, None)
+            else:
+                session.buffers[name] = data
+
+        return path
+
+    def path(self, session_id: str, name: str) -> str:
+        """Putanja fajla u sesiji (KeyError ako ne postoji)"""
+        session = self._get(session_id)
+        path = os.path.join(session.directory, f"{name}.jpg")
+        if not os.path.exists(path):
+            raise KeyError(f"Sesija {session_id} nema sliku '{name}'")
+        return path
+
+    def get_bytes(self, session_id: str, name: str) -> Optional[bytes]:
+        """Sadržaj fajla iz memorije (None ako nije spool-ovan)"""
+        return self._get(session_id).buffers.get(name)
+
+    def has_session(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def discard(self, session_id: str) -> None:
+        """Briše sesiju i njene fajlove"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session:
+            shutil.rmtree(session.directory, ignore_errors=True)
+
+    def cleanup_expired(self) -> int:
+        """Briše sesije bez pristupa duže od TTL-a"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if s.last_access < cutoff]
+        for session_id in expired:
+            self.discard(session_id)
+        return len(expired)
+
+    def _get(self, session_id: str) -> UploadSession:
+        if not SESSION_ID_PATTERN.match(session_id or ""):
+            raise KeyError(f"Neispravan session_id: {session_id}")
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise KeyError(f"Sesija {session_id} ne postoji ili je istekla")
+        session.last_access = time.time()
+        return session
+
+    def _purge_stale_directories(self):
+        """Sesijski folderi ostali od prethodnog pokretanja"""
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            if SESSION_ID_PATTERN.match(name) and os.path.isdir(directory):
+                if os.path.getmtime(directory) < cutoff:
+                    shutil.rmtree(directory, ignore_errors=True)
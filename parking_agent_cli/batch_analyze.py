@@ -0,0 +1,198 @@
+"""
+ParkingAgent CLI - Batch analiza
+TANKI HOST - offline obrada foldera ili tar arhive kroz DetectionService
+
+Primjer:
+    python parking_agent_cli/batch_analyze.py backend/patrola/ruta_7 -o rezultati.jsonl
+    python parking_agent_cli/batch_analyze.py noc.tar -o rezultati_parquet --format parquet
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+from typing import List, Set
+
+# ===================================
+# PATH FIX - kao u parking_agent_web/main.py
+# ===================================
+current_dir = os.path.dirname(os.path.abspath(__file__))  # parking_agent_cli/
+project_root = os.path.dirname(current_dir)
+sys.path.insert(0, project_root)
+
+from backend.database import DB_PATH
+from parking_agent.ML.yolo_classifier import YoloClassifier
+from parking_agent.infrastructure.database import ParkingDbContext
+from parking_agent.infrastructure.async_database import AsyncParkingDbContext
+from parking_agent.infrastructure.detection_store import DetectionRecordStore
+from parking_agent.infrastructure.image_source import ImageArchiveSource
+from parking_agent.application.services.detection_service import DetectionService
+from parking_agent.application.runners.analysis_pipeline import build_analysis_pipeline
+
+
+# ===================================
+# IZLAZ - JSONL ili Parquet (sa resume)
+# ===================================
+class JsonlWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._repair_tail()
+        self.f = open(path, "a", encoding="utf-8")
+
+    def done_keys(self) -> Set[str]:
+        keys = set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                keys.add(json.loads(line)["source"])
+        return keys
+
+    def write(self, rows: List[dict]):
+        for row in rows:
+            self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+    def _repair_tail(self):
+        """Prekinut upis (pad procesa) - odsijeca nedovršen zadnji red"""
+        if not os.path.exists(self.path):
+            open(self.path, "w").close()
+            return
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+
+class ParquetWriter:
+    """Folder sa part-XXXXX.parquet fajlovima - svaki part je kompletan"""
+
+    def __init__(self, directory: str, rows_per_part: int = 2000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa, self.pq = pa, pq
+        self.directory = directory
+        self.rows_per_part = rows_per_part
+        self._buffer = []
+        self.schema = pa.schema([
+            ("source", pa.string()),
+            ("image_hash", pa.string()),
+            ("model_version", pa.string()),
+            ("status", pa.string()),
+            ("message", pa.string()),
+            ("prekrsaj_id", pa.int64()),
+            ("detected_violation", pa.string()),
+            ("n_detections", pa.int64()),
+            ("cars", pa.string())
+        ])
+        os.makedirs(directory, exist_ok=True)
+        self._next_part = len(self._parts())
+
+    def done_keys(self) -> Set[str]:
+        keys = set()
+        for part in self._parts():
+            keys.update(self.pq.read_table(part, columns=["source"]).column("source").to_pylist())
+        return keys
+
+    def write(self, rows: List[dict]):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.rows_per_part:
+            self._flush()
+
+    def close(self):
+        self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        table = self.pa.Table.from_pylist(self._buffer, schema=self.schema)
+        final_path = os.path.join(self.directory, f"part-{self._next_part:05d}.parquet")
+        tmp_path = final_path + ".tmp"
+        self.pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, final_path)  # part je ili kompletan ili ne postoji
+        self._next_part += 1
+        self._buffer = []
+
+    def _parts(self) -> List[str]:
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith("part-") and name.endswith(".parquet")
+        )
+
+
+# ===================================
+# BATCH ANALIZA - core.pipeline
+# ===================================
+async def run_batch(detection_service: DetectionService, source: str, writer, args) -> dict:
+    """
+    read → decode → YOLO batch → pravila → OCR + vozač → upis
+    Faze teku paralelno (ograničeni redovi između njih)
+    """
+    done = writer.done_keys()
+    if done:
+        print(f"↩️ Resume: {len(done)} slika već obrađeno - preskačem")
+
+    await detection_service.ensure_rules()
+    pipeline = build_analysis_pipeline(
+        detection_service,
+        writer,
+        decode_workers=args.decode_workers,
+        batch_size=args.batch_size,
+        ocr_workers=args.ocr_workers
+    )
+
+    processed = 0
+    try:
+        async for _ in pipeline.stream(ImageArchiveSource(source, skip=done)):
+            processed += 1
+            if processed % 100 == 0:
+                print(f"📦 {processed} slika obrađeno")
+    finally:
+        writer.close()
+
+    stats = pipeline.stats()
+    print_report(stats, processed)
+    return stats
+
+
+def print_report(stats: dict, total: int):
+    """Protok po fazama"""
+    print(f"\n{'faza':<10}{'slika':>8}{'zauzeto s':>11}{'slika/s':>10}{'p95 ms':>9}{'iskorišt.':>11}")
+    for name, stage in stats["stages"].items():
+        busy = stage["busy_s"]
+        rate = stage["processed"] / busy if busy else 0.0
+        print(
+            f"{name:<10}{stage['processed']:>8}{busy:>11.2f}{rate:>10.1f}"
+            f"{stage['latency_p95_ms']:>9.1f}{stage['utilization']:>11.0%}"
+        )
+    wall = stats["wall_s"]
+    print(f"{'ukupno':<10}{total:>8}{wall:>11.2f}{(total / wall if wall else 0):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch analiza slika (folder ili tar)")
+    parser.add_argument("source", help="Folder sa slikama ili .tar/.tar.gz arhiva")
+    parser.add_argument("-o", "--output", required=True, help="JSONL fajl ili Parquet folder")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--weights", default="backend/weights/best.pt")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--decode-workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--ocr-workers", type=int, default=1)
+    args = parser.parse_args()
+
+    classifier = YoloClassifier(args.weights)
+    async_db = AsyncParkingDbContext(ParkingDbContext(DB_PATH))
+    detection_service = DetectionService(classifier, async_db, DetectionRecordStore())
+
+    writer = JsonlWriter(args.output) if args.format == "jsonl" else ParquetWriter(args.output)
+
+    try:
+        asyncio.run(run_batch(detection_service, args.source, writer, args))
+    finally:
+        async_db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,9 @@ TANKI HOST - samo API endpoints, poziva Runnere
 """
 import os
 import sys
-import shutil
+import json
+import asyncio
+from dataclasses import asdict
 from datetime import datetime
 
 # ===================================
@@ -18,8 +20,9 @@ sys.path.insert(0, project_root)
 print(f"📁 Project root: {project_root}")
 
 # Sada može da importuje backend i parking_agent
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import uvicorn
 from pydantic import BaseModel
 
@@ -27,14 +30,25 @@ from pydantic import BaseModel
 # DEPENDENCY INJECTION - Inicijalizacija
 # ===================================
 from backend.database import init_db, DB_PATH
+from core.agent_host import AgentHost
 from parking_agent.ML.yolo_classifier import YoloClassifier
+from parking_agent.ML.dataset_cache import DatasetCache
 from parking_agent.infrastructure.database import ParkingDbContext
+from parking_agent.infrastructure.async_database import AsyncParkingDbContext
+from parking_agent.infrastructure.detection_store import DetectionRecordStore
+from parking_agent.infrastructure.upload_workspace import UploadWorkspace
 from parking_agent.infrastructure.file_storage import FileStorage
+from parking_agent.infrastructure.model_registry import ModelRegistry
 from parking_agent.application.services.detection_service import DetectionService
+from parking_agent.application.services.cascade import CascadePolicy
 from parking_agent.application.services.review_service import ReviewService
 from parking_agent.application.services.training_service import TrainingService
+from parking_agent.application.services.distillation_service import DistillationService
+from parking_agent.application.services.analysis_session_store import AnalysisSessionStore
 from parking_agent.application.runners.detection_runner import DetectionRunner
 from parking_agent.application.runners.retrain_runner import RetrainRunner
+from parking_agent.application.runners.review_persistence_runner import ReviewPersistenceRunner
+from parking_agent.application.runners.distillation_runner import DistillationRunner
 
 # ===================================
 # SETUP
@@ -51,9 +65,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Upload folder
+# Upload folder - svaka analiza ima svoju sesiju (backend/uploads/<session_id>/)
 UPLOAD_DIR = "backend/uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+workspace = UploadWorkspace(UPLOAD_DIR)
 
 # ===================================
 # DEPENDENCY INJECTION - Kreiraj instancu jednom!
@@ -63,16 +77,40 @@ print("🚀 Inicijalizujem ParkSmart AI Agent...")
 # Infrastructure
 classifier = YoloClassifier("backend/weights/best.pt")
 db_context = ParkingDbContext(DB_PATH)
-file_storage = FileStorage()
+async_db = AsyncParkingDbContext(db_context)  # za async servise - ne blokira event loop
+dataset_cache = DatasetCache("backend/dataset_cache", imgsz=640)  # trening čita slike iz memmap-a
+file_storage = FileStorage(dataset_cache=dataset_cache)
+detection_store = DetectionRecordStore()
+model_registry = ModelRegistry()
 
 # Services
-detection_service = DetectionService(classifier, db_context)
-review_service = ReviewService(db_context, file_storage, classifier)
-training_service = TrainingService(classifier, file_storage)
+# Kaskada: prva slika ide na učitelja samo kad student nije siguran
+detection_service = DetectionService(classifier, async_db, detection_store, cascade=CascadePolicy())
+review_service = ReviewService(
+    async_db, file_storage, classifier, detection_store=detection_store
+)
+training_service = TrainingService(classifier, file_storage, dataset_cache_dir=dataset_cache.base_root)
+distillation_service = DistillationService(
+    classifier, file_storage, model_registry,
+    evaluation_store=training_service.evaluations, dataset_cache_dir=dataset_cache.base_root
+)
+# Destilovani student (ako postoji) služi detekciju; učitelj ostaje za labele
+distillation_service.restore_active_student()
+
+# Kontekst dvostepene analize - istekla/izbačena sesija briše i svoje uploade
+analysis_sessions = AnalysisSessionStore(on_evict=workspace.discard)
 
 # Runners (⭐ KLJUČNO!)
-detection_runner = DetectionRunner(detection_service, review_service)
+detection_runner = DetectionRunner(detection_service, review_service, analysis_sessions)
 retrain_runner = RetrainRunner(training_service, review_service)
+review_persistence_runner = ReviewPersistenceRunner(review_service)
+distillation_runner = DistillationRunner(distillation_service, retrain_runner.jobs)
+
+# Pozadinski agenti - review journal brzo, retraining rijetko (skup)
+agent_host = AgentHost()
+agent_host.register("review_persistence", review_persistence_runner, min_backoff_s=0.2, max_backoff_s=5.0)
+agent_host.register("retrain", retrain_runner, min_backoff_s=30.0, max_backoff_s=600.0)
+agent_host.register("distill", distillation_runner, min_backoff_s=60.0, max_backoff_s=1800.0)
 
 print("✅ ParkSmart AI Agent spreman!")
 
@@ -94,10 +132,12 @@ class Prekrsaj(BaseModel):
 
 
 class Detektovano(BaseModel):
-    vozac_id: int
-    prekrsaj_id: int
-    slika1: str
+    # Sa session_id se nedostajući podaci uzimaju iz sesije analize
+    vozac_id: int | None = None
+    prekrsaj_id: int | None = None
+    slika1: str | None = None
     slika2: str | None = None
+    session_id: str | None = None
 
 
 # ===================================
@@ -117,12 +157,15 @@ async def detect_image(file: UploadFile = File(...)):
     """
     Osnovni YOLO detect za frontend prikaz bbox-ova
     """
-    temp_path = os.path.join(UPLOAD_DIR, "temp_image.jpg")
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Privremena sesija - detekcije ostaju u DetectionRecordStore (po hash-u)
+    session_id = workspace.create_session()
+    try:
+        temp_path = workspace.save(session_id, "detect", file.file)
 
-    # TANKO - pozovi klasifikator direktno (ovo je OK, nema poslovne logike)
-    detections = await classifier.predict(temp_path)
+        # TANKO - servis vraća sačuvane detekcije ako je slika već analizirana
+        detection_set = await detection_service.detect(temp_path)
+    finally:
+        workspace.discard(session_id)
 
     return {
         "detections": [
@@ -131,7 +174,7 @@ async def detect_image(file: UploadFile = File(...)):
                 "class": det.class_name,
                 "confidence": det.confidence
             }
-            for det in detections
+            for det in detection_set.detections
         ]
     }
 
@@ -144,12 +187,15 @@ async def analyze_first_image(file: UploadFile = File(...)):
     PRIJE: 50+ linija logike ovdje
     POSLIJE: 3 linije - poziv Runner-a!
     """
-    first_path = os.path.join(UPLOAD_DIR, "first_image.jpg")
-    with open(first_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    session_id = workspace.create_session()
+    first_path = workspace.save(session_id, "first", file.file)
 
-    # ✅ Samo pozovi Runner!
-    result = await detection_runner.step_async(first_path, "first")
+    # ✅ Samo pozovi Runner! (slika iz memorije - disk se ne čita ponovo)
+    result = await detection_runner.step_async(
+        first_path, "first", session_id, workspace.get_bytes(session_id, "first")
+    )
+    result["session_id"] = session_id
+    result["slika1"] = first_path
     print("🔍 BACKEND VRAĆA:", result)
     return result
 
@@ -157,31 +203,47 @@ async def analyze_first_image(file: UploadFile = File(...)):
 @app.post("/analyze_zoom_image")
 async def analyze_zoom_image(
         file: UploadFile = File(...),
-        prekrsaj_id: int = Form(...),
-        on_reservation: bool = Form(False)
+        session_id: str = Form(...),
+        prekrsaj_id: int | None = Form(None),
+        on_reservation: bool | None = Form(None)
 ):
     """
     Analizira zoom sliku (tablica)
+    session_id: iz odgovora /analyze_first_image (veže zoom uz prvu sliku)
+    prekrsaj_id/on_reservation: opciono - server ih pamti u sesiji analize
 
     PRIJE: 60+ linija logike
     POSLIJE: 4 linije - poziv Runner-a!
     """
-    zoom_path = os.path.join(UPLOAD_DIR, "zoom_image.jpg")
-    with open(zoom_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
-    first_path = os.path.join(UPLOAD_DIR, "first_image.jpg")
+    try:
+        first_path = workspace.path(session_id, "first")
+        zoom_path = workspace.save(session_id, "zoom", file.file)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
     # ✅ Samo pozovi Runner!
     result = await detection_runner.analyze_zoom_step(
         zoom_path,
         prekrsaj_id,
         on_reservation,
-        first_path
+        first_path,
+        session_id
     )
     return result
 
 
+@app.post("/analyze_car_plate")
+async def analyze_car_plate(
+        session_id: str = Form(...),
+        car_index: int = Form(...)
+):
+    """
+    Tablica ostalog vozila sa prekršajem (cars[i].plate_pending iz /analyze_first_image)
+    Čita se na zahtjev - prva analiza ne čeka OCR svih vozila
+    """
+    return await detection_runner.read_car_plate(session_id, car_index)
+
+
 # --------------------------------------------------------
 # REVIEW ENDPOINTS - samo pozivaju DetectionRunner
 # --------------------------------------------------------
@@ -194,27 +256,33 @@ async def record_violation(d: Detektovano):
     POSLIJE: 1 linija - poziv Runner-a!
     """
     result = await detection_runner.confirm_detection(
-        d.vozac_id, d.prekrsaj_id, d.slika1, d.slika2
+        d.vozac_id, d.prekrsaj_id, d.slika1, d.slika2, d.session_id
     )
+    agent_host.trigger("review_persistence")
     return result
 
 
 @app.post("/record_ok_detection")
-async def record_ok_detection(image_path: str = Form(...)):
+async def record_ok_detection(
+        image_path: str = Form(None),
+        session_id: str = Form(None)
+):
     """
     Čuva OK detekciju (nema prekršaja)
 
     PRIJE: 20+ linija logike
     POSLIJE: 1 linija - poziv Runner-a!
     """
-    result = await detection_runner.confirm_ok_detection(image_path)
+    result = await detection_runner.confirm_ok_detection(image_path, session_id)
+    agent_host.trigger("review_persistence")
     return result
 
 
 @app.post("/reject_detection")
 async def reject_detection(
-        image_path: str = Form(...),
-        second_image_path: str = Form(None)
+        image_path: str = Form(None),
+        second_image_path: str = Form(None),
+        session_id: str = Form(None)
 ):
     """
     Odbija detekciju (false positive)
@@ -222,7 +290,8 @@ async def reject_detection(
     PRIJE: 20+ linija logike
     POSLIJE: 1 linija - poziv Runner-a!
     """
-    result = await detection_runner.reject_detection(image_path, second_image_path)
+    result = await detection_runner.reject_detection(image_path, second_image_path, session_id)
+    agent_host.trigger("review_persistence")
     return result
 
 
@@ -240,22 +309,152 @@ def get_learning_stats():
 # --------------------------------------------------------
 # RETRAINING ENDPOINT - samo poziva RetrainRunner
 # --------------------------------------------------------
-@app.post("/retrain_model")
-async def retrain_model():
+@app.post("/retrain_model", status_code=202)
+def retrain_model():
     """
-    Pokreće retraining modela
+    Pokreće retraining modela kao pozadinski posao
 
-    PRIJE: 150+ linija logike ovdje ❌
-    POSLIJE: 1 linija - poziv Runner-a! ✅
+    PRIJE: 150+ linija logike ovdje ❌ (HTTP zahtjev otvoren minutama)
+    POSLIJE: job_id odmah, napredak preko /training_jobs/{job_id} ✅
 
     OVO JE KLJUČNA RAZLIKA!
     Sva logika (threshold pravila, trening, evaluacija)
     je u RetrainRunner i TrainingService!
     """
-    result = await retrain_runner.step_async()
+    result = retrain_runner.start_job()
+    if result["status"] == "BUSY":
+        raise HTTPException(status_code=409, detail=result)
     return result
 
 
+@app.get("/training_jobs")
+def get_training_jobs():
+    """Zadnji retraining poslovi (najnoviji prvi)"""
+    return retrain_runner.jobs.list()
+
+
+@app.get("/training_jobs/{job_id}")
+def get_training_job(job_id: str):
+    """Polling: faza, epoha, metrike i rezultat posla"""
+    job = retrain_runner.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Posao ne postoji")
+    return job
+
+
+@app.get("/training_jobs/{job_id}/events")
+async def stream_training_job(job_id: str):
+    """
+    Server-Sent Events: faze, epohe (metrike) i završni "done" događaj
+    Konekcija se zatvara kad je posao gotov
+    """
+    job = retrain_runner.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Posao ne postoji")
+
+    async def events():
+        index = 0
+        while True:
+            batch, finished = await asyncio.to_thread(job.events_since, index, 15.0)
+            for event in batch:
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            index += len(batch)
+            if finished:
+                return
+            if not batch:
+                yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.post("/training_jobs/{job_id}/cancel")
+def cancel_training_job(job_id: str):
+    """Otkazuje posao - proces treninga se prekida, aktivni model ostaje"""
+    if not retrain_runner.jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="Posao ne postoji ili je već završen")
+    return {"job_id": job_id, "cancel_requested": True}
+
+
+@app.get("/review_queue")
+def get_review_queue():
+    """Backlog pozadinskog čuvanja review odluka"""
+    return review_service.get_review_queue_stats()
+
+
+# --------------------------------------------------------
+# POZADINSKI AGENTI - AgentHost pokreće step_async petlje
+# --------------------------------------------------------
+@app.on_event("startup")
+def start_agents():
+    # Svaki agent ima vlastitu nit + event loop - YOLO/kopiranje ne blokira HTTP loop
+    agent_host.start()
+
+
+@app.on_event("shutdown")
+def stop_agents():
+    # Otkazuje korake u toku i ručno pokrenut retraining (proces treninga se prekida);
+    # retraining se nastavlja od zadnjeg checkpoint-a pri sljedećem pokretanju
+    training_service.suspend()
+    retrain_runner.jobs.cancel_active()
+    agent_host.stop()
+
+
+@app.get("/agents")
+def get_agents():
+    """Tick/step latencija, ishodi i backoff po agentu"""
+    return agent_host.stats()
+
+
+@app.get("/models")
+def get_models():
+    """Registrovane verzije modela (učitelj / student) i koji model služi detekciju"""
+    return {
+        "serving_version": classifier.model_version,
+        "teacher_version": classifier.teacher_version,
+        "student_version": classifier.student_version,
+        "versions": [
+            {**asdict(version), "timestamp": version.timestamp.isoformat()}
+            for version in model_registry.list()
+        ]
+    }
+
+
+@app.get("/models/cascade")
+def get_cascade_stats():
+    """Kaskadna detekcija: stopa eskalacije na učitelja i latencija po nivou"""
+    return detection_service.cascade_stats()
+
+
+@app.post("/models/distill", status_code=202)
+def distill_student():
+    """Budi agenta za destilaciju (radi u pozadini ako učitelj nema studenta)"""
+    needed = distillation_service.needs_distillation()
+    if needed:
+        agent_host.trigger("distill")
+    return {"scheduled": needed, "teacher_version": classifier.teacher_version}
+
+
+@app.get("/analysis_sessions")
+def get_analysis_sessions():
+    """Broj otvorenih analiza i memorija keširanih slika"""
+    return analysis_sessions.stats()
+
+
+@app.get("/db_stats")
+def get_db_stats():
+    """Vrijeme izvršavanja upita kroz async DB gateway"""
+    return async_db.get_query_stats()
+
+
+@app.on_event("shutdown")
+def shutdown_db():
+    async_db.close()
+
+
 # --------------------------------------------------------
 # CRUD ENDPOINTS - direktan pristup DB (OK za CRUD)
 # --------------------------------------------------------
@@ -278,7 +477,7 @@ def get_driver(plate: str):
 
 
 @app.post("/add_driver")
-def add_driver(driver: Vozac):
+async def add_driver(driver: Vozac):
     """Dodaje novog vozača"""
     from parking_agent.domain.entities import Driver
 
@@ -290,12 +489,13 @@ def add_driver(driver: Vozac):
         invalid=driver.invalid,
         rezervacija=driver.rezervacija
     )
-    db_context.add_driver(new_driver)
+    # Upis kroz writer thread async gateway-a (jedan pisac)
+    await async_db.add_driver(new_driver)
     return {"message": "Vozač uspješno dodan."}
 
 
 @app.post("/add_violation_type")
-def add_violation_type(v: Prekrsaj):
+async def add_violation_type(v: Prekrsaj):
     """Dodaje novi tip prekršaja"""
     from parking_agent.domain.entities import Violation
 
@@ -304,37 +504,75 @@ def add_violation_type(v: Prekrsaj):
         opis=v.opis,
         kazna=v.kazna
     )
-    db_context.add_violation_type(violation)
+    await async_db.add_violation_type(violation)
+
+    # Hot-reload: pravila se kompajliraju nad novim katalogom
+    detection_service.invalidate_rules()
     return {"message": "Prekršaj dodan."}
 
 
 @app.get("/vozaci")
-def list_vozaci():
-    """Lista svih vozača"""
-    drivers = db_context.get_all_drivers()
-
-    return [
-        {
-            "vozac_id": d.vozac_id,
-            "ime": d.ime,
-            "tablica": d.tablica,
-            "auto_tip": d.auto_tip,
-            "invalid": d.invalid,
-            "rezervacija": d.rezervacija
-        }
-        for d in drivers
-    ]
+def list_vozaci(
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: int = Query(0, ge=0),
+        plate_prefix: str | None = None,
+        invalid: bool | None = None,
+        rezervacija: bool | None = None
+):
+    """
+    Lista vozača - stranica po stranica (cursor = vozac_id zadnjeg reda)
+    """
+    drivers, next_cursor = db_context.get_drivers_page(
+        limit, cursor, plate_prefix, invalid, rezervacija
+    )
+
+    return {
+        "items": [asdict(d) for d in drivers],
+        "next_cursor": next_cursor
+    }
+
+
+@app.get("/vozaci/stream")
+def stream_vozaci(
+        plate_prefix: str | None = None,
+        invalid: bool | None = None,
+        rezervacija: bool | None = None
+):
+    """
+    Svi vozači kao JSON-lines stream (za bulk potrošače)
+    Redovi se čitaju sa kursora tek kad ih klijent pročita
+    """
+    drivers = db_context.iter_drivers(plate_prefix, invalid, rezervacija)
+    return StreamingResponse(_to_json_lines(drivers), media_type="application/x-ndjson")
 
 
 @app.get("/prekrsaji")
-def list_prekrsaji():
-    """Lista svih prekršaja"""
-    violations = db_context.get_all_violations()
-
-    return [
-        {"prekrsaj_id": v.prekrsaj_id, "opis": v.opis, "kazna": v.kazna}
-        for v in violations
-    ]
+def list_prekrsaji(
+        limit: int = Query(100, ge=1, le=1000),
+        cursor: int = Query(0, ge=0)
+):
+    """
+    Lista prekršaja - stranica po stranica (cursor = prekrsaj_id zadnjeg reda)
+    """
+    violations, next_cursor = db_context.get_violations_page(limit, cursor)
+
+    return {
+        "items": [asdict(v) for v in violations],
+        "next_cursor": next_cursor
+    }
+
+
+@app.get("/prekrsaji/stream")
+def stream_prekrsaji():
+    """Svi tipovi prekršaja kao JSON-lines stream"""
+    violations = db_context.iter_violations()
+    return StreamingResponse(_to_json_lines(violations), media_type="application/x-ndjson")
+
+
+def _to_json_lines(items):
+    """Generator: dataclass → jedna JSON linija"""
+    for item in items:
+        yield json.dumps(asdict(item), ensure_ascii=False) + "\n"
 
 
 # --------------------------------------------------------
@@ -0,0 +1,20 @@
+"""
+Zajednički fixture-i za testove (pokretanje iz root-a projekta: python -m pytest)
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def parking_db(tmp_path, monkeypatch):
+    """Prazna parking baza (šema iz backend.database.init_db)"""
+    import backend.database as database
+
+    db_path = str(tmp_path / "parking.db")
+    monkeypatch.setattr(database, "DB_PATH", db_path)
+    database.init_db()
+    return db_path
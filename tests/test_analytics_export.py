@@ -0,0 +1,56 @@
+import sqlite3
+
+from parking_agent.infrastructure.analytics_export import AnalyticsExporter, AnalyticsReader
+
+
+def _add_rows(db_path: str, count: int, day: str = "2024-05-01"):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT OR IGNORE INTO prekrsaji (prekrsaj_id, opis, kazna) VALUES (1, 'Test', 50)")
+    for _ in range(count):
+        cur = conn.execute("INSERT INTO vozac (ime, tablica, auto_tip) VALUES ('V', NULL, 'Golf')")
+        conn.execute(
+            "INSERT INTO detektovano (vozac_id, prekrsaj_id, vrijeme) VALUES (?, 1, ?)",
+            (cur.lastrowid, f"{day} 10:00:00")
+        )
+    conn.commit()
+    conn.close()
+
+
+def test_export_is_incremental_by_watermark(parking_db, tmp_path):
+    exporter = AnalyticsExporter(parking_db, export_dir=str(tmp_path / "out"), batch_size=2)
+
+    _add_rows(parking_db, 3)
+    assert exporter.export()["detektovano"] == 3
+
+    _add_rows(parking_db, 2)
+    assert exporter.export()["detektovano"] == 2
+    assert exporter.export()["detektovano"] == 0
+
+
+def test_back_to_back_exports_do_not_overwrite_parts(parking_db, tmp_path):
+    """Dva runa u istoj sekundi ne smiju prepisati dijelove prethodnog"""
+    export_dir = str(tmp_path / "out")
+    exporter = AnalyticsExporter(parking_db, export_dir=export_dir, batch_size=2)
+
+    _add_rows(parking_db, 2)
+    exporter.export()
+    _add_rows(parking_db, 2)
+    exporter.export()
+
+    reader = AnalyticsReader(export_dir)
+    assert sorted(reader.violations(columns=["id"]).column("id").to_pylist()) == [1, 2, 3, 4]
+    assert sorted(reader.drivers(columns=["vozac_id"]).column("vozac_id").to_pylist()) == [1, 2, 3, 4]
+
+
+def test_reexport_of_same_range_does_not_duplicate(parking_db, tmp_path):
+    """Pad prije upisa watermark-a: ponovljeni export piše iste dijelove"""
+    export_dir = str(tmp_path / "out")
+    _add_rows(parking_db, 3)
+
+    AnalyticsExporter(parking_db, export_dir=export_dir).export()
+    exporter = AnalyticsExporter(parking_db, export_dir=export_dir)
+    exporter._save_state({})
+    exporter.export()
+
+    ids = AnalyticsReader(export_dir).violations(columns=["id"]).column("id").to_pylist()
+    assert sorted(ids) == [1, 2, 3]
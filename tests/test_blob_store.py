@@ -0,0 +1,109 @@
+import os
+import time
+
+from parking_agent.infrastructure.blob_store import BlobStore
+
+
+def _store(tmp_path) -> BlobStore:
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+def _write(path, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def _age(store: BlobStore, digest: str, seconds: float = 7200):
+    conn = store._connect()
+    with conn:
+        conn.execute("UPDATE blobs SET created_at = ? WHERE sha256 = ?",
+                     (time.time() - seconds, digest))
+    conn.close()
+
+
+def test_put_deduplicates_content(tmp_path):
+    store = _store(tmp_path)
+    a = store.put(_write(tmp_path / "a.jpg", b"slika"))
+    b = store.put(_write(tmp_path / "b.jpg", b"slika"))
+
+    assert a == b
+    assert store.refcount(a) == 0
+    assert os.path.exists(store.path_for(a))
+
+
+def test_link_and_unlink_count_references(tmp_path):
+    store = _store(tmp_path)
+    digest = store.put(_write(tmp_path / "a.jpg", b"slika"))
+
+    store.link(digest, str(tmp_path / "v1.jpg"))
+    store.link(digest, str(tmp_path / "v2.jpg"))
+    assert store.refcount(digest) == 2
+
+    store.unlink(digest, str(tmp_path / "v1.jpg"))
+    assert store.refcount(digest) == 1
+    assert not os.path.exists(tmp_path / "v1.jpg")
+
+
+def test_relinking_same_view_does_not_double_count(tmp_path):
+    store = _store(tmp_path)
+    digest = store.put(_write(tmp_path / "a.jpg", b"slika"))
+    view = str(tmp_path / "view.jpg")
+
+    store.link(digest, view)
+    store.link(digest, view)
+    assert store.refcount(digest) == 1
+
+    store.unlink(digest, view)
+    _age(store, digest)
+    assert store.collect_garbage()["deleted"] == 1
+
+
+def test_relinking_view_to_other_blob_counts_new_blob(tmp_path):
+    store = _store(tmp_path)
+    a = store.put(_write(tmp_path / "a.jpg", b"prva"))
+    b = store.put(_write(tmp_path / "b.jpg", b"druga"))
+    view = str(tmp_path / "view.jpg")
+
+    store.link(a, view)
+    store.link(b, view)
+    assert store.refcount(b) == 1
+    with open(view, "rb") as f:
+        assert f.read() == b"druga"
+
+
+def test_gc_deletes_only_old_unreferenced_blobs(tmp_path):
+    store = _store(tmp_path)
+    fresh = store.put(_write(tmp_path / "a.jpg", b"nova"))
+    orphan = store.put(_write(tmp_path / "b.jpg", b"siroce"))
+    linked = store.put(_write(tmp_path / "c.jpg", b"pogled"))
+    store.link(linked, str(tmp_path / "view.jpg"))
+    _age(store, orphan)
+    _age(store, linked)
+
+    assert store.collect_garbage() == {"deleted": 1, "freed_bytes": len(b"siroce")}
+    assert store.refcount(orphan) is None
+    assert not os.path.exists(store.path_for(orphan))
+    assert os.path.exists(store.path_for(fresh))
+    assert os.path.exists(store.path_for(linked))
+
+
+def test_retained_blob_survives_gc_until_released(tmp_path):
+    store = _store(tmp_path)
+    digest = store.put(_write(tmp_path / "a.jpg", b"job"), retain=True)
+    _age(store, digest)
+
+    assert store.collect_garbage()["deleted"] == 0
+    assert os.path.exists(store.path_for(digest))
+
+    store.release(digest)
+    assert store.collect_garbage()["deleted"] == 1
+
+
+def test_reingest_refreshes_gc_grace_period(tmp_path):
+    store = _store(tmp_path)
+    digest = store.put(_write(tmp_path / "a.jpg", b"slika"))
+    _age(store, digest)
+
+    store.put(_write(tmp_path / "b.jpg", b"slika"))
+    assert store.collect_garbage()["deleted"] == 0
@@ -0,0 +1,57 @@
+import threading
+
+from parking_agent.domain.entities import Driver, Violation
+from parking_agent.infrastructure.database import ParkingDbContext
+
+
+def _add_drivers(db: ParkingDbContext, count: int):
+    for i in range(count):
+        db.add_driver(Driver(vozac_id=0, ime=f"Vozac {i}", tablica=f"A{i:03d}-K-{i % 10}",
+                             auto_tip="Golf", invalid=i % 2 == 0, rezervacija=False))
+
+
+def test_drivers_page_cursor_walks_all_rows(parking_db):
+    db = ParkingDbContext(parking_db)
+    _add_drivers(db, 7)
+
+    seen, cursor = [], 0
+    while True:
+        page, cursor = db.get_drivers_page(3, cursor)
+        seen.extend(d.vozac_id for d in page)
+        if cursor is None:
+            break
+
+    assert seen == sorted(seen)
+    assert len(seen) == 7
+
+
+def test_iter_drivers_filters_by_prefix_and_flag(parking_db):
+    db = ParkingDbContext(parking_db)
+    _add_drivers(db, 4)
+
+    assert [d.tablica for d in db.iter_drivers(plate_prefix="A001")] == ["A001-K-1"]
+    assert all(d.invalid for d in db.iter_drivers(invalid=True))
+
+
+def test_iterator_can_be_advanced_from_another_thread(parking_db):
+    """StreamingResponse pomjera sync generator kroz thread pool"""
+    db = ParkingDbContext(parking_db)
+    _add_drivers(db, 3)
+    db.add_violation_type(Violation(prekrsaj_id=0, opis="Test", kazna=50))
+
+    for iterator in (db.iter_drivers(), db.iter_violations()):
+        first = next(iterator)
+        rest, errors = [], []
+
+        def consume():
+            try:
+                rest.extend(iterator)
+            except Exception as e:  # ProgrammingError ako je konekcija vezana za thread
+                errors.append(e)
+
+        worker = threading.Thread(target=consume)
+        worker.start()
+        worker.join()
+
+        assert first is not None
+        assert errors == []
@@ -0,0 +1,57 @@
+from parking_agent.infrastructure.dataset_manifest import DatasetManifest
+
+
+def _manifest(tmp_path) -> DatasetManifest:
+    return DatasetManifest(str(tmp_path / "manifest.db"))
+
+
+def test_counters_follow_added_images(tmp_path):
+    manifest = _manifest(tmp_path)
+    manifest.add_image("c/1.jpg", "confirmed", "first", "a")
+    manifest.add_image("c/2.jpg", "confirmed", "zoom", "b")
+    manifest.add_image("r/1.jpg", "rejected", "first", "c")
+    manifest.add_image("r/2.jpg", "rejected", "zoom", "d")
+
+    assert manifest.count("confirmed") == 2
+    assert manifest.count("rejected_first") == 1
+    assert manifest.count("rejected_zoom") == 1
+
+
+def test_readding_same_path_does_not_inflate_counter(tmp_path):
+    manifest = _manifest(tmp_path)
+    manifest.add_image("c/1.jpg", "confirmed", "first", "a")
+    manifest.add_image("c/1.jpg", "confirmed", "first", "b", class_counts={"car": 2})
+
+    assert manifest.count("confirmed") == 1
+    rows = manifest.list_images("confirmed")
+    assert len(rows) == 1
+    assert rows[0]["sha256"] == "b"
+    assert rows[0]["class_counts"] == {"car": 2}
+
+
+def test_moving_path_between_kinds_moves_the_count(tmp_path):
+    manifest = _manifest(tmp_path)
+    manifest.add_image("x.jpg", "rejected", "first", "a")
+    manifest.add_image("x.jpg", "confirmed", "first", "a")
+
+    assert manifest.count("rejected_first") == 0
+    assert manifest.count("confirmed") == 1
+
+
+def test_archive_resets_confirmed_and_rewrites_paths(tmp_path):
+    manifest = _manifest(tmp_path)
+    manifest.add_image("c/images/1.jpg", "confirmed", "first", "a", label_path="c/labels/1.txt")
+    manifest.add_image("r/1.jpg", "rejected", "first", "b")
+
+    assert manifest.archive_confirmed("arch/v1") == 1
+    assert manifest.count("confirmed") == 0
+    assert manifest.count("rejected_first") == 1
+    assert manifest.list_images("confirmed") == []
+
+    archived = manifest.list_images("confirmed", status="archived")[0]
+    assert archived["path"].endswith("arch/v1/images/1.jpg")
+    assert archived["label_path"].endswith("arch/v1/labels/1.txt")
+
+    # Ista putanja ponovo nakon arhiviranja se broji iznova
+    manifest.add_image("c/images/1.jpg", "confirmed", "first", "a")
+    assert manifest.count("confirmed") == 1
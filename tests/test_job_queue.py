@@ -0,0 +1,73 @@
+import time
+
+from parking_agent.infrastructure.job_queue import DurableJobQueue
+
+
+def _queue(tmp_path, **kwargs) -> DurableJobQueue:
+    return DurableJobQueue(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_claim_is_fifo_and_marks_running(tmp_path):
+    queue = _queue(tmp_path)
+    first = queue.enqueue("confirmed", {"n": 1})
+    queue.enqueue("rejected", {"n": 2})
+
+    job = queue.claim()
+    assert job["id"] == first
+    assert job["payload"] == {"n": 1}
+    assert job["attempts"] == 1
+    assert queue.stats()["running"] == 1
+
+
+def test_claim_returns_none_when_empty(tmp_path):
+    queue = _queue(tmp_path)
+    assert queue.claim() is None
+    assert not queue.has_pending()
+
+
+def test_complete_removes_job_from_backlog(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue("confirmed", {})
+    queue.complete(queue.claim()["id"])
+
+    stats = queue.stats()
+    assert stats["done"] == 1
+    assert stats["pending"] == 0
+    assert not queue.has_pending()
+
+
+def test_fail_backs_off_then_retries(tmp_path):
+    queue = _queue(tmp_path, base_backoff_s=60)
+    queue.enqueue("confirmed", {})
+    job = queue.claim()
+
+    queue.fail(job["id"], "disk full")
+    assert queue.stats()["pending"] == 1
+    assert queue.claim() is None  # još je u backoff-u
+
+    conn = queue._connect()
+    conn.execute("UPDATE jobs SET available_at = ?", (time.time() - 1,))
+    conn.close()
+    assert queue.claim()["attempts"] == 2
+
+
+def test_fail_after_max_attempts_is_terminal(tmp_path):
+    queue = _queue(tmp_path, max_attempts=2, base_backoff_s=0)
+    queue.enqueue("confirmed", {})
+
+    queue.fail(queue.claim()["id"], "prvi")
+    queue.fail(queue.claim()["id"], "drugi")
+
+    stats = queue.stats()
+    assert stats["failed"] == 1
+    assert stats["recent_failures"][0]["error"] == "drugi"
+    assert queue.claim() is None
+
+
+def test_running_jobs_are_requeued_on_restart(tmp_path):
+    queue = _queue(tmp_path)
+    queue.enqueue("confirmed", {})
+    job = queue.claim()
+
+    restarted = _queue(tmp_path)
+    assert restarted.claim()["id"] == job["id"]
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from core.pipeline import Pipeline, Stage
+
+
+async def _double(x):
+    return x * 2
+
+
+async def _drop_odd(x):
+    return x if x % 2 == 0 else None
+
+
+def _collect(pipeline: Pipeline, source) -> list:
+    async def run():
+        return [item async for item in pipeline.stream(source)]
+    return asyncio.run(run())
+
+
+def test_single_worker_stages_keep_order():
+    pipeline = Pipeline([Stage("double", _double), Stage("inc", lambda x: x + 1, executor="thread")])
+    assert _collect(pipeline, range(5)) == [1, 3, 5, 7, 9]
+
+
+def test_none_result_is_dropped_and_counted():
+    pipeline = Pipeline([Stage("filter", _drop_odd)])
+    assert _collect(pipeline, range(6)) == [0, 2, 4]
+    assert pipeline.stats()["stages"]["filter"]["dropped"] == 3
+
+
+def test_stage_error_drops_item_and_reports_it():
+    errors = []
+
+    async def fragile(x):
+        if x == 2:
+            raise RuntimeError("loša slika")
+        return x
+
+    pipeline = Pipeline([Stage("fragile", fragile)],
+                        on_error=lambda stage, item, exc: errors.append((stage, item, str(exc))))
+    assert _collect(pipeline, range(4)) == [0, 1, 3]
+    assert errors == [("fragile", 2, "loša slika")]
+    assert pipeline.stats()["stages"]["fragile"]["failed"] == 1
+
+
+def test_batched_stage_gets_lists():
+    sizes = []
+
+    async def batch_sum(items):
+        sizes.append(len(items))
+        return [i * 10 for i in items]
+
+    pipeline = Pipeline([Stage("batch", batch_sum, batch_size=4, batch_timeout_s=1.0)])
+    assert _collect(pipeline, range(10)) == [i * 10 for i in range(10)]
+    assert sum(sizes) == 10
+    assert max(sizes) <= 4
+
+
+def test_parallel_workers_process_everything():
+    async def slow(x):
+        await asyncio.sleep(0.001)
+        return x
+
+    pipeline = Pipeline([Stage("slow", slow, workers=4, queue_size=2), Stage("double", _double, workers=2)])
+    assert sorted(_collect(pipeline, range(20))) == [i * 2 for i in range(20)]
+    assert pipeline.stats()["stages"]["slow"]["processed"] == 20
+
+
+def test_async_source_and_run_count():
+    async def source():
+        for i in range(3):
+            yield i
+
+    assert asyncio.run(Pipeline([Stage("double", _double)]).run(source())) == 3
+
+
+def test_stage_validation():
+    with pytest.raises(ValueError):
+        Stage("bad", _double, executor="gpu")
+    with pytest.raises(ValueError):
+        Stage("sync", lambda x: x, executor="async")
+    with pytest.raises(ValueError):
+        Pipeline([])
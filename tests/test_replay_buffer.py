@@ -0,0 +1,84 @@
+import json
+import os
+
+from parking_agent.application.services.replay_buffer import ReplayBuffer
+from parking_agent.infrastructure.dataset_manifest import DatasetManifest
+
+CLASSES = ["Auto", "Tablica", "InvalidskoMjesto"]
+
+
+def _archive(tmp_path, images) -> DatasetManifest:
+    """images: lista (ime, class_counts) - arhivirane confirmed slike"""
+    manifest = DatasetManifest(str(tmp_path / "manifest.db"))
+    os.makedirs(tmp_path / "c", exist_ok=True)
+    for name, class_counts in images:
+        path = tmp_path / "c" / f"{name}.jpg"
+        path.write_bytes(name.encode())
+        manifest.add_image(str(path), "confirmed", "first", f"hash-{name}", class_counts=class_counts)
+    manifest.archive_confirmed(str(tmp_path / "arch"))
+
+    # archive_confirmed prepisuje putanje u arhivu - fajlovi idu za njima
+    os.makedirs(tmp_path / "arch" / "images", exist_ok=True)
+    for name, _ in images:
+        os.replace(tmp_path / "c" / f"{name}.jpg", tmp_path / "arch" / "images" / f"{name}.jpg")
+    return manifest
+
+
+def test_sample_is_capped_and_unique(tmp_path):
+    manifest = _archive(tmp_path, [(f"a{i}", {"Auto": 1}) for i in range(50)])
+    sample = ReplayBuffer(manifest, CLASSES, capacity=10, seed=1).sample_archive()
+
+    assert len(sample) == 10
+    assert len({row["sha256"] for row in sample}) == 10
+
+
+def test_rare_class_is_kept_in_sample(tmp_path):
+    images = [(f"a{i}", {"Auto": 1}) for i in range(100)]
+    images.append(("rijetka", {"Auto": 1, "InvalidskoMjesto": 1}))
+    manifest = _archive(tmp_path, images)
+
+    for seed in range(5):
+        sample = ReplayBuffer(manifest, CLASSES, capacity=9, seed=seed).sample_archive()
+        assert "hash-rijetka" in {row["sha256"] for row in sample}
+
+
+def test_excluded_and_missing_images_are_skipped(tmp_path):
+    manifest = _archive(tmp_path, [("a", {"Auto": 1}), ("b", {"Auto": 1}), ("c", {"Auto": 1})])
+    os.remove(tmp_path / "arch" / "images" / "c.jpg")
+
+    sample = ReplayBuffer(manifest, CLASSES, capacity=10).sample_archive(exclude={"hash-a"})
+    assert [row["sha256"] for row in sample] == ["hash-b"]
+
+
+def test_same_seed_gives_same_sample(tmp_path):
+    manifest = _archive(tmp_path, [(f"a{i}", {"Auto": 1}) for i in range(30)])
+    first = ReplayBuffer(manifest, CLASSES, capacity=5, seed=7).sample_archive()
+    second = ReplayBuffer(manifest, CLASSES, capacity=5, seed=7).sample_archive()
+    assert [r["sha256"] for r in first] == [r["sha256"] for r in second]
+
+
+def test_val_split_is_stable_per_image(tmp_path):
+    buffer = ReplayBuffer(DatasetManifest(str(tmp_path / "m.db")), CLASSES, val_fraction=0.2)
+    hashes = [f"h{i}" for i in range(500)]
+    split = [buffer._is_val(h) for h in hashes]
+
+    assert split == [buffer._is_val(h) for h in hashes]
+    assert 0.1 < sum(split) / len(split) < 0.3
+
+
+def test_training_config_mixes_new_and_replay(tmp_path):
+    manifest = _archive(tmp_path, [(f"a{i}", {"Auto": 1}) for i in range(20)])
+    snapshot = tmp_path / "snapshot"
+    os.makedirs(snapshot / "images")
+    index = {f"new{i}.jpg": {"sha256": f"new-{i}"} for i in range(20)}
+    (snapshot / "snapshot.json").write_text(json.dumps(index))
+
+    summary = ReplayBuffer(manifest, CLASSES, capacity=5, seed=0).write_training_config(str(snapshot))
+
+    assert summary["new"] == 20
+    assert summary["replay"] == 5
+    assert summary["train"] + summary["val"] == 25
+    train = (snapshot / "train.txt").read_text().splitlines()
+    val = (snapshot / "val.txt").read_text().splitlines()
+    assert not set(train) & set(val)
+    assert os.path.exists(summary["config_path"])
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("ultralytics")
+pytest.importorskip("aiosqlite")
+
+from parking_agent.application.services.review_service import ReviewService
+from parking_agent.infrastructure.blob_store import BlobStore
+from parking_agent.infrastructure.dataset_manifest import DatasetManifest
+from parking_agent.infrastructure.file_storage import FileStorage
+from parking_agent.infrastructure.job_queue import DurableJobQueue
+
+
+def _service(tmp_path, monkeypatch) -> ReviewService:
+    # Podrazumijevane putanje servisa (backend/...) idu u tmp, ne u projekat
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("backend", exist_ok=True)
+    storage = FileStorage(
+        confirmed_dir=str(tmp_path / "confirmed"),
+        rejected_dir=str(tmp_path / "rejected"),
+        uploads_dir=str(tmp_path / "uploads"),
+        weights_dir=str(tmp_path / "weights"),
+        manifest=DatasetManifest(str(tmp_path / "manifest.db")),
+        blob_store=BlobStore(str(tmp_path / "blobs")),
+    )
+    jobs = DurableJobQueue(str(tmp_path / "jobs.db"))
+    return ReviewService(db_context=None, file_storage=storage, classifier=None, job_queue=jobs)
+
+
+def _gc_everything_old(service: ReviewService) -> dict:
+    blobs = service.storage.blobs
+    conn = blobs._connect()
+    with conn:
+        conn.execute("UPDATE blobs SET created_at = ?", (time.time() - 7200,))
+    conn.close()
+    return blobs.collect_garbage()
+
+
+def test_pending_job_images_survive_gc_until_completed(tmp_path, monkeypatch):
+    service = _service(tmp_path, monkeypatch)
+    upload = tmp_path / "upload.jpg"
+    upload.write_bytes(b"slika")
+
+    asyncio.run(service._enqueue("rejected", [(str(upload), "first")]))
+    job = service.jobs.claim()
+    digest = job["payload"]["images"][0]["digest"]
+
+    assert _gc_everything_old(service)["deleted"] == 0
+    assert os.path.exists(service.storage.blobs.path_for(digest))
+
+    service.complete_job(job)
+    assert service.storage.blobs.refcount(digest) == 0
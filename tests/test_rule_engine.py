@@ -0,0 +1,73 @@
+from parking_agent.application.services.rule_engine import ViolationRuleEngine
+from parking_agent.domain.entities import CarAssignment, Violation
+from parking_agent.domain.enums import ViolationType
+
+LINE = ViolationType.NEPROPISNO_PREKO_LINIJE.value
+FRAME = ViolationType.NEPROPISNO_VAN_OKVIRA.value
+RESERVATION = ViolationType.PARKIRANJE_NA_REZERVACIJI.value
+
+CATALOG = [
+    Violation(prekrsaj_id=1, opis=LINE, kazna=50),
+    Violation(prekrsaj_id=2, opis=RESERVATION, kazna=100),
+]
+
+
+def _engine(catalog=CATALOG) -> ViolationRuleEngine:
+    engine = ViolationRuleEngine()
+    engine.compile(catalog)
+    return engine
+
+
+def _car(violations=(), on_reservation=False) -> CarAssignment:
+    return CarAssignment(bbox=[0, 0, 1, 1], confidence=0.9,
+                         violations=list(violations), on_reservation=on_reservation)
+
+
+def test_standard_violation_resolves_from_catalog():
+    outcome = _engine().evaluate(_car([LINE]))
+
+    assert outcome.prekrsaj_id == 1
+    assert outcome.kazna == 50
+    assert not outcome.on_reservation
+    assert outcome.extra_violation_id is None
+
+
+def test_violation_on_reservation_adds_reservation_fine():
+    outcome = _engine().evaluate(_car([LINE], on_reservation=True))
+
+    assert outcome.prekrsaj_id == 1
+    assert outcome.on_reservation
+    assert outcome.extra_violation_id == 2
+    assert outcome.extra_kazna == 100
+
+
+def test_plain_reservation_is_not_fined_twice():
+    outcome = _engine().evaluate(_car(on_reservation=True))
+
+    assert outcome.prekrsaj_id == 2
+    assert outcome.extra_violation_id is None
+
+
+def test_clean_car_and_uncatalogued_violation_have_no_outcome():
+    engine = _engine()
+    assert engine.evaluate(_car()) is None
+    assert engine.evaluate(_car([FRAME])) is None
+
+
+def test_invalidate_keeps_old_table_until_recompiled():
+    engine = _engine()
+    engine.invalidate()
+
+    assert not engine.is_compiled
+    assert engine.evaluate(_car([LINE])).prekrsaj_id == 1
+
+    engine.compile(CATALOG + [Violation(prekrsaj_id=3, opis=FRAME, kazna=30)])
+    assert engine.is_compiled
+    assert engine.evaluate(_car([FRAME])).prekrsaj_id == 3
+
+
+def test_combination_and_lookup_by_id():
+    engine = _engine()
+    assert engine.combination(1, True).extra_violation_id == 2
+    assert engine.combination(1, False).extra_violation_id is None
+    assert engine.violation_by_id(2).opis == RESERVATION
@@ -0,0 +1,67 @@
+import numpy as np
+
+from parking_agent.application.services.spatial_association import (
+    SpatialAssociator, greedy_match, iou_matrix, sign_to_spot
+)
+from parking_agent.domain.entities import Detection
+
+
+def _det(class_name: str, bbox, confidence: float = 0.9) -> Detection:
+    return Detection(image_path="x.jpg", class_name=class_name, confidence=confidence, bbox=list(bbox))
+
+
+def test_iou_matrix_identical_and_disjoint():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+    assert np.allclose(iou_matrix(a, b), [[1.0, 0.0]])
+
+
+def test_greedy_match_is_one_to_one_by_score():
+    scores = np.array([[0.9, 0.8], [0.85, 0.1]])
+    assert greedy_match(scores, 0.5) == [(0, 0)]
+    assert greedy_match(np.zeros((0, 0)), 0.5) == []
+
+
+def test_sign_belongs_to_spot_below_it():
+    signs = np.array([[40, 0, 60, 10], [500, 0, 510, 10]], dtype=np.float32)
+    spots = np.array([[0, 50, 100, 150], [100, 50, 200, 150]], dtype=np.float32)
+    assert sign_to_spot(signs, spots).tolist() == [0, -1]
+
+
+def test_each_car_gets_its_own_spot_sign_and_plate():
+    detections = [
+        _det("Auto", (210, 60, 290, 140)),
+        _det("Auto", (10, 60, 90, 140)),
+        _det("ZauzetoMjesto", (0, 50, 100, 150)),
+        _det("InvalidskoMjesto", (200, 50, 300, 150)),
+        _det("RezervacijaOznaka", (40, 0, 60, 20)),
+        _det("Tablica", (230, 120, 270, 135), confidence=0.8),
+    ]
+    left, right = SpatialAssociator().associate(detections)
+
+    assert left.bbox[0] < right.bbox[0]
+    assert left.spot_class == "ZauzetoMjesto"
+    assert left.on_reservation and not left.on_invalid_spot
+    assert left.plate_bbox is None
+
+    assert right.spot_class == "InvalidskoMjesto"
+    assert right.on_invalid_spot and not right.on_reservation
+    assert right.plate_bbox == [230.0, 120.0, 270.0, 135.0]
+    assert right.plate_confidence == 0.8
+
+
+def test_violation_box_attaches_to_car_or_becomes_one():
+    detections = [
+        _det("Auto", (0, 0, 100, 100)),
+        _det("NepropisnoParkirano_Trotoar", (5, 5, 100, 100)),
+        _det("NepropisnoParkirano_Zebra", (300, 0, 400, 100)),
+    ]
+    cars = SpatialAssociator().associate(detections)
+
+    assert len(cars) == 2
+    assert cars[0].violations == ["NepropisnoParkirano_Trotoar"]
+    assert cars[1].violations == ["NepropisnoParkirano_Zebra"]
+
+
+def test_no_cars_returns_empty():
+    assert SpatialAssociator().associate([_det("ZauzetoMjesto", (0, 0, 10, 10))]) == []